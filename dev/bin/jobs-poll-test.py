@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone performance test of BatchSysManager.jobs_poll.
+
+Create N synthetic job log directories in a temporary suite run directory,
+each with a "job.status" file of a job submitted to a fake batch system. The
+fake poll command reports every other job as still in the batch system. Time
+"jobs_poll" on all the jobs, and time the reconciliation of the poll command
+output with the expected job IDs, set-based against the list-based approach
+it replaced.
+
+Usage: jobs-poll-test.py [N_JOBS [N_REPEATS]]
+"""
+
+import os
+import shutil
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.realpath(__file__)))), 'lib'))
+
+from cylc.batch_sys_manager import BatchSysManager
+
+
+FAKE_BATCH_SYS_MODULE = """
+import os
+
+
+class FakeBatchSysHandler(object):
+    POLL_CMD = os.path.join(os.path.dirname(__file__), "fake-poll")
+
+
+BATCH_SYS_HANDLER = FakeBatchSysHandler()
+"""
+
+# Print a table header, then every other job ID given as an argument.
+FAKE_POLL_CMD = """#!/bin/bash
+echo 'JOBID STATE'
+while (($# > 0)); do
+    echo "$1 R"
+    shift 2 || shift
+done
+"""
+
+
+def listed_reconcile(exp_ids, out):
+    """The list-based reconciliation, for comparison."""
+    bad_ids = list(exp_ids)
+    for line in out.splitlines():
+        try:
+            head = line.split(None, 1)[0]
+        except IndexError:
+            continue
+        if head in exp_ids:
+            try:
+                bad_ids.remove(head)
+            except ValueError:
+                pass
+    return bad_ids
+
+
+def set_reconcile(exp_ids, out):
+    """The set-based reconciliation, as in BatchSysManager."""
+    bad_ids = set(exp_ids)
+    for line in out.splitlines():
+        try:
+            head = line.split(None, 1)[0]
+        except IndexError:
+            continue
+        bad_ids.discard(head)
+    return bad_ids
+
+
+def make_suite_run_dir(suite_run_dir, n_jobs):
+    """Populate suite_run_dir, return (job_log_root, job_log_dirs)."""
+    lib_python = os.path.join(suite_run_dir, "lib", "python")
+    os.makedirs(lib_python)
+    with open(os.path.join(lib_python, "fake_batch_sys.py"), "w") as handle:
+        handle.write(FAKE_BATCH_SYS_MODULE)
+    fake_poll = os.path.join(lib_python, "fake-poll")
+    with open(fake_poll, "w") as handle:
+        handle.write(FAKE_POLL_CMD)
+    os.chmod(fake_poll, 0755)
+    job_log_root = os.path.join(suite_run_dir, "log", "job")
+    job_log_dirs = []
+    for i in range(n_jobs):
+        job_log_dir = os.path.join("1", "t%d" % i, "01")
+        os.makedirs(os.path.join(job_log_root, job_log_dir))
+        with open(os.path.join(
+                job_log_root, job_log_dir, "job.status"), "w") as handle:
+            handle.write("%s=fake_batch_sys\n%s=%d\n" % (
+                BatchSysManager.CYLC_BATCH_SYS_NAME,
+                BatchSysManager.CYLC_BATCH_SYS_JOB_ID,
+                100000 + i))
+        job_log_dirs.append(job_log_dir)
+    return job_log_root, job_log_dirs
+
+
+def time_jobs_poll(job_log_root, job_log_dirs, n_repeats):
+    """Return mean time of jobs_poll."""
+    manager = BatchSysManager()
+    stdout = sys.stdout
+    elapsed = 0.0
+    try:
+        sys.stdout = open(os.devnull, "w")
+        for _ in range(n_repeats):
+            # Jobs polled as exited are not polled again, so reset.
+            for job_log_dir in job_log_dirs:
+                with open(os.path.join(
+                        job_log_root, job_log_dir, "job.status"),
+                        "r+") as handle:
+                    lines = handle.readlines()[:2]
+                    handle.seek(0)
+                    handle.truncate()
+                    handle.writelines(lines)
+            start = time()
+            manager.jobs_poll(job_log_root, job_log_dirs)
+            elapsed += time() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return elapsed / n_repeats
+
+
+def time_reconcile(reconcile_func, n_jobs, n_repeats):
+    """Return mean time of reconcile_func on a fake poll output."""
+    exp_ids = [str(100000 + i) for i in range(n_jobs)]
+    out = "JOBID STATE\n" + "".join(
+        "%s R\n" % job_id for job_id in exp_ids[::2])
+    start = time()
+    for _ in range(n_repeats):
+        reconcile_func(exp_ids, out)
+    return (time() - start) / n_repeats
+
+
+def main():
+    """Run the comparisons and print the results."""
+    args = [int(arg) for arg in sys.argv[1:]]
+    n_jobs, n_repeats = (args + [10000, 3][len(args):])[:2]
+    suite_run_dir = mkdtemp()
+    try:
+        job_log_root, job_log_dirs = make_suite_run_dir(suite_run_dir, n_jobs)
+        results = [
+            ("jobs_poll", time_jobs_poll(
+                job_log_root, job_log_dirs, n_repeats)),
+            ("reconcile, listed", time_reconcile(
+                listed_reconcile, n_jobs, n_repeats)),
+            ("reconcile, set", time_reconcile(
+                set_reconcile, n_jobs, n_repeats)),
+        ]
+    finally:
+        shutil.rmtree(suite_run_dir)
+    print "Jobs polled: %d" % n_jobs
+    for label, mean in results:
+        print "%-18s %.6f sec" % (label + ":", mean)
+
+
+if __name__ == "__main__":
+    main()
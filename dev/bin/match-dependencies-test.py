@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone performance test of TaskPool.match_dependencies.
+
+Load a synthetic suite with N tasks per cycle point over M cycle points into
+a task pool, then time dependency matching passes in which a small number of
+tasks complete an output. Compare the indexed matching with the brokered
+approach it replaced, which rebuilt a set of all completed outputs in the
+pool and offered it to every unsatisfied prerequisite on every pass.
+
+Usage: match-dependencies-test.py [N_TASKS [N_POINTS [N_PASSES]]]
+"""
+
+import logging
+import os
+import shutil
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.realpath(__file__)))), 'lib'))
+
+from cylc.config import SuiteConfig
+from cylc.cycling.loader import get_point
+from cylc.suite_logging import SuiteLog
+from cylc.task_outputs import TASK_OUTPUT_SUCCEEDED
+from cylc.task_pool import TaskPool
+from cylc.task_proxy import TaskProxy
+
+
+SUITE_RC_TMPL = """
+[cylc]
+    cycle point format = %%Y
+[scheduling]
+    initial cycle point = 2000
+    max active cycle points = %(n_points)d
+    [[dependencies]]
+        [[[P1Y]]]
+            graph = \"\"\"
+%(graph)s
+\"\"\"
+[runtime]
+    [[root]]
+        script = true
+"""
+
+
+class NullSuiteDatabaseManager(object):
+    """Discard database writes made by the task pool."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def brokered_match_dependencies(pool):
+    """The brokered O(n) negotiation, for comparison."""
+    all_task_outputs = set()
+    for itask in pool.get_tasks():
+        for output in itask.state.outputs.get_completed():
+            all_task_outputs.add((itask.tdef.name, str(itask.point), output))
+    for itask in pool.get_tasks():
+        if itask.state.prerequisites_are_not_all_satisfied():
+            itask.state.satisfy_me(all_task_outputs)
+
+
+def get_pool(suite_dir, n_tasks, n_points):
+    """Return a task pool populated with n_tasks * n_points task proxies."""
+    graph = []
+    for i in range(1, n_tasks):
+        graph.append("t%d[-P1Y] & t%d => t%d" % (i, i - 1, i))
+    suite_rc = os.path.join(suite_dir, "suite.rc")
+    with open(suite_rc, "w") as handle:
+        handle.write(SUITE_RC_TMPL % {
+            "n_points": n_points, "graph": "\n".join(graph)})
+    config = SuiteConfig("match-dependencies-test", suite_rc)
+    pool = TaskPool(
+        config, get_point("2999"), NullSuiteDatabaseManager(), None)
+    for year in range(2000, 2000 + n_points):
+        for name in config.get_task_name_list():
+            pool.add_to_runahead_pool(
+                TaskProxy(config.get_taskdef(name), get_point(str(year))))
+    for itask in pool.get_rh_tasks()[:]:
+        pool.release_runahead_task(itask)
+    return pool
+
+
+def time_passes(pool, match_func, n_passes):
+    """Complete an output on one task per pass, return mean pass time."""
+    itasks = sorted(pool.get_tasks(), key=lambda itask: itask.identity)
+    match_func()
+    elapsed = 0.0
+    for itask in itasks[:n_passes]:
+        itask.state.outputs.set_completion(TASK_OUTPUT_SUCCEEDED, True)
+        start = time()
+        match_func()
+        elapsed += time() - start
+    return elapsed / n_passes
+
+
+def main():
+    """Run the comparison and print the results."""
+    args = [int(arg) for arg in sys.argv[1:]]
+    n_tasks, n_points, n_passes = (args + [200, 20, 50][len(args):])[:3]
+    logging.getLogger(SuiteLog.LOG).addHandler(logging.NullHandler())
+    suite_dir = mkdtemp()
+    try:
+        results = []
+        for label, get_match_func in [
+                ("brokered", lambda pool: (
+                    lambda: brokered_match_dependencies(pool))),
+                ("indexed", lambda pool: pool.match_dependencies)]:
+            pool = get_pool(suite_dir, n_tasks, n_points)
+            results.append(
+                (label, time_passes(pool, get_match_func(pool), n_passes)))
+    finally:
+        shutil.rmtree(suite_dir)
+    print "Tasks in pool: %d" % (n_tasks * n_points)
+    for label, mean in results:
+        print "%-9s %.6f sec/pass" % (label + ":", mean)
+    print " => factor of", results[0][1] / results[1][1]
+
+
+if __name__ == "__main__":
+    main()
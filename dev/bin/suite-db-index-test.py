@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone performance test of suite runtime database indexes.
+
+Generate a suite runtime database without the secondary indexes in
+CylcSuiteDAO.TABLES_INDEXES, with N_TASK_CYCLES rows in task_states, one job
+per task in task_jobs and three events per job in task_events (5 * N rows in
+all, 10M by default). Time representative queries, then create the indexes
+as on restart and time the queries again. Print the query plan of each query
+with the indexes.
+
+Usage: suite-db-index-test.py [N_TASK_CYCLES [N_REPEATS]]
+"""
+
+import os
+import shutil
+import sys
+from tempfile import mkdtemp
+from time import time
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.realpath(__file__)))), 'lib'))
+
+from cylc.rundb import CylcSuiteDAO
+
+
+N_TASKS = 1000
+STATUSES = ["succeeded"] * 18 + ["failed", "running"]
+# (label, stmt, stmt_args), as issued by the named command or method
+QUERIES = [
+    # CylcSuiteDAO.select_task_times
+    ("report-timings",
+     "SELECT name, cycle, user_at_host, batch_sys_name, time_submit,"
+     " time_run, time_run_exit FROM task_jobs WHERE run_status = 0",
+     []),
+    # CylcSuiteDAO.select_task_job_run_times
+    ("restart run times",
+     "SELECT name, GROUP_CONCAT("
+     "CAST(strftime('%s', time_run_exit) AS NUMERIC) -"
+     " CAST(strftime('%s', time_run) AS NUMERIC))"
+     " FROM task_jobs WHERE run_status==0 GROUP BY name"
+     " ORDER BY time_run_exit",
+     []),
+    # Job log and event lookups of a task
+    ("job events of task",
+     "SELECT time, event, message FROM task_events"
+     " WHERE cycle==? AND name==? AND submit_num==?",
+     ["10000101T00", "t1", 1]),
+    # CylcSuiteDBChecker.suite_state_query
+    ("suite-state, task and point",
+     "select name, cycle, status from task_states"
+     " where name==? AND cycle==?",
+     ["t1", "10000101T00"]),
+    ("suite-state, point",
+     "select name, cycle, status from task_states where cycle==?",
+     ["10000101T00"]),
+    ("suite-state, point and status",
+     "select name, cycle, status from task_states"
+     " where cycle==? AND (status==?)",
+     ["10000101T00", "failed"]),
+    ("suite-state, status",
+     "select name, cycle, status from task_states where (status==?)",
+     ["failed"]),
+]
+
+
+class UnindexedCylcSuiteDAO(CylcSuiteDAO):
+    """Suite DAO without secondary indexes, as before they were added."""
+
+    TABLES_INDEXES = {}
+
+
+def get_cycle(i):
+    """Return a cycle point string for the i-th cycle."""
+    return "1%03d%02d%02dT00" % (i // 360, i // 30 % 12 + 1, i % 30 + 1)
+
+
+def populate(db_file_name, n_task_cycles):
+    """Populate an unindexed database at db_file_name."""
+    dao = UnindexedCylcSuiteDAO(db_file_name)
+    conn = dao.connect()
+    tables = dao.tables
+    states_rows = []
+    jobs_rows = []
+    events_rows = []
+    for i in range(n_task_cycles):
+        cycle = get_cycle(i // N_TASKS)
+        name = "t%d" % (i % N_TASKS)
+        status = STATUSES[i % len(STATUSES)]
+        run_status = {"succeeded": 0, "failed": 1}.get(status)
+        states_rows.append([
+            name, cycle, "2018-01-01T00:00:00Z", "2018-01-01T00:01:00Z", 1,
+            status])
+        jobs_rows.append([
+            cycle, name, 1, 0, 1,
+            "2018-01-01T00:00:00Z", "2018-01-01T00:00:01Z", 0,
+            "2018-01-01T00:00:10Z", "2018-01-01T00:01:00Z", None, run_status,
+            "localhost", "background", str(i)])
+        for event in ["submitted", "started", status]:
+            events_rows.append([
+                name, cycle, "2018-01-01T00:00:00Z", 1, event, ""])
+        if len(states_rows) >= 100000 or i == n_task_cycles - 1:
+            for table_name, rows in [
+                    (dao.TABLE_TASK_STATES, states_rows),
+                    (dao.TABLE_TASK_JOBS, jobs_rows),
+                    (dao.TABLE_TASK_EVENTS, events_rows)]:
+                conn.executemany(
+                    tables[table_name].get_insert_stmt(), rows)
+                del rows[:]
+            conn.commit()
+    dao.close()
+
+
+def time_queries(db_file_name, n_repeats):
+    """Return [(label, mean time), ...] of the queries."""
+    conn = CylcSuiteDAO(db_file_name, is_public=True).connect()
+    results = []
+    for label, stmt, stmt_args in QUERIES:
+        start = time()
+        for _ in range(n_repeats):
+            conn.execute(stmt, stmt_args).fetchall()
+        results.append((label, (time() - start) / n_repeats))
+    conn.close()
+    return results
+
+
+def get_query_plans(db_file_name):
+    """Return [(label, plan), ...] of the queries."""
+    conn = CylcSuiteDAO(db_file_name, is_public=True).connect()
+    plans = []
+    for label, stmt, stmt_args in QUERIES:
+        plans.append((label, "; ".join(
+            row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN " + stmt, stmt_args))))
+    conn.close()
+    return plans
+
+
+def main():
+    """Run the comparison and print the results."""
+    args = [int(arg) for arg in sys.argv[1:]]
+    n_task_cycles, n_repeats = (args + [2000000, 3][len(args):])[:2]
+    run_dir = mkdtemp()
+    try:
+        db_file_name = os.path.join(run_dir, CylcSuiteDAO.DB_FILE_BASE_NAME)
+        start = time()
+        populate(db_file_name, n_task_cycles)
+        print "Populated %d rows: %.1f sec" % (
+            5 * n_task_cycles, time() - start)
+        unindexed = time_queries(db_file_name, n_repeats)
+        start = time()
+        CylcSuiteDAO(db_file_name).close()
+        print "Created indexes (on restart): %.1f sec" % (time() - start)
+        indexed = time_queries(db_file_name, n_repeats)
+        plans = get_query_plans(db_file_name)
+    finally:
+        shutil.rmtree(run_dir)
+    print "%-32s %12s %12s" % ("Query", "unindexed", "indexed")
+    for (label, before), (_, after) in zip(unindexed, indexed):
+        print "%-32s %10.6fs %10.6fs" % (label + ":", before, after)
+    print
+    for label, plan in plans:
+        print "%s: %s" % (label, plan)
+
+
+if __name__ == "__main__":
+    main()
@@ -502,13 +502,13 @@ class BatchSysManager(object):
     def _jobs_poll_batch_sys(self, job_log_root, batch_sys_name, my_ctx_list):
         """Helper 2 for self.jobs_poll(job_log_root, job_log_dirs)."""
         exp_job_ids = [ctx.batch_sys_job_id for ctx in my_ctx_list]
-        bad_job_ids = list(exp_job_ids)
+        bad_job_ids = set(exp_job_ids)
         exp_pids = []
-        bad_pids = []
+        bad_pids = set()
         items = [[self._get_sys(batch_sys_name), exp_job_ids, bad_job_ids]]
         if getattr(items[0][0], "SHOULD_POLL_PROC_GROUP", False):
             exp_pids = [ctx.pid for ctx in my_ctx_list if ctx.pid is not None]
-            bad_pids.extend(exp_pids)
+            bad_pids.update(exp_pids)
             items.append([self._get_sys("background"), exp_pids, bad_pids])
         for batch_sys, exp_ids, bad_ids in items:
             if hasattr(batch_sys, "get_poll_many_cmd"):
@@ -527,16 +527,12 @@ class BatchSysManager(object):
                     exc.filename = cmd[0]
                 sys.stderr.write(str(exc) + "\n")
                 return
-            proc.wait()
             out, err = proc.communicate()
             sys.stderr.write(err)
             if hasattr(batch_sys, "filter_poll_many_output"):
                 # Allow custom filter
-                for id_ in batch_sys.filter_poll_many_output(out):
-                    try:
-                        bad_ids.remove(id_)
-                    except ValueError:
-                        pass
+                bad_ids.difference_update(
+                    batch_sys.filter_poll_many_output(out))
             else:
                 # Just about all poll commands return a table, with column 1
                 # being the job ID. The logic here should be sufficient to
@@ -546,11 +542,8 @@ class BatchSysManager(object):
                         head = line.split(None, 1)[0]
                     except IndexError:
                         continue
-                    if head in exp_ids:
-                        try:
-                            bad_ids.remove(head)
-                        except ValueError:
-                            pass
+                    bad_ids.discard(head)
+        exp_pids = set(exp_pids)
 
         for ctx in my_ctx_list:
             ctx.batch_sys_exit_polled = int(
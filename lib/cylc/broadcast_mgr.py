@@ -19,13 +19,16 @@
 
 import re
 from threading import RLock
+import unittest
 
 from cylc.broadcast_report import (
     CHANGE_FMT, CHANGE_PREFIX_SET,
     get_broadcast_change_report,
     get_broadcast_bad_options_report)
 from cylc.cycling import PointParsingError
-from cylc.cycling.loader import get_point, standardise_point_string
+from cylc.cycling.loader import (
+    DefaultCycler, INTEGER_CYCLING_TYPE, get_point, standardise_point_string)
+from cylc.lru_cache import LRUCache
 from cylc.suite_logging import LOG
 from cylc.task_id import TaskID
 
@@ -36,10 +39,16 @@ class BroadcastMgr(object):
     Broadcast settings are stored in the form:
         self.broadcasts['*']['root'] = {'environment': {'FOO': 'bar'}}
         self.broadcasts['20100808T06Z']['root'] = {'script': 'stuff'}
+
+    Settings resolved for a task are cached in the form:
+        self._resolved['20100808T06Z']['foo'] = {'script': 'stuff', ...}
+    and invalidated for the affected points and namespaces on change.
     """
 
     ALL_CYCLE_POINTS_STRS = ["*", "all-cycle-points", "all-cycles"]
     REC_SECTION = re.compile(r"\[([^\]]+)\]")
+    # Maximum number of cycle points with cached resolved settings.
+    MAX_RESOLVED_POINTS = 100
 
     def __init__(self, suite_db_mgr):
         self.suite_db_mgr = suite_db_mgr
@@ -47,6 +56,8 @@ class BroadcastMgr(object):
         self.broadcasts = {}
         self.ext_triggers = {}  # Can use collections.Counter in future
         self.lock = RLock()
+        self._resolved = LRUCache(
+            "broadcast_mgr.get_broadcast", self.MAX_RESOLVED_POINTS)
 
     def add_ext_triggers(self, ext_trigger_queue):
         """Add external triggers from queue."""
@@ -102,6 +113,7 @@ class BroadcastMgr(object):
         # Prune any empty branches
         bad_options = self._get_bad_options(
             self._prune(), point_strings, namespaces, cancel_keys_list)
+        self._uncache(modified_settings)
 
         # Log the broadcast
         self.suite_db_mgr.put_broadcast(modified_settings, is_cancel=True)
@@ -129,7 +141,10 @@ class BroadcastMgr(object):
         return self.clear_broadcast(point_strings=point_strings)
 
     def get_broadcast(self, task_id=None):
-        """Retrieve all broadcast variables that target a given task ID."""
+        """Retrieve all broadcast variables that target a given task ID.
+
+        The returned dict is shared with later calls, so must not be modified.
+        """
         if task_id == "None":
             task_id = None
         if not task_id:
@@ -140,17 +155,28 @@ class BroadcastMgr(object):
         except ValueError:
             raise Exception("Can't split task_id %s" % task_id)
 
-        ret = {}
-        # The order is:
-        #    all:root -> all:FAM -> ... -> all:task
-        # -> tag:root -> tag:FAM -> ... -> tag:task
-        for cycle in self.ALL_CYCLE_POINTS_STRS + [point_string]:
-            if cycle not in self.broadcasts:
-                continue
-            for namespace in reversed(self.linearized_ancestors[name]):
-                if namespace in self.broadcasts[cycle]:
-                    self._addict(ret, self.broadcasts[cycle][namespace])
-        return ret
+        with self.lock:
+            try:
+                resolved_of_point = self._resolved[point_string]
+            except KeyError:
+                resolved_of_point = {}
+                self._resolved[point_string] = resolved_of_point
+            try:
+                return resolved_of_point[name]
+            except KeyError:
+                pass
+            ret = {}
+            # The order is:
+            #    all:root -> all:FAM -> ... -> all:task
+            # -> tag:root -> tag:FAM -> ... -> tag:task
+            for cycle in self.ALL_CYCLE_POINTS_STRS + [point_string]:
+                if cycle not in self.broadcasts:
+                    continue
+                for namespace in reversed(self.linearized_ancestors[name]):
+                    if namespace in self.broadcasts[cycle]:
+                        self._addict(ret, self.broadcasts[cycle][namespace])
+            resolved_of_point[name] = ret
+            return ret
 
     def load_db_broadcast_states(self, row_idx, row):
         """Load broadcast variables from runtime DB broadcast states row."""
@@ -170,6 +196,7 @@ class BroadcastMgr(object):
                 dict_.setdefault(section, {})
                 dict_ = dict_[section]
             dict_[cur_key] = value
+            self._uncache([(point, namespace, None)])
         LOG.info(CHANGE_FMT.strip() % {
             "change": CHANGE_PREFIX_SET,
             "point": point,
@@ -243,6 +270,8 @@ class BroadcastMgr(object):
                             modified_settings.append(
                                 (point_string, namespace, setting))
 
+        self._uncache(modified_settings)
+
         # Log the broadcast
         self.suite_db_mgr.put_broadcast(modified_settings)
         LOG.info(get_broadcast_change_report(modified_settings))
@@ -254,6 +283,12 @@ class BroadcastMgr(object):
             bad_options["namespaces"] = bad_namespaces
         return modified_settings, bad_options
 
+    def set_linearized_ancestors(self, linearized_ancestors):
+        """Set the namespace ancestors, e.g. on load or reload of suite."""
+        with self.lock:
+            self.linearized_ancestors = linearized_ancestors
+            self._resolved.clear()
+
     def _addict(self, target, source):
         """Recursively add source dict to target dict."""
         for key, val in source.items():
@@ -336,6 +371,25 @@ class BroadcastMgr(object):
                             prunes.append(keys + [key])
             return prunes
 
+    def _uncache(self, modified_settings):
+        """Discard cached resolved settings affected by modified_settings.
+
+        modified_settings is a list of (point_string, namespace, setting).
+        """
+        with self.lock:
+            for point_string, namespace, _ in modified_settings:
+                if point_string in self.ALL_CYCLE_POINTS_STRS:
+                    resolved_of_points = self._resolved.values()
+                elif point_string in self._resolved:
+                    resolved_of_points = [self._resolved[point_string]]
+                else:
+                    continue
+                for resolved_of_point in resolved_of_points:
+                    for name in list(resolved_of_point):
+                        if namespace in self.linearized_ancestors.get(
+                                name, [namespace]):
+                            del resolved_of_point[name]
+
     @staticmethod
     def _settings_to_keys_list(broadcasts):
         """Return a list containing each setting dict keys.
@@ -359,3 +413,74 @@ class BroadcastMgr(object):
                         else:
                             keys_list.append(keys + [key])
         return keys_list
+
+
+class TestBroadcastMgr(unittest.TestCase):
+    """Unit tests for the cache of resolved settings of BroadcastMgr."""
+
+    class FakeSuiteDatabaseManager(object):
+        """Suite database manager that records nothing."""
+
+        def put_broadcast(self, modified_settings, is_cancel=False):
+            """Do nothing."""
+            pass
+
+    def setUp(self):
+        self.cycling_type = DefaultCycler.TYPE
+        DefaultCycler.TYPE = INTEGER_CYCLING_TYPE
+        self.mgr = BroadcastMgr(self.FakeSuiteDatabaseManager())
+        self.mgr.set_linearized_ancestors({
+            'root': ['root'],
+            'FAM': ['FAM', 'root'],
+            'foo': ['foo', 'FAM', 'root'],
+            'bar': ['bar', 'root']})
+        self.mgr.put_broadcast(['*'], ['root'], [{'environment': {'X': 'a'}}])
+
+    def tearDown(self):
+        DefaultCycler.TYPE = self.cycling_type
+
+    def get_x(self, task_id):
+        """Return the broadcast value of X for task_id."""
+        return self.mgr.get_broadcast(task_id).get('environment', {}).get('X')
+
+    def test_put(self):
+        """Test that a task sees root and family settings put after a get."""
+        self.assertEqual(self.get_x('foo.1'), 'a')
+        self.mgr.put_broadcast(['*'], ['root'], [{'environment': {'X': 'b'}}])
+        self.assertEqual(self.get_x('foo.1'), 'b')
+        self.mgr.put_broadcast(['1'], ['FAM'], [{'environment': {'X': 'c'}}])
+        self.assertEqual(self.get_x('foo.1'), 'c')
+        self.assertEqual(self.get_x('bar.1'), 'b')
+        self.assertEqual(self.get_x('foo.2'), 'b')
+
+    def test_clear(self):
+        """Test that a task no longer sees settings cleared after a get."""
+        self.mgr.put_broadcast(['1'], ['FAM'], [{'environment': {'X': 'b'}}])
+        self.assertEqual(self.get_x('foo.1'), 'b')
+        self.mgr.clear_broadcast(namespaces=['FAM'])
+        self.assertEqual(self.get_x('foo.1'), 'a')
+        self.mgr.clear_broadcast(namespaces=['root'])
+        self.assertEqual(self.get_x('foo.1'), None)
+
+    def test_expire(self):
+        """Test that a task no longer sees settings expired after a get."""
+        self.mgr.put_broadcast(['1'], ['FAM'], [{'environment': {'X': 'b'}}])
+        self.assertEqual(self.get_x('foo.1'), 'b')
+        self.mgr.expire_broadcast('2')
+        self.assertEqual(self.get_x('foo.1'), 'a')
+
+    def test_reload(self):
+        """Test that a task sees settings of its new family after a reload."""
+        self.mgr.put_broadcast(['1'], ['FAM'], [{'environment': {'X': 'b'}}])
+        self.assertEqual(self.get_x('foo.1'), 'b')
+        self.mgr.set_linearized_ancestors({
+            'root': ['root'],
+            'FAM': ['FAM', 'root'],
+            'foo': ['foo', 'root'],
+            'bar': ['bar', 'FAM', 'root']})
+        self.assertEqual(self.get_x('foo.1'), 'a')
+        self.assertEqual(self.get_x('bar.1'), 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
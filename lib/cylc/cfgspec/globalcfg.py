@@ -41,6 +41,10 @@ coercers['interval_list'] = coerce_interval_list
 
 SPEC = {
     'process pool size': vdr(vtype='integer', default=4),
+    'main loop minimum interval': vdr(
+        vtype='interval', default=DurationFloat(0.1)),
+    'main loop maximum interval': vdr(
+        vtype='interval', default=DurationFloat(1)),
     'temporary directory': vdr(vtype='string'),
     'state dump rolling archive length': vdr(
         vtype='integer', default=10),
@@ -91,6 +95,26 @@ SPEC = {
         'maximum size in bytes': vdr(vtype='integer', default=1000000),
     },
 
+    'suite database': {
+        'persistent connection': vdr(vtype='boolean', default=True),
+        'journal mode': vdr(
+            vtype='string', options=["delete", "wal"], default="delete"),
+        'synchronous': vdr(
+            vtype='string', options=["off", "normal", "full", ""]),
+        'cache size': vdr(vtype='integer'),
+        'mmap size': vdr(vtype='integer'),
+        'checkpoint interval': vdr(
+            vtype='interval', default=DurationFloat(300)),
+        'public database writer': vdr(
+            vtype='string', options=["synchronous", "thread"],
+            default="synchronous"),
+        'public database buffer size': vdr(vtype='integer', default=100),
+        'archive cycle point offset': vdr(vtype='string'),
+        'archive age': vdr(vtype='interval'),
+        'archive interval': vdr(
+            vtype='interval', default=DurationFloat(3600)),
+    },
+
     'documentation': {
         'files': {
             'html index': vdr(
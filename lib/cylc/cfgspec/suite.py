@@ -561,7 +561,7 @@ def upg(cfg, descr):
 class RawSuiteConfig(config):
     """Raw suite configuration."""
 
-    def __init__(self, fpath, output_fname, tvars):
+    def __init__(self, fpath, output_fname, tvars, cache_dir=None):
         """Return the default instance."""
         config.__init__(self, SPEC, upg, output_fname, tvars)
-        self.loadcfg(fpath, "suite definition")
+        self.loadcfg(fpath, "suite definition", cache_dir)
@@ -42,6 +42,7 @@ from cylc.cycling import IntervalParsingError
 from cylc.envvar import check_varnames
 import cylc.flags
 from cylc.graphnode import GraphNodeParser, GraphNodeError
+from cylc.hostuserutil import get_user
 from cylc.print_tree import print_tree
 from cylc.taskdef import TaskDef, TaskDefError
 from cylc.task_id import TaskID
@@ -154,8 +155,16 @@ class SuiteConfig(object):
 
         # parse, upgrade, validate the suite, but don't expand with default
         # items
+        # Cache processing in the service directory of own suites
+        cache_dir = None
+        if not owner or owner == get_user():
+            srv_dir = SuiteSrvFilesManager().get_suite_srv_dir(suite)
+            if os.path.isdir(srv_dir):
+                cache_dir = os.path.join(
+                    srv_dir, SuiteSrvFilesManager.DIR_BASE_CACHE)
         self.mem_log("config.py: before RawSuiteConfig init")
-        self.pcfg = RawSuiteConfig(fpath, output_fname, template_vars)
+        self.pcfg = RawSuiteConfig(
+            fpath, output_fname, template_vars, cache_dir)
         self.mem_log("config.py: after RawSuiteConfig init")
         self.mem_log("config.py: before get(sparse=True")
         self.cfg = self.pcfg.get(sparse=True)
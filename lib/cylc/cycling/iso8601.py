@@ -21,11 +21,12 @@
 import re
 import unittest
 
-from isodatetime.data import Calendar, Duration
+from isodatetime.data import CALENDAR, Calendar, Duration, TimePoint
 from isodatetime.dumpers import TimePointDumper
 from isodatetime.parsers import TimePointParser, DurationParser
 from isodatetime.timezone import (
     get_local_time_zone, get_local_time_zone_format)
+from cylc.lru_cache import LRUCache
 from cylc.time_parser import CylcTimeParser
 from cylc.cycling import (
     PointBase, IntervalBase, SequenceBase, ExclusionBase, PointParsingError,
@@ -41,6 +42,9 @@ DATE_TIME_FORMAT = "CCYYMMDDThhmm"
 EXPANDED_DATE_TIME_FORMAT = "+XCCYYMMDDThhmm"
 NEW_DATE_TIME_REC = re.compile("T")
 
+UNIX_EPOCH_POINT = TimePoint(
+    **CALENDAR.UNIX_EPOCH_DATE_TIME_REFERENCE_PROPERTIES)
+
 WARNING_PARSE_EXPANDED_YEAR_DIGITS = (
     "(incompatible with [cylc]cycle point num expanded year digits = %s ?)")
 
@@ -50,6 +54,8 @@ class SuiteSpecifics(object):
     """Store suite-setup-specific constants and utilities here."""
     ASSUMED_TIME_ZONE = None
     DUMP_FORMAT = None
+    DUMP_KEY_ORIGIN = None
+    DUMP_KEY_RESOLUTION = None
     NUM_EXPANDED_YEAR_DIGITS = None
     abbrev_util = None
     interval_parser = None
@@ -63,11 +69,11 @@ def memoize(function):
     The inputs and results of the function must be immutable.
     Keyword arguments are not allowed.
 
-    To avoid memory leaks, only the first 10000 separate input
-    permutations are cached for a given function.
+    To avoid memory leaks, results are kept for the 10000 most recently
+    used input permutations for a given function.
 
     """
-    inputs_results = {}
+    inputs_results = LRUCache("iso8601." + function.__name__, MEMOIZE_LIMIT)
 
     def _wrapper(*args):
         """Cache results for function(*args)."""
@@ -75,9 +81,6 @@ def memoize(function):
             return inputs_results[args]
         except KeyError:
             results = function(*args)
-            if len(inputs_results) > MEMOIZE_LIMIT:
-                # Full up, no more room.
-                inputs_results.popitem()
             inputs_results[args] = results
             return results
     return _wrapper
@@ -85,12 +88,23 @@ def memoize(function):
 
 class ISO8601Point(PointBase):
 
-    """A single point in an ISO8601 date time sequence."""
+    """A single point in an ISO8601 date time sequence.
+
+    Alongside the canonical string value, a point caches a numeric key: the
+    number of seconds since the Unix epoch in the current calendar mode.
+    Comparison, hashing and addition or subtraction of fixed-length
+    intervals use the key, so they do not need to re-parse the string.
+
+    """
 
     TYPE = CYCLER_TYPE_ISO8601
     TYPE_SORT_KEY = CYCLER_TYPE_SORT_KEY_ISO8601
 
-    __slots__ = ('value')
+    __slots__ = ('value', '_key')
+
+    def __init__(self, value, key=None):
+        super(ISO8601Point, self).__init__(value)
+        self._key = key
 
     @classmethod
     def from_nonstandard_string(cls, point_string):
@@ -99,7 +113,12 @@ class ISO8601Point(PointBase):
 
     def add(self, other):
         """Add an Interval to self."""
-        return ISO8601Point(self._iso_point_add(self.value, other.value))
+        seconds = self._get_dump_safe_seconds(other)
+        if seconds is None:
+            return ISO8601Point(self._iso_point_add(self.value, other.value))
+        return ISO8601Point(
+            self._iso_point_add(self.value, other.value),
+            self._key + seconds)
 
     def __cmp__(self, other):
         # Compare other (point) to self.
@@ -109,7 +128,17 @@ class ISO8601Point(PointBase):
             return cmp(self.TYPE_SORT_KEY, other.TYPE_SORT_KEY)
         if self.value == other.value:
             return 0
-        return self._iso_point_cmp(self.value, other.value)
+        key = self.get_key()
+        other_key = other.get_key()
+        if key is None or other_key is None:
+            return self._iso_point_cmp(self.value, other.value)
+        return cmp(key, other_key)
+
+    def get_key(self):
+        """Return seconds since the Unix epoch, or None if truncated."""
+        if self._key is None:
+            self._key = _point_key(self.value, Calendar.default().mode)
+        return self._key
 
     def standardise(self):
         """Reformat self.value into a standard representation."""
@@ -122,18 +151,51 @@ class ISO8601Point(PointBase):
             else:
                 message = str(exc)
             raise PointParsingError(type(self), self.value, message)
+        self._key = None
         return self
 
     def sub(self, other):
         """Subtract a Point or Interval from self."""
+        key = self.get_key()
         if isinstance(other, ISO8601Point):
-            return ISO8601Interval(
-                self._iso_point_sub_point(self.value, other.value))
+            other_key = other.get_key()
+            if key is None or other_key is None or key < other_key:
+                # Negative differences are left to isodatetime, which does
+                # not always normalise them.
+                return ISO8601Interval(
+                    self._iso_point_sub_point(self.value, other.value))
+            return ISO8601Interval(_seconds_interval(key - other_key))
+        seconds = self._get_dump_safe_seconds(other)
+        if seconds is None:
+            return ISO8601Point(
+                self._iso_point_sub_interval(self.value, other.value))
         return ISO8601Point(
-            self._iso_point_sub_interval(self.value, other.value))
+            self._iso_point_sub_interval(self.value, other.value),
+            self._key - seconds)
 
     def __hash__(self):
-        return hash(self.value)
+        key = self.get_key()
+        if key is None:
+            return hash(self.value)
+        return hash(key)
+
+    def _get_dump_safe_seconds(self, interval):
+        """Return the length of interval in seconds, if safe to add to key.
+
+        The key of self +/- interval can only be worked out from the two
+        numbers if interval has a fixed length and the result can be written
+        in the dump format without losing precision. Otherwise return None.
+
+        """
+        key = self.get_key()
+        seconds = _interval_seconds(interval.value)
+        resolution = SuiteSpecifics.DUMP_KEY_RESOLUTION
+        if key is None or seconds is None or resolution is None:
+            return None
+        if (seconds % resolution or
+                (key - SuiteSpecifics.DUMP_KEY_ORIGIN) % resolution):
+            return None
+        return seconds
 
     @staticmethod
     @memoize
@@ -330,8 +392,8 @@ class ISO8601Sequence(SequenceBase):
     __slots__ = ('dep_section', 'context_start_point', 'context_end_point',
                  'offset', '_cached_first_point_values',
                  '_cached_next_point_values', '_cached_valid_point_booleans',
-                 '_cached_recent_valid_points', 'spec', 'abbrev_util',
-                 'recurrence', 'exclusions', 'step', 'value')
+                 '_cached_recent_valid_points', '_fixed_step', 'spec',
+                 'abbrev_util', 'recurrence', 'exclusions', 'step', 'value')
 
     @classmethod
     def get_async_expr(cls, start_point=None):
@@ -364,9 +426,12 @@ class ISO8601Sequence(SequenceBase):
 
         self.offset = ISO8601Interval.get_null()
 
-        self._cached_first_point_values = {}
-        self._cached_next_point_values = {}
-        self._cached_valid_point_booleans = {}
+        self._cached_first_point_values = LRUCache(
+            "ISO8601Sequence first points", self._MAX_CACHED_POINTS)
+        self._cached_next_point_values = LRUCache(
+            "ISO8601Sequence next points", self._MAX_CACHED_POINTS)
+        self._cached_valid_point_booleans = LRUCache(
+            "ISO8601Sequence valid points", self._MAX_CACHED_POINTS)
         self._cached_recent_valid_points = []
 
         self.spec = dep_section
@@ -404,6 +469,7 @@ class ISO8601Sequence(SequenceBase):
                 pass
 
         self.step = ISO8601Interval(str(self.recurrence.duration))
+        self._set_fixed_step()
         self.value = str(self.recurrence)
         # Concatenate the strings in exclusion list
         if self.exclusions:
@@ -423,20 +489,131 @@ class ISO8601Sequence(SequenceBase):
             self.recurrence.start_point += interval_parse(str(i_offset))
         if self.recurrence.end_point is not None:
             self.recurrence.end_point += interval_parse(str(i_offset))
-        self._cached_first_point_values = {}
-        self._cached_next_point_values = {}
-        self._cached_valid_point_booleans = {}
+        self._cached_first_point_values.clear()
+        self._cached_next_point_values.clear()
+        self._cached_valid_point_booleans.clear()
         self._cached_recent_valid_points = []
+        self._set_fixed_step()
         self.value = str(self.recurrence) + '!' + str(self.exclusions)
         if self.exclusions:
             self.value += '!' + str(self.exclusions)
 
+    def _set_fixed_step(self):
+        """Set up arithmetic on point keys, if the recurrence allows it.
+
+        This needs a forward recurrence with a start point and a step of
+        fixed length (no years or months), where the start point and the
+        step can be written in the cycle point format without losing
+        precision. Points on the sequence are then start + n * step, for
+        integer n >= 0, between the bounds of the recurrence.
+
+        """
+        self._fixed_step = None
+        recurrence = self.recurrence
+        resolution = SuiteSpecifics.DUMP_KEY_RESOLUTION
+        if (recurrence.format_number not in (3, 4) or
+                recurrence.start_point is None or
+                recurrence.repetitions == 1 or
+                resolution is None):
+            return
+        step = _interval_seconds(str(recurrence.duration))
+        if not step or step < 0 or step % resolution:
+            return
+        anchor = ISO8601Point(str(recurrence.start_point))
+        anchor_key = _timepoint_key(recurrence.start_point)
+        if (anchor_key is None or anchor.get_key() != anchor_key or
+                (anchor_key - SuiteSpecifics.DUMP_KEY_ORIGIN) % resolution):
+            return
+        lower = anchor_key
+        if recurrence.min_point is not None:
+            min_key = _timepoint_key(recurrence.min_point)
+            if min_key is None:
+                return
+            lower = max(lower, min_key)
+        upper = None
+        for bound in (recurrence.end_point, recurrence.max_point):
+            if bound is not None:
+                bound_key = _timepoint_key(bound)
+                if bound_key is None:
+                    return
+                if upper is None or bound_key < upper:
+                    upper = bound_key
+        self._fixed_step = (anchor, step, lower, upper)
+
+    def _get_fixed_step_key(self, key, direction):
+        """Return the key of an on-sequence point near key, or None.
+
+        direction is one of "<", "<=", ">=", ">", for the nearest point
+        before, at or before, at or after, or after key. Exclusions are not
+        considered here.
+
+        """
+        anchor, step, lower, upper = self._fixed_step
+        anchor_key = anchor.get_key()
+        num_steps, remainder = divmod(key - anchor_key, step)
+        if direction == "<":
+            if not remainder:
+                num_steps -= 1
+        elif direction == ">=":
+            if remainder:
+                num_steps += 1
+        elif direction == ">":
+            num_steps += 1
+        grid_key = anchor_key + num_steps * step
+        if direction in ("<", "<="):
+            if upper is not None and grid_key > upper:
+                grid_key = anchor_key + ((upper - anchor_key) // step) * step
+            if grid_key < lower:
+                return None
+        else:
+            if grid_key < lower:
+                num_steps = -((anchor_key - lower) // step)
+                grid_key = anchor_key + num_steps * step
+            if upper is not None and grid_key > upper:
+                return None
+        return grid_key
+
+    def _get_fixed_step_point(self, point, key):
+        """Return the on-sequence point for key.
+
+        The point is worked out by adding or subtracting the difference
+        from the nearer of point and the sequence anchor.
+
+        """
+        base = point
+        anchor = self._fixed_step[0]
+        if abs(anchor.get_key() - key) < abs(point.get_key() - key):
+            base = anchor
+        diff = key - base.get_key()
+        if diff < 0:
+            return base - ISO8601Interval(_seconds_interval(-diff))
+        return base + ISO8601Interval(_seconds_interval(diff))
+
+    def _get_fixed_step_next_point(self, point, direction):
+        """Return the next on-sequence point, honouring exclusions.
+
+        direction is ">" or ">=", as for self._get_fixed_step_key.
+
+        """
+        key = self._get_fixed_step_key(point.get_key(), direction)
+        while key is not None:
+            next_point = self._get_fixed_step_point(point, key)
+            if not self.exclusions or next_point not in self.exclusions:
+                return next_point
+            key = self._get_fixed_step_key(key, ">")
+        return None
+
     def is_on_sequence(self, point):
         """Return True if point is on-sequence."""
         # Iterate starting at recent valid points, for speed.
         if self.exclusions and point in self.exclusions:
             return False
 
+        if self._fixed_step is not None and point.get_key() is not None:
+            return (
+                self._get_fixed_step_key(point.get_key(), "<=") ==
+                point.get_key())
+
         for valid_point in reversed(self._cached_recent_valid_points):
             if valid_point == point:
                 return True
@@ -457,9 +634,6 @@ class ISO8601Sequence(SequenceBase):
             return self._cached_valid_point_booleans[point.value]
         except KeyError:
             is_valid = self.is_on_sequence(point)
-            if (len(self._cached_valid_point_booleans) >
-                    self._MAX_CACHED_POINTS):
-                self._cached_valid_point_booleans.popitem()
             self._cached_valid_point_booleans[point.value] = is_valid
             return is_valid
 
@@ -486,6 +660,14 @@ class ISO8601Sequence(SequenceBase):
         """Return the largest point < some arbitrary point."""
         if self.is_on_sequence(point):
             return self.get_prev_point(point)
+        if self._fixed_step is not None and point.get_key() is not None:
+            key = self._get_fixed_step_key(point.get_key(), "<")
+            if key is None:
+                return None
+            nearest_point = self._get_fixed_step_point(point, key)
+            if self.exclusions and nearest_point in self.exclusions:
+                return self.get_prev_point(nearest_point)
+            return nearest_point
         p_iso_point = point_parse(point.value)
         prev_iso_point = None
 
@@ -517,6 +699,8 @@ class ISO8601Sequence(SequenceBase):
             return ISO8601Point(self._cached_next_point_values[point.value])
         except KeyError:
             pass
+        if self._fixed_step is not None and point.get_key() is not None:
+            return self._get_fixed_step_next_point(point, ">")
         # Iterate starting at recent valid points, for speed.
         for valid_point in reversed(self._cached_recent_valid_points):
             if valid_point >= point:
@@ -552,13 +736,10 @@ class ISO8601Sequence(SequenceBase):
             )
 
         # Cache the answer for point -> next_point.
-        if (len(self._cached_next_point_values) >
-                self._MAX_CACHED_POINTS):
-            self._cached_next_point_values.popitem()
         self._cached_next_point_values[point.value] = next_point.value
 
         # Cache next_point as a valid starting point for this recurrence.
-        if (len(self._cached_next_point_values) >
+        if (len(self._cached_recent_valid_points) >
                 self._MAX_CACHED_POINTS):
             self._cached_recent_valid_points.pop(0)
         self._cached_recent_valid_points.append(next_point)
@@ -586,6 +767,8 @@ class ISO8601Sequence(SequenceBase):
             return ISO8601Point(self._cached_first_point_values[point.value])
         except KeyError:
             pass
+        if self._fixed_step is not None and point.get_key() is not None:
+            return self._get_fixed_step_next_point(point, ">=")
         p_iso_point = point_parse(point.value)
         for recurrence_iso_point in self.recurrence:
             if recurrence_iso_point >= p_iso_point:
@@ -594,9 +777,6 @@ class ISO8601Sequence(SequenceBase):
                 # Check multiple exclusions
                 if ret and ret in self.exclusions:
                     return self.get_next_point_on_sequence(ret)
-                if (len(self._cached_first_point_values) >
-                        self._MAX_CACHED_POINTS):
-                    self._cached_first_point_values.popitem()
                 self._cached_first_point_values[point.value] = (
                     first_point_value)
                 return ret
@@ -710,6 +890,9 @@ def init(num_expanded_year_digits=0, custom_dump_format=None, time_zone=None,
         assumed_time_zone=time_zone_hours_minutes
     )
 
+    SuiteSpecifics.DUMP_KEY_ORIGIN, SuiteSpecifics.DUMP_KEY_RESOLUTION = (
+        _get_dump_key_resolution())
+
     SuiteSpecifics.iso8601_parsers = CylcTimeParser.initiate_parsers(
         dump_format=SuiteSpecifics.DUMP_FORMAT,
         num_expanded_year_digits=num_expanded_year_digits,
@@ -721,6 +904,32 @@ def init(num_expanded_year_digits=0, custom_dump_format=None, time_zone=None,
     )
 
 
+def _get_dump_key_resolution():
+    """Return the key of a point and the precision of the dump format.
+
+    Return the (point key, seconds) for the finest of second, minute, hour
+    and day that survives a round trip through SuiteSpecifics.DUMP_FORMAT.
+    Return (None, None) if none of them survives.
+
+    """
+    hours, minutes = SuiteSpecifics.ASSUMED_TIME_ZONE
+    point = TimePoint(
+        expanded_year_digits=SuiteSpecifics.NUM_EXPANDED_YEAR_DIGITS,
+        year=2000, month_of_year=1, day_of_month=1, hour_of_day=0,
+        minute_of_hour=0, second_of_minute=0, time_zone_hour=hours,
+        time_zone_minute=minutes, dump_format=SuiteSpecifics.DUMP_FORMAT)
+    mode = Calendar.default().mode
+    try:
+        origin = _point_key(str(point), mode)
+        for resolution in (1, 60, 3600, 86400):
+            other = point + Duration(seconds=resolution)
+            if _point_key(str(other), mode) - origin == resolution:
+                return origin, resolution
+    except (TypeError, ValueError):
+        pass
+    return None, None
+
+
 def get_point_relative(offset_string, base_point):
     """Create a point from offset_string applied to base_point."""
     try:
@@ -763,6 +972,71 @@ def _interval_parse(interval_string):
     return SuiteSpecifics.interval_parser.parse(interval_string)
 
 
+@memoize
+def _interval_seconds(interval_string):
+    """Return the length of interval_string in seconds.
+
+    Return None if the interval has years or months, which do not have a
+    fixed length.
+
+    """
+    interval = interval_parse(interval_string)
+    if interval.years or interval.months:
+        return None
+    return _get_seconds(interval)
+
+
+@memoize
+def _point_key(point_string, calendar_mode):
+    """Return seconds since the Unix epoch for point_string.
+
+    The result depends on calendar_mode, which is only passed in so that
+    results are not reused across calendar modes. Return None for a
+    truncated point or a date not in the calendar, which cannot be placed
+    on the time line.
+
+    """
+    return _timepoint_key(_point_parse(point_string))
+
+
+def _timepoint_key(timepoint):
+    """Return seconds since the Unix epoch for a TimePoint, or None."""
+    if timepoint.truncated:
+        return None
+    try:
+        return _get_seconds(timepoint - UNIX_EPOCH_POINT)
+    except ValueError:
+        return None
+
+
+def _get_seconds(duration):
+    """Return the seconds of a Duration, as an int if it is a whole number.
+
+    Duration.get_seconds returns a float for any duration, because it allows
+    for years and months.
+
+    """
+    seconds = duration.get_seconds()
+    if seconds == int(seconds):
+        return int(seconds)
+    return seconds
+
+
+@memoize
+def _seconds_interval(seconds):
+    """Return an interval string for a non-negative number of seconds.
+
+    This gives the same representation as the difference between two points.
+
+    """
+    minutes, seconds = divmod(seconds, CALENDAR.SECONDS_IN_MINUTE)
+    hours, minutes = divmod(minutes, CALENDAR.MINUTES_IN_HOUR)
+    days, hours = divmod(hours, CALENDAR.HOURS_IN_DAY)
+    return str(Duration(
+        days=int(days), hours=int(hours), minutes=int(minutes),
+        seconds=seconds))
+
+
 def point_parse(point_string):
     """Parse a point_string into a proper TimePoint object."""
     return _point_parse(point_string).copy()
@@ -1285,6 +1559,84 @@ class TestISO8601Sequence(unittest.TestCase):
         self.assertFalse(
             sequence.is_on_sequence(ISO8601Point('20100809T0005')))
 
+    def test_fixed_step(self):
+        """Test sequences with fixed-length steps, computed arithmetically.
+
+        Results are compared with those of iterating the recurrence.
+
+        """
+        init(time_zone='Z')
+        base = ISO8601Point('20000101T0000Z')
+        for spec in ['PT6H', 'PT1H!(T00, T06)', 'R5/20000102T00Z/PT12H',
+                     'R/T0030/P1D']:
+            sequence = ISO8601Sequence(
+                spec, '20000101T0030Z', '20000110T0000Z')
+            self.assertTrue(sequence._fixed_step is not None)
+            iter_sequence = ISO8601Sequence(
+                spec, '20000101T0030Z', '20000110T0000Z')
+            iter_sequence._fixed_step = None
+            for num_minutes in range(-120, 14400, 1999):
+                point = base + ISO8601Interval('PT%dM' % num_minutes)
+                for method in ['is_on_sequence', 'get_next_point',
+                               'get_first_point']:
+                    self.assertEqual(
+                        str(getattr(sequence, method)(point)),
+                        str(getattr(iter_sequence, method)(point)))
+        sequence = ISO8601Sequence('P1M', '20000101T0000Z')
+        self.assertTrue(sequence._fixed_step is None)
+
+
+class TestISO8601Point(unittest.TestCase):
+    """Contains unit tests for the ISO8601Point class."""
+
+    def test_key_cmp_hash(self):
+        """Test points compare and hash by their instant in time."""
+        init(time_zone='Z')
+        point = ISO8601Point('20000101T0000Z')
+        other = ISO8601Point('20000101T0130+0130')
+        self.assertEqual(point.get_key(), 946684800)
+        self.assertEqual(point, other)
+        self.assertEqual(hash(point), hash(other))
+        self.assertTrue(point < ISO8601Point('20000101T0001Z'))
+        self.assertTrue(point > ISO8601Point('19991231T2359Z'))
+        self.assertEqual(
+            sorted([ISO8601Point('20000102T0000Z'), point,
+                    ISO8601Point('19000101T0000Z')]),
+            [ISO8601Point('19000101T0000Z'), point,
+             ISO8601Point('20000102T0000Z')])
+
+    def test_key_add_sub(self):
+        """Test the keys of points from adding or subtracting intervals."""
+        # Use different points per calendar mode, as the memoized string
+        # arithmetic does not depend on the mode.
+        for cycling_mode, point_string in [
+                ('gregorian', '20000227T1200Z'), ('360day', '20010227T1200Z')]:
+            init(time_zone='Z', cycling_mode=cycling_mode)
+            point = ISO8601Point(point_string)
+            for interval_string in ['PT6H', '-P1DT1M', 'P2W', 'P1M', 'P1Y']:
+                interval = ISO8601Interval(interval_string)
+                for result in (point + interval, point - interval):
+                    self.assertEqual(
+                        result.get_key(),
+                        ISO8601Point(result.value).get_key())
+            later = point + ISO8601Interval('P4DT1H30M')
+            self.assertEqual(
+                later - point,
+                ISO8601Interval(ISO8601Point._iso_point_sub_point(
+                    later.value, point.value)))
+        init(time_zone='Z', cycling_mode='gregorian')
+
+    def test_key_add_lossy_dump_format(self):
+        """Test adding intervals finer than the dump format."""
+        init(time_zone='Z', custom_dump_format='CCYYMMDDThhZ')
+        self.assertEqual(SuiteSpecifics.DUMP_KEY_RESOLUTION, 3600)
+        point = ISO8601Point('29010101T00Z')
+        result = point + ISO8601Interval('PT30M')
+        self.assertEqual(result.get_key(), point.get_key())
+        result = point + ISO8601Interval('PT2H')
+        self.assertEqual(result.get_key(), point.get_key() + 7200)
+        init(time_zone='Z')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -18,7 +18,6 @@
 
 import errno
 import os
-import sqlite3
 import sys
 from cylc.rundb import CylcSuiteDAO
 from cylc.task_state import (
@@ -27,8 +26,17 @@ from cylc.task_state import (
     TASK_STATUS_RETRYING)
 
 
+class CylcSuiteDBCheckerDAO(CylcSuiteDAO):
+    """Data access object for reading a suite database and its archives."""
+
+    CONN_TIMEOUT = 10.0
+
+
 class CylcSuiteDBChecker(object):
     """Object for querying a suite database"""
+    # Number of tasks selected by each statement of "task_states_query", 2
+    # parameters each, within the default SQLite limit of 999 parameters.
+    MAX_TASKS_PER_QUERY = 400
     STATE_ALIASES = {
         'finish': [TASK_STATUS_FAILED, TASK_STATUS_SUCCEEDED],
         'start': [
@@ -42,13 +50,21 @@ class CylcSuiteDBChecker(object):
         'succeed': [TASK_STATUS_SUCCEEDED],
     }
 
-    def __init__(self, rund, suite):
+    def __init__(self, rund, suite, conn_timeout=None):
+        """Connect to the database of suite in run directory rund.
+
+        If conn_timeout is set, wait that many seconds for a locked
+        database, instead of CylcSuiteDBCheckerDAO.CONN_TIMEOUT.
+        """
         db_path = os.path.join(
             os.path.expanduser(rund), suite, "log",
             CylcSuiteDAO.DB_FILE_BASE_NAME)
         if not os.path.exists(db_path):
             raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), db_path)
-        self.conn = sqlite3.connect(db_path, timeout=10.0)
+        self.dao = CylcSuiteDBCheckerDAO(db_path, is_public=True)
+        if conn_timeout is not None:
+            self.dao.CONN_TIMEOUT = conn_timeout
+        self.conn = self.dao.connect()
 
     @staticmethod
     def display_maps(res):
@@ -66,10 +82,11 @@ class CylcSuiteDBChecker(object):
                 ['cycle_point_format']):
             return row[0]
 
-    def state_lookup(self, state):
+    @classmethod
+    def state_lookup(cls, state):
         """allows for multiple states to be searched via a status alias"""
-        if state in self.STATE_ALIASES:
-            return self.STATE_ALIASES[state]
+        if state in cls.STATE_ALIASES:
+            return cls.STATE_ALIASES[state]
         else:
             return [state]
 
@@ -106,12 +123,34 @@ class CylcSuiteDBChecker(object):
             stmt += " where " + (" AND ").join(stmt_wheres)
 
         res = []
-        for row in self.conn.execute(stmt, stmt_args):
+        for row in self.dao.execute_with_archives(stmt, stmt_args):
             if not all(v is None for v in row):
                 res.append(list(row))
 
         return res
 
+    def task_states_query(self, task_cycles):
+        """Return the statuses of many tasks, selected in batches.
+
+        task_cycles should be an iterable of (task, cycle). Return
+        {(task, cycle): status, ...} for the tasks found in the database.
+        """
+        ret = {}
+        task_cycles = list(task_cycles)
+        for i in range(0, len(task_cycles), self.MAX_TASKS_PER_QUERY):
+            batch = task_cycles[i:i + self.MAX_TASKS_PER_QUERY]
+            stmt = "SELECT name, cycle, status FROM %s WHERE %s" % (
+                CylcSuiteDAO.TABLE_TASK_STATES,
+                " OR ".join(["(name==? AND cycle==?)"] * len(batch)))
+            stmt_args = []
+            for task, cycle in batch:
+                stmt_args += [task, cycle]
+            for name, cycle, status in self.dao.execute_with_archives(
+                    stmt, stmt_args):
+                # Live rows come before archived rows
+                ret.setdefault((name, cycle), status)
+        return ret
+
     def task_state_getter(self, task, cycle):
         """used to get the state of a particular task at a particular cycle"""
         return self.suite_state_query(task, cycle, mask="status")[0]
@@ -58,6 +58,8 @@ class Updater(threading.Thread):
         self.cfg = app.cfg
         self.info_bar = app.info_bar
         self.full_mode = True
+        self.summary_revision = None
+        self.summary_run_id = None
 
         self.err_log_lines = []
         self.task_list = []
@@ -109,6 +111,8 @@ class Updater(threading.Thread):
         if cylc.flags.debug:
             sys.stderr.write("%s NOT CONNECTED\n" % get_current_time_string())
         self.full_mode = True
+        self.summary_revision = None
+        self.summary_run_id = None
         self.connected = False
         self.set_status(SUITE_STATUS_STOPPED)
         self.update_interval += 1.0
@@ -239,7 +243,10 @@ class Updater(threading.Thread):
                 self.cfg.suite, self.cfg.owner, self.cfg.host, self.cfg.port,
                 self.cfg.comms_timeout, self.cfg.my_uuid)
         try:
-            my_state = self.client.get_latest_state(full_mode=self.full_mode)
+            my_state = self.client.get_latest_state(
+                full_mode=self.full_mode,
+                summary_revision=self.summary_revision,
+                summary_run_id=self.summary_run_id)
         except ClientError:
             # Bad credential, suite not running, starting up or just stopped?
             if cylc.flags.debug:
@@ -289,6 +296,12 @@ class Updater(threading.Thread):
         if 'summary' in my_state and my_state['summary'][0]:
             self._update_state_summary(my_state)
             is_updated = True
+        elif 'summary_delta' in my_state:
+            self._update_state_summary_delta(my_state)
+            is_updated = True
+        if 'summary_revision' in my_state:
+            self.summary_revision = my_state['summary_revision']
+            self.summary_run_id = my_state.get('summary_run_id')
         if self.status in [SUITE_STATUS_INITIALISING, SUITE_STATUS_STOPPING]:
             gobject.idle_add(self.info_bar.prog_bar_start, self.status)
         elif self.is_reloading:
@@ -324,6 +337,31 @@ class Updater(threading.Thread):
     def _update_state_summary(self, my_state):
         """Display suite summary."""
         glbl, states, fam_states = my_state['summary']
+        if self.restricted_display:
+            states = self.filter_for_restricted_display(states)
+        self._set_state_summary(glbl, states, fam_states)
+
+    def _update_state_summary_delta(self, my_state):
+        """Display suite summary, after applying changes to it."""
+        glbl, task_changes, fam_changes, pruned_ids = (
+            my_state['summary_delta'][1:])
+        # Copy, as the views may be reading the current ones.
+        states = dict(self.full_state_summary)
+        fam_states = dict(self.full_fam_state_summary)
+        for id_ in pruned_ids:
+            states.pop(id_, None)
+            fam_states.pop(id_, None)
+        if self.restricted_display:
+            for id_ in set(task_changes) - set(
+                    self.filter_for_restricted_display(task_changes)):
+                states.pop(id_, None)
+                del task_changes[id_]
+        states.update(task_changes)
+        fam_states.update(fam_changes)
+        self._set_state_summary(glbl, states, fam_states)
+
+    def _set_state_summary(self, glbl, states, fam_states):
+        """Set and display suite summary."""
         self.mode = glbl['run_mode']
 
         if self.cfg.use_defn_order:
@@ -335,9 +373,6 @@ class Updater(threading.Thread):
         self.update_time_str = time2str(glbl['last_updated'])
         self.global_summary = glbl
 
-        if self.restricted_display:
-            states = self.filter_for_restricted_display(states)
-
         self.full_state_summary = states
         self.full_fam_state_summary = fam_states
         self.refilter()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Timings and counters of named phases of the scheduler main loop.
+
+Rolling statistics of scheduler profile amounts over a time window.
+"""
+
+from bisect import bisect_left
+from math import floor, log10
+import os
+from threading import Lock
+from time import time
+import unittest
+
+
+def get_cpu_times():
+    """Return (user, system) CPU time in seconds of this process."""
+    times = os.times()
+    return (times[0], times[1])
+
+
+def get_memory():
+    """Return the resident set size in KiB of this process, or None."""
+    try:
+        with open('/proc/%d/status' % os.getpid()) as handle:
+            for line in handle:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (IOError, IndexError, ValueError):
+        pass
+    return None
+
+
+class RollingStats(object):
+    """Rolling statistics of a series of amounts over a time window.
+
+    Amounts are aggregated into a ring buffer of fixed width time buckets,
+    e.g. one per second over 15 minutes. Each bucket holds the sum, count,
+    minimum and maximum of its amounts, and a histogram with logarithmic bins,
+    HIST_BINS_PER_DECADE per decade, for approximate percentiles. Adding an
+    amount is O(1) and the memory used does not depend on the rate of amounts.
+    A bucket is reset when the ring comes round to it again.
+
+    """
+
+    HIST_BINS_PER_DECADE = 10
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, window=900.0, bucket_width=1.0):
+        self.window = window
+        self.bucket_width = bucket_width
+        self.n_buckets = max(int(window / bucket_width), 1)
+        # Bucket number (time // bucket_width) of each slot in the ring
+        self.keys = [None] * self.n_buckets
+        self.sums = [0.0] * self.n_buckets
+        self.counts = [0] * self.n_buckets
+        self.mins = [None] * self.n_buckets
+        self.maxs = [None] * self.n_buckets
+        # {histogram bin index: count, ...} of each slot, None for amounts <= 0
+        self.hists = [None] * self.n_buckets
+        self.lock = Lock()
+
+    def add(self, amount, now=None):
+        """Add an amount, at time now (default current time)."""
+        if now is None:
+            now = time()
+        key = int(now // self.bucket_width)
+        index = key % self.n_buckets
+        if amount > 0:
+            bin_ = int(floor(log10(amount) * self.HIST_BINS_PER_DECADE))
+        else:
+            bin_ = None
+        with self.lock:
+            if self.keys[index] != key:
+                self.keys[index] = key
+                self.sums[index] = 0.0
+                self.counts[index] = 0
+                self.mins[index] = amount
+                self.maxs[index] = amount
+                self.hists[index] = {}
+            elif amount < self.mins[index]:
+                self.mins[index] = amount
+            elif amount > self.maxs[index]:
+                self.maxs[index] = amount
+            self.sums[index] += amount
+            self.counts[index] += 1
+            hist = self.hists[index]
+            hist[bin_] = hist.get(bin_, 0) + 1
+
+    def get(self, period=None, now=None):
+        """Return statistics of amounts added over the last period seconds.
+
+        The period defaults to, and is limited by, the window. Return None
+        if there are no amounts in the period. Otherwise, return a dict with
+        "count", "sum", "mean", "min", "max", and "p50", "p90", "p99" for
+        approximate percentiles in PERCENTILES.
+
+        """
+        if now is None:
+            now = time()
+        if period is None or period > self.window:
+            period = self.window
+        max_key = int(now // self.bucket_width)
+        min_key = max_key - max(int(period / self.bucket_width), 1) + 1
+        total = 0.0
+        count = 0
+        min_ = None
+        max_ = None
+        hist = {}
+        with self.lock:
+            for index, key in enumerate(self.keys):
+                if key is None or key < min_key or key > max_key:
+                    continue
+                total += self.sums[index]
+                count += self.counts[index]
+                if min_ is None or self.mins[index] < min_:
+                    min_ = self.mins[index]
+                if max_ is None or self.maxs[index] > max_:
+                    max_ = self.maxs[index]
+                for bin_, bin_count in self.hists[index].items():
+                    hist[bin_] = hist.get(bin_, 0) + bin_count
+        if not count:
+            return None
+        ret = {
+            'count': count, 'sum': total, 'mean': total / count,
+            'min': min_, 'max': max_}
+        bins = sorted(hist, key=lambda bin_: -1e9 if bin_ is None else bin_)
+        for percentile in self.PERCENTILES:
+            rank = percentile / 100.0 * count
+            cumulative = 0
+            for bin_ in bins:
+                cumulative += hist[bin_]
+                if cumulative >= rank:
+                    break
+            if bin_ is None:
+                value = min_
+            else:
+                # Upper edge of bin, within the range of amounts
+                value = 10 ** (float(bin_ + 1) / self.HIST_BINS_PER_DECADE)
+                value = max(min_, min(max_, value))
+            ret['p%d' % percentile] = value
+        return ret
+
+
+class LoopMetrics(object):
+    """Timings and counters of named phases of the scheduler main loop.
+
+    For each phase, keep the number of calls, the total and maximum duration,
+    a histogram of durations, and the totals of any named counts, e.g. tasks
+    scanned, messages handled or rows written. Keep rolling statistics of
+    recent durations of each phase.
+
+    The histogram has a bucket for durations up to each of BOUNDS, and a
+    last bucket for longer durations.
+
+    """
+
+    BOUNDS = [0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0]
+
+    def __init__(self):
+        self.start_time = time()
+        self.phases = {}
+        self.rolling_stats = {}
+        self.lock = Lock()
+
+    def add(self, name, duration, **counts):
+        """Record a call of phase "name" that took duration seconds."""
+        with self.lock:
+            try:
+                phase = self.phases[name]
+            except KeyError:
+                phase = {
+                    'calls': 0,
+                    'total': 0.0,
+                    'max': 0.0,
+                    'histogram': [0] * (len(self.BOUNDS) + 1),
+                    'counts': {}}
+                self.phases[name] = phase
+                self.rolling_stats[name] = RollingStats()
+            phase['calls'] += 1
+            phase['total'] += duration
+            if duration > phase['max']:
+                phase['max'] = duration
+            phase['histogram'][bisect_left(self.BOUNDS, duration)] += 1
+            for key, value in counts.items():
+                phase['counts'][key] = phase['counts'].get(key, 0) + value
+        self.rolling_stats[name].add(duration)
+
+    def get(self):
+        """Return a dict of the metrics, e.g. for a client.
+
+        The dict contains:
+            time (float): current time
+            start_time (float): time metrics started
+            cpu_user, cpu_system (float): CPU time of this process
+            memory (int): resident set size in KiB, or None
+            histogram_bounds (list): upper bounds of histogram buckets
+            phases (dict): {name: {calls, total, max, histogram, counts,
+                last_minute}}, where last_minute is the RollingStats.get dict
+                of durations in the last minute, or None
+
+        """
+        with self.lock:
+            phases = {}
+            for name, phase in self.phases.items():
+                phases[name] = dict(phase)
+                phases[name]['histogram'] = list(phase['histogram'])
+                phases[name]['counts'] = dict(phase['counts'])
+        for name, phase in phases.items():
+            phase['last_minute'] = self.rolling_stats[name].get(60)
+        cpu_user, cpu_system = get_cpu_times()
+        return {
+            'time': time(),
+            'start_time': self.start_time,
+            'cpu_user': cpu_user,
+            'cpu_system': cpu_system,
+            'memory': get_memory(),
+            'histogram_bounds': list(self.BOUNDS),
+            'phases': phases}
+
+    def get_summary_lines(self):
+        """Return a line of text summarising each phase, sorted by name."""
+        lines = []
+        with self.lock:
+            for name, phase in sorted(self.phases.items()):
+                line = "%s: calls: %d mean: %.6f max: %.6f" % (
+                    name, phase['calls'], phase['total'] / phase['calls'],
+                    phase['max'])
+                for key, value in sorted(phase['counts'].items()):
+                    line += " %s: %d" % (key, value)
+                lines.append(line)
+        return lines
+
+
+class TestRollingStats(unittest.TestCase):
+    """Unit tests for RollingStats."""
+
+    def test_get(self):
+        """Test statistics over periods of the window."""
+        stats = RollingStats(window=60.0, bucket_width=1.0)
+        self.assertIsNone(stats.get(now=1000.0))
+        for i in range(100):
+            stats.add(0.01 * (i + 1), now=1000.0 + i * 0.1)
+        stats.add(5.0, now=1009.5)
+        ret = stats.get(now=1010.0)
+        self.assertEqual(ret['count'], 101)
+        self.assertAlmostEqual(ret['sum'], 55.5)
+        self.assertAlmostEqual(ret['min'], 0.01)
+        self.assertAlmostEqual(ret['max'], 5.0)
+        # Percentiles are upper edges of bins, 10 bins per decade
+        self.assertTrue(0.51 <= ret['p50'] <= 0.51 * 10 ** 0.1, ret['p50'])
+        self.assertTrue(0.91 <= ret['p90'] <= 0.91 * 10 ** 0.1, ret['p90'])
+        # Last second only: 0.91 to 1.0, and 5.0
+        ret = stats.get(1.0, now=1009.9)
+        self.assertEqual(ret['count'], 11)
+        self.assertAlmostEqual(ret['min'], 0.91)
+        self.assertEqual(ret['p99'], 5.0)
+
+    def test_add_expired(self):
+        """Test buckets are reset when the ring comes round to them."""
+        stats = RollingStats(window=10.0, bucket_width=1.0)
+        stats.add(3.0, now=100.5)
+        stats.add(0.0, now=105.5)
+        stats.add(-1.0, now=110.5)
+        ret = stats.get(now=110.5)
+        self.assertEqual(ret['count'], 2)
+        self.assertEqual(ret['min'], -1.0)
+        self.assertEqual(ret['max'], 0.0)
+        self.assertEqual(ret['p50'], -1.0)
+        self.assertIsNone(stats.get(now=200.0))
+
+
+class TestLoopMetrics(unittest.TestCase):
+    """Unit tests for LoopMetrics."""
+
+    def test_add(self):
+        """Test histogram, totals and counts of a phase."""
+        metrics = LoopMetrics()
+        metrics.add('foo', 0.002, tasks=3)
+        metrics.add('foo', 5.0, tasks=2, rows=1)
+        metrics.add('bar', 0.0)
+        phases = metrics.get()['phases']
+        self.assertEqual(phases['foo']['calls'], 2)
+        self.assertAlmostEqual(phases['foo']['total'], 5.002)
+        self.assertEqual(phases['foo']['max'], 5.0)
+        self.assertEqual(
+            phases['foo']['histogram'], [0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(phases['foo']['counts'], {'tasks': 5, 'rows': 1})
+        self.assertEqual(phases['bar']['histogram'][0], 1)
+        self.assertEqual(phases['foo']['last_minute']['count'], 2)
+        self.assertEqual(
+            metrics.get_summary_lines(), [
+                "bar: calls: 1 mean: 0.000000 max: 0.000000",
+                "foo: calls: 2 mean: 2.501000 max: 5.000000 rows: 1 tasks: 5",
+            ])
+
+
+if __name__ == '__main__':
+    unittest.main()
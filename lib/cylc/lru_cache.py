@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Bounded least-recently-used cache, with hit, miss and eviction counts."""
+
+from threading import Lock, Thread
+import unittest
+from weakref import WeakSet
+
+
+# Indices of an entry in the doubly linked list of LRUCache.
+_PREV, _NEXT, _KEY, _VALUE = range(4)
+
+
+class LRUCache(object):
+    """A mapping that holds up to max_size items.
+
+    When full, setting a new item evicts the least recently used one. Each
+    item is in a circular doubly linked list, ordered from least to most
+    recently used, so that getting, setting and evicting are all O(1).
+
+    Caches with the same name are counted together by get_lru_cache_stats.
+
+    Getting, setting and clearing items hold a lock, as caches of cycle point
+    functions are used by the main loop and by threads serving clients at the
+    same time.
+
+    """
+
+    CACHES = WeakSet()
+
+    def __init__(self, name, max_size):
+        self.name = name
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._links = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+        self._lock = Lock()
+        self.CACHES.add(self)
+
+    def __contains__(self, key):
+        return key in self._links
+
+    def __getitem__(self, key):
+        """Return the value for key, and mark it most recently used."""
+        with self._lock:
+            try:
+                link = self._links[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self.hits += 1
+            self._move_to_end(link)
+            return link[_VALUE]
+
+    def __len__(self):
+        return len(self._links)
+
+    def __setitem__(self, key, value):
+        """Set the value for key, evicting the least recently used item."""
+        with self._lock:
+            try:
+                link = self._links[key]
+            except KeyError:
+                pass
+            else:
+                link[_VALUE] = value
+                self._move_to_end(link)
+                return
+            root = self._root
+            if len(self._links) >= self.max_size:
+                oldest = root[_NEXT]
+                root[_NEXT] = oldest[_NEXT]
+                oldest[_NEXT][_PREV] = root
+                del self._links[oldest[_KEY]]
+                self.evictions += 1
+            last = root[_PREV]
+            link = [last, root, key, value]
+            last[_NEXT] = root[_PREV] = self._links[key] = link
+
+    def values(self):
+        """Return a list of values, from least to most recently used.
+
+        This does not count as use of the items.
+        """
+        values = []
+        with self._lock:
+            link = self._root[_NEXT]
+            while link is not self._root:
+                values.append(link[_VALUE])
+                link = link[_NEXT]
+        return values
+
+    def clear(self):
+        """Remove all items. The counters are kept."""
+        with self._lock:
+            self._links.clear()
+            self._root[:] = [self._root, self._root, None, None]
+
+    def _move_to_end(self, link):
+        """Move link to the most recently used end of the list.
+
+        Call with self._lock held.
+        """
+        root = self._root
+        link[_PREV][_NEXT] = link[_NEXT]
+        link[_NEXT][_PREV] = link[_PREV]
+        last = root[_PREV]
+        last[_NEXT] = root[_PREV] = link
+        link[_PREV] = last
+        link[_NEXT] = root
+
+
+def get_lru_cache_stats():
+    """Return statistics of live caches, summed by name.
+
+    Return a sorted list of (name, size, max size, hits, misses, evictions).
+
+    """
+    stats = {}
+    for cache in list(LRUCache.CACHES):
+        if cache.name not in stats:
+            stats[cache.name] = [0, 0, 0, 0, 0]
+        for i, value in enumerate([
+                len(cache), cache.max_size, cache.hits, cache.misses,
+                cache.evictions]):
+            stats[cache.name][i] += value
+    return [tuple([name] + values) for name, values in sorted(stats.items())]
+
+
+class TestLRUCache(unittest.TestCase):
+    """Unit tests for LRUCache."""
+
+    def test_evict_least_recently_used(self):
+        """Test that getting an item saves it from eviction."""
+        cache = LRUCache('test_evict_least_recently_used', 2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)
+        cache['c'] = 3
+        self.assertEqual(len(cache), 2)
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertRaises(KeyError, cache.__getitem__, 'b')
+        cache['a'] = 4
+        cache['d'] = 5
+        self.assertEqual(cache['a'], 4)
+        self.assertFalse('c' in cache)
+        self.assertEqual(cache.values(), [5, 4])
+        self.assertEqual(
+            (cache.hits, cache.misses, cache.evictions), (2, 1, 2))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        cache['e'] = 6
+        self.assertEqual(cache['e'], 6)
+
+    def test_threads(self):
+        """Test that the list is kept whole with threads using the cache."""
+        cache = LRUCache('test_threads', 10)
+
+        def use_cache(offset):
+            """Get and set items, with evictions."""
+            for i in range(2000):
+                key = (i + offset) % 15
+                try:
+                    cache[key]
+                except KeyError:
+                    cache[key] = i
+
+        threads = [Thread(target=use_cache, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(cache), 10)
+        self.assertEqual(len(cache.values()), 10)
+        self.assertEqual(cache.hits + cache.misses, 8000)
+
+    def test_get_lru_cache_stats(self):
+        """Test that statistics are summed by cache name."""
+        caches = [LRUCache('test_get_lru_cache_stats', 10) for _ in range(2)]
+        for cache in caches:
+            cache['a'] = 1
+            self.assertEqual(cache['a'], 1)
+        self.assertRaises(KeyError, caches[1].__getitem__, 'b')
+        self.assertTrue(
+            ('test_get_lru_cache_stats', 2, 20, 2, 1, 0) in
+            get_lru_cache_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
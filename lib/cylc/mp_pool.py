@@ -160,6 +160,8 @@ class SuiteProcPool(object):
             "Initializing process pool, size %d" % self.pool_size)
         self.pool = multiprocessing.Pool(processes=self.pool_size)
         self.results = {}
+        # Set (if not None) as soon as a result is ready.
+        self.wakeup_event = None
 
     def close(self):
         """Close the pool to new commands."""
@@ -178,6 +180,13 @@ class SuiteProcPool(object):
                         callback_args = []
                     callback(value, *callback_args)
 
+    def has_ready_results(self):
+        """Return True if any result is ready to be handled."""
+        for result, _, _ in self.results.values():
+            if result.ready():
+                return True
+        return False
+
     def is_closed(self):
         """Is the pool closed?"""
         # Warning: accesses multiprocessing.Pool internal state
@@ -204,7 +213,8 @@ class SuiteProcPool(object):
     def put_command(self, ctx, callback, callback_args=None):
         """Queue a new shell command to execute."""
         try:
-            result = self.pool.apply_async(_run_command, [ctx])
+            result = self.pool.apply_async(
+                _run_command, [ctx], callback=self._set_wakeup_event)
         except AssertionError as exc:
             LOG.warning("%s\n  %s\n %s" % (
                 str(exc),
@@ -223,6 +233,11 @@ class SuiteProcPool(object):
         """Set STOP_JOB_SUBMISSION flag."""
         cls.STOP_JOB_SUBMISSION.value = 1
 
+    def _set_wakeup_event(self, _):
+        """Set the wakeup event, on a result being ready."""
+        if self.wakeup_event is not None:
+            self.wakeup_event.set()
+
     def terminate(self):
         """Kill all worker processes immediately."""
         if not self.is_dead():
@@ -181,8 +181,15 @@ class SuiteRuntimeServiceClient(object):
             self._compat('get_info', default='') + command,
             method=self.METHOD_GET, **kwargs)
 
-    def get_latest_state(self, full_mode):
-        """Return latest state of the suite (for the GUI)."""
+    def get_latest_state(self, full_mode, summary_revision=None,
+                         summary_run_id=None):
+        """Return latest state of the suite (for the GUI).
+
+        If summary_revision is set, the suite should return changes to the
+        state summary since the revision, if it can. Only set it, with the
+        summary_run_id returned with it, if a previous call returned a
+        "summary_revision", i.e. the suite supports it.
+        """
         self._load_contact_info()
         if self.api == 0:
             # Basic compat for pre-7.5.0 suites
@@ -200,10 +207,20 @@ class SuiteRuntimeServiceClient(object):
                 'err_content': '',
                 'err_size': 0,
                 'mean_main_loop_interval': 5.0}
-        else:
+        elif summary_revision is None:
             return self._call_server(
                 'get_latest_state',
                 method=self.METHOD_GET, full_mode=full_mode)
+        else:
+            return self._call_server(
+                'get_latest_state',
+                method=self.METHOD_GET, full_mode=full_mode,
+                summary_revision=summary_revision,
+                summary_run_id=summary_run_id)
+
+    def get_metrics(self):
+        """Return timings and counters of main loop phases of the suite."""
+        return self._call_server('get_metrics', method=self.METHOD_GET)
 
     def get_suite_state_summary(self):
         """Return the global, task, and family summary data structures."""
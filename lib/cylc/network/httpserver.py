@@ -306,11 +306,22 @@ class SuiteRuntimeService(object):
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
-    def get_latest_state(self, full_mode=False):
+    def get_latest_state(self, full_mode=False, summary_revision=None,
+                         summary_run_id=None):
         """Return latest suite state (suitable for a GUI update)."""
         client_info = self._check_access_priv_and_report(PRIV_FULL_READ)
         full_mode = self._literal_eval('full_mode', full_mode)
-        return self.schd.info_get_latest_state(client_info, full_mode)
+        summary_revision = self._literal_eval(
+            'summary_revision', summary_revision)
+        return self.schd.info_get_latest_state(
+            client_info, full_mode, summary_revision, summary_run_id)
+
+    @cherrypy.expose
+    @cherrypy.tools.json_out()
+    def get_metrics(self):
+        """Return timings and counters of main loop phases."""
+        self._check_access_priv_and_report(PRIV_FULL_READ)
+        return self.schd.info_get_metrics()
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
@@ -497,7 +508,8 @@ class SuiteRuntimeService(object):
     @cherrypy.tools.json_out()
     def put_message(self, task_id, severity, message):
         self._check_access_priv_and_report(PRIV_FULL_CONTROL, log_info=False)
-        self.schd.message_queue.put((task_id, severity, str(message)))
+        self.schd.message_queue.put(
+            (task_id, severity, str(message), time()))
         return (True, 'Message queued')
 
     @cherrypy.expose
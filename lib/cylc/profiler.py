@@ -23,6 +23,8 @@ import StringIO
 import pstats
 from subprocess import Popen, PIPE
 
+from cylc.loop_metrics import get_memory
+
 
 class Profiler(object):
     """Wrap cProfile, pstats, and memory logging, for performance profiling."""
@@ -56,8 +58,10 @@ class Profiler(object):
         """Print a message to standard out with the current memory usage."""
         if not self.enabled:
             return
-        proc = Popen(
-            ["ps", "h", "-orss", str(os.getpid())],
-            stdin=open(os.devnull), stdout=PIPE)
-        memory = int(proc.communicate()[0])
+        memory = get_memory()
+        if memory is None:
+            proc = Popen(
+                ["ps", "h", "-orss", str(os.getpid())],
+                stdin=open(os.devnull), stdout=PIPE)
+            memory = int(proc.communicate()[0])
         print "PROFILE: Memory: %d KiB: %s" % (memory, message)
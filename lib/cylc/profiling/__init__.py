@@ -59,6 +59,10 @@ PROFILE_MODE_CYLC = 'PROFILE_MODE_CYLC'
 PROFILE_MODES = {'time': PROFILE_MODE_TIME,
                  'cylc': PROFILE_MODE_CYLC}
 
+# Experiment mode to time hot functions with "benchmark.py" rather than run
+# the suite.
+BENCHMARK_MODE = 'benchmark'
+
 # Profile file suffixes.
 PROFILE_FILES = {
     'cmd-out': '',
@@ -79,6 +83,9 @@ LOOP_MEMORY_LINE_REGEX = re.compile('(?:loop #|end main loop \(total loops )'
                                     '([\d]+)(?:: |\): )(.*)')
 # Matches the sleep function line in cylc <cmd> --profile output.
 SLEEP_FUNCTION_REGEX = re.compile('([\d.]+)[\s]+[\d.]+[\s]+\{time.sleep\}')
+# Matches the task message to job submit latency in cylc run --profile output.
+SUBMIT_LATENCY_REGEX = re.compile(
+    'PROFILE: task message to job submit latency \(s\): mean: ([\d.]+)')
 # The string prefixing the suite-startup timestamp (unix time).
 SUITE_STARTUP_STRING = 'SUITE STARTUP: '
 
@@ -110,10 +117,28 @@ METRICS = {  # Dict of all metrics measured by profile-battery.
     '010': ('Average Main Loop Iteration Time', 's', 'loop-time', [
             'avg loop time'],),
     '011': ('Elapsed Time - time.sleep()', 's', 'awake-time', [
-            'awake cpu time'],)
+            'awake cpu time'],),
+    '012': ('Task Message To Job Submit Latency', 's', 'submit-latency', [
+            'submit latency'],),
+    '013': ('Benchmark - Config Load', 's', 'benchmark-config-load', [
+            'benchmark config load'],),
+    '014': ('Benchmark - get_graph_raw', 's', 'benchmark-get-graph-raw', [
+            'benchmark get graph raw'],),
+    '015': ('Benchmark - release_runahead_tasks', 's',
+            'benchmark-release-runahead-tasks', [
+                'benchmark release runahead tasks'],),
+    '016': ('Benchmark - match_dependencies', 's',
+            'benchmark-match-dependencies', [
+                'benchmark match dependencies'],),
+    '017': ('Benchmark - StateSummaryMgr.update', 's',
+            'benchmark-state-summary-update', [
+                'benchmark state summary update'],),
+    '018': ('Benchmark - put_task_pool', 's', 'benchmark-put-task-pool', [
+            'benchmark put task pool'],)
 }
 # Metrics used if --full is not set.
-QUICK_ANALYSIS_METRICS = set(['001', '002', '005'])
+QUICK_ANALYSIS_METRICS = set(['001', '002', '005', '013', '014', '015',
+                              '016', '017', '018'])
 # Reverse lookup of METRICS, dict of fields stored with their metric codes.
 METRICS_BY_FIELD = {}
 for metric in METRICS:
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Module for performing analysis on profiling results and generating plots."""
 
+import json
 import os
 import re
 import sys
@@ -34,7 +35,7 @@ from . import (PROFILE_MODE_TIME, PROFILE_MODE_CYLC, SUMMARY_LINE_REGEX,
                MEMORY_LINE_REGEX, LOOP_MEMORY_LINE_REGEX, SLEEP_FUNCTION_REGEX,
                SUITE_STARTUP_STRING, PROFILE_MODES, PROFILE_FILES, METRICS,
                METRIC_TITLE, METRIC_UNIT, METRIC_FILENAME, METRIC_FIELDS,
-               QUICK_ANALYSIS_METRICS)
+               QUICK_ANALYSIS_METRICS, SUBMIT_LATENCY_REGEX, BENCHMARK_MODE)
 from .git import (order_versions_by_date, describe)
 from cylc.wallclock import get_unix_time_from_time_string
 
@@ -90,6 +91,12 @@ def extract_results(result_file_dict, exp):
         data[run_name] = []
         for result_file in result_files:
             profiling_results = {}
+            if exp.get('mode') == BENCHMARK_MODE:
+                # Benchmark results only, no suite was run.
+                profiling_results.update(process_benchmark_file(
+                    result_file + PROFILE_FILES['cmd-out']))
+                data[run_name].append(profiling_results)
+                continue
             if PROFILE_MODE_TIME in profile_modes:
                 profiling_results.update(process_time_file(
                     result_file + PROFILE_FILES['time-err']))
@@ -156,6 +163,12 @@ def process_time_file(file_name):
         return ret
 
 
+def process_benchmark_file(file_name):
+    """Extract results from the JSON output of benchmark.py."""
+    with open(file_name, 'r') as benchmark_file:
+        return json.load(benchmark_file)
+
+
 def process_out_file(file_name, suite_start_time, validate=False):
     """Extract data from the out log file."""
     if not os.path.exists(file_name):
@@ -204,6 +217,12 @@ def process_out_file(file_name, suite_start_time, validate=False):
                 ret['sleep time'] = float(match.groups()[0])
                 continue
 
+            # Task message to job submit latency.
+            match = SUBMIT_LATENCY_REGEX.search(line)
+            if match:
+                ret['submit latency'] = float(match.groups()[0])
+                continue
+
         # Number of loops.
         if not validate:
             ret['loop count'] = loop_mem_entries[-1][0]
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Time hot scheduler functions in isolation on a suite, without running it.
+
+Load the suite configuration, populate a task pool with a task proxy for each
+task at each cycle point up to the final cycle point, then time:
+    * loading the suite configuration
+    * SuiteConfig.get_graph_raw, over all cycle points, ungrouped
+    * TaskPool.release_runahead_tasks, of all tasks
+    * TaskPool.match_dependencies, mean of N passes, in each of which the
+      next task in the pool completes its "succeeded" output
+    * StateSummaryMgr.update, full update of the new pool
+    * SuiteDatabaseManager.put_task_pool, rows of all tasks queued and written
+      to a temporary database
+
+Print the results as a JSON object {field: seconds}, where each field is one
+of the METRIC_FIELDS in "cylc.profiling". Functions that fail, e.g. because
+they are not present in an older cylc version, are reported to stderr and
+left out of the results.
+
+This file is run as a script by "cylc profile-battery" in experiments with
+"mode": "benchmark", against whichever cylc version is checked out, so it must
+not import anything from "cylc.profiling".
+
+"""
+
+import json
+import logging
+from optparse import OptionParser
+import os
+import shutil
+import sys
+from tempfile import mkdtemp
+from time import time
+import traceback
+
+USAGE = 'benchmark.py [-s KEY=VALUE ...] [--passes=N] SUITE_RC'
+
+# Results fields.
+CONFIG_LOAD = 'benchmark config load'
+GET_GRAPH_RAW = 'benchmark get graph raw'
+RELEASE_RUNAHEAD_TASKS = 'benchmark release runahead tasks'
+MATCH_DEPENDENCIES = 'benchmark match dependencies'
+STATE_SUMMARY_UPDATE = 'benchmark state summary update'
+PUT_TASK_POOL = 'benchmark put task pool'
+
+
+class BenchmarkScheduler(object):
+    """The parts of a scheduler used by the state summary manager."""
+
+    run_mode = 'live'
+    stop_mode = stop_point = stop_clock_time = stop_task = None
+
+    def __init__(self, config, pool, final_point):
+        self.config = config
+        self.pool = pool
+        self.final_point = final_point
+
+
+class NullSuiteDatabaseManager(object):
+    """Discard database writes made by the task pool."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def load_config(suite_rc, template_vars):
+    """Return a suite configuration loaded from suite_rc."""
+    from cylc.config import SuiteConfig
+    return SuiteConfig('benchmark', suite_rc, template_vars=template_vars)
+
+
+def load_pool(config, final_point):
+    """Return a task pool with every task at every cycle point, runahead."""
+    from cylc.task_pool import TaskPool
+    from cylc.task_proxy import TaskProxy
+    pool = TaskPool(config, final_point, NullSuiteDatabaseManager(), None)
+    for name in config.get_task_name_list():
+        tdef = config.get_taskdef(name)
+        points = set()
+        for sequence in tdef.sequences:
+            point = sequence.get_first_point(config.start_point)
+            while point is not None and point <= final_point:
+                points.add(point)
+                point = sequence.get_next_point(point)
+        for point in sorted(points):
+            pool.add_to_runahead_pool(TaskProxy(tdef, point))
+    return pool
+
+
+def time_match_dependencies(pool, n_passes):
+    """Complete an output on one task per pass, return mean pass time."""
+    from cylc.task_outputs import TASK_OUTPUT_SUCCEEDED
+    itasks = sorted(pool.get_tasks(), key=lambda itask: itask.identity)
+    pool.match_dependencies()
+    n_passes = min(n_passes, len(itasks))
+    elapsed = 0.0
+    for itask in itasks[:n_passes]:
+        itask.state.outputs.set_completion(TASK_OUTPUT_SUCCEEDED, True)
+        start = time()
+        pool.match_dependencies()
+        elapsed += time() - start
+    return elapsed / max(n_passes, 1)
+
+
+def time_put_task_pool(pool):
+    """Return time to queue and write rows of all tasks to a database."""
+    from cylc.suite_db_mgr import SuiteDatabaseManager
+    db_dir = mkdtemp()
+    pri_d = os.path.join(db_dir, 'pri')
+    pub_d = os.path.join(db_dir, 'pub')
+    suite_db_mgr = SuiteDatabaseManager(pri_d, pub_d)
+    try:
+        os.mkdir(pri_d)
+        os.mkdir(pub_d)
+        suite_db_mgr.on_suite_start(is_restart=False)
+        for itask in pool.get_all_tasks():
+            itask.state.is_updated = True
+        start = time()
+        suite_db_mgr.put_task_pool(pool)
+        suite_db_mgr.process_queued_ops()
+        return time() - start
+    finally:
+        suite_db_mgr.on_suite_shutdown()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+def run_benchmarks(suite_rc, template_vars, n_passes):
+    """Return a dict {field: seconds} of the benchmarks that succeed."""
+    results = {}
+
+    def run(field, func, *args):
+        """Time func(*args), return its result, or None on failure."""
+        start = time()
+        try:
+            ret = func(*args)
+        except Exception:
+            traceback.print_exc()
+            print >> sys.stderr, 'WARNING: benchmark "%s" failed' % field
+            return None
+        results[field] = time() - start
+        return ret
+
+    config = run(CONFIG_LOAD, load_config, suite_rc, template_vars)
+    if config is None:
+        return results
+    from cylc.cycling.loader import get_point
+    final_point = get_point(config.cfg['scheduling']['final cycle point'])
+    run(GET_GRAPH_RAW, lambda: config.get_graph_raw(
+        str(config.start_point), str(final_point), ungroup_all=True))
+    pool = load_pool(config, final_point)
+    run(RELEASE_RUNAHEAD_TASKS, pool.release_runahead_tasks)
+    mean = run(MATCH_DEPENDENCIES, time_match_dependencies, pool, n_passes)
+    if mean is not None:
+        # Record the mean time of a pass, not of all passes.
+        results[MATCH_DEPENDENCIES] = mean
+    from cylc.state_summary_mgr import StateSummaryMgr
+    run(STATE_SUMMARY_UPDATE, StateSummaryMgr().update,
+        BenchmarkScheduler(config, pool, final_point))
+    ret = run(PUT_TASK_POOL, time_put_task_pool, pool)
+    if ret is not None:
+        # Exclude setting up and tearing down the database.
+        results[PUT_TASK_POOL] = ret
+    return results
+
+
+def main():
+    """Parse the command line, run the benchmarks, print the results."""
+    parser = OptionParser(USAGE)
+    parser.add_option(
+        '-s', '--set', action='append', dest='templatevars', default=[],
+        metavar='KEY=VALUE', help='Set the value of a Jinja2 template '
+        'variable in the suite definition.')
+    parser.add_option(
+        '--passes', type='int', default=100, help='Number of passes of '
+        'match_dependencies to time (default 100).')
+    opts, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('wrong number of arguments')
+    template_vars = {}
+    for item in opts.templatevars:
+        key, value = item.split('=', 1)
+        template_vars[key.strip()] = value.strip()
+
+    from cylc.suite_logging import SuiteLog
+    logging.getLogger(SuiteLog.LOG).addHandler(logging.NullHandler())
+    results = run_benchmarks(
+        os.path.abspath(args[0]), template_vars, opts.passes)
+    print json.dumps(results)
+
+
+if __name__ == '__main__':
+    main()
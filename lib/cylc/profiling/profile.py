@@ -28,7 +28,7 @@ import time
 import traceback
 
 from . import (PROFILE_MODE_TIME, PROFILE_MODE_CYLC, PROFILE_MODES,
-               PROFILE_FILES, SUITE_STARTUP_STRING)
+               PROFILE_FILES, SUITE_STARTUP_STRING, BENCHMARK_MODE, CYLC_DIR)
 from .analysis import extract_results
 from .git import (checkout, describe, GitCheckoutError,)
 
@@ -206,9 +206,88 @@ def run_suite(reg, options, out_file, profile_modes, mode='live',
     return None
 
 
-def run_experiment(exp):
+def snapshot_benchmark(schedule, snapshot_dir):
+    """Copy benchmark.py and the suites of benchmark experiments.
+
+    The script and suites are in the working copy, so they may not exist at
+    the cylc versions checked out for profiling.
+
+    Arguments:
+        schedule (dict): The profiling schedule, see profile().
+        snapshot_dir (str): The directory to copy into.
+
+    Returns:
+        tuple - (script, suite_dirs)
+          - script (str) - The path to the copy of benchmark.py.
+          - suite_dirs (dict) - The copies of suite directories in the form
+            {suite_dir: copy_dir}.
+
+    """
+    script = os.path.join(snapshot_dir, 'benchmark.py')
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'benchmark.py'),
+                script)
+    suite_dirs = {}
+    for experiments in schedule.values():
+        for experiment in experiments:
+            if experiment['config'].get('mode') != BENCHMARK_MODE:
+                continue
+            for run in experiment['config']['runs']:
+                sdir = os.path.expanduser(run['suite dir'])
+                if sdir not in suite_dirs:
+                    suite_dirs[sdir] = os.path.join(
+                        snapshot_dir, 'suite-%d' % len(suite_dirs))
+                    shutil.copytree(sdir, suite_dirs[sdir])
+    return script, suite_dirs
+
+
+def run_benchmark(sdir, options, out_file, conf_path='', script=None):
+    """Runs benchmark.py on the suite in sdir with the currently checked-out
+    cylc version.
+
+    Arguments:
+        sdir (str): The suite directory.
+        options (list): List of jinja2 setting=value pairs.
+        out_file (str): The file to redirect stdout to.
+        conf_path (str - optional): Path to the global.rc directory.
+        script (str - optional): Path to the benchmark script to run, by
+            default benchmark.py in the working copy.
+
+    Returns:
+        str - The path to the benchmark stderr if any is present.
+
+    """
+    env = cylc_env(cylc_conf_path=conf_path)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.join(CYLC_DIR, 'lib')] +
+        [path for path in [env.get('PYTHONPATH')] if path])
+    if script is None:
+        script = os.path.join(os.path.dirname(__file__), 'benchmark.py')
+    cmds = ['python', script]
+    for option in options:
+        cmds += ['-s', option]
+    cmds.append(os.path.join(sdir, 'suite.rc'))
+    cmd_out = out_file + PROFILE_FILES['cmd-out']
+    cmd_err = out_file + PROFILE_FILES['cmd-err']
+
+    # Execute.
+    print '$ ' + ' '.join(cmds)
+    proc = Popen(cmds, stdin=open(os.devnull), stdout=open(cmd_out, 'w+'),
+                 stderr=open(cmd_err, 'w+'), env=env)
+    if proc.wait():
+        raise SuiteFailedException(cmds, cmd_out, cmd_err)
+
+    # Return benchmark stderr if present.
+    if os.path.getsize(cmd_err) > 0:
+        return cmd_err
+    return None
+
+
+def run_experiment(exp, benchmark=None):
     """Run the provided experiment with the currently checked-out cylc version.
 
+    If benchmark is provided, it is a (script, suite_dirs) tuple as returned
+    by snapshot_benchmark, to run benchmark experiments with.
+
     Return a dictionary of result files by run name.
 
     """
@@ -220,6 +299,27 @@ def run_experiment(exp):
         results_for_run = []
         sdir = os.path.expanduser(run['suite dir'])
         reg = 'profile-' + str(time.time()).replace('.', '')
+        if exp.get('mode') == BENCHMARK_MODE:
+            # Time functions in isolation, no suite to run or tidy up.
+            script = None
+            if benchmark:
+                script, suite_dirs = benchmark
+                sdir = suite_dirs.get(sdir, sdir)
+            for _ in range(run['repeats'] + 1):
+                out_file = tempfile.mkstemp()[1]
+                results_for_run.append(out_file)
+                err_file = run_benchmark(
+                    sdir,
+                    run['options'] + [
+                        'cylc_compat_mode=%s' % cylc_maj_version],
+                    out_file,
+                    conf_path=run.get('globalrc', ''),
+                    script=script)
+                if err_file:
+                    print >> sys.stderr, ('WARNING: non-empty benchmark '
+                                          'error log: ' + err_file)
+            result_files[run['name']] = results_for_run
+            continue
         count = 0
         while count < run['repeats'] + 1:
             # Run suite.
@@ -288,6 +388,21 @@ def profile(schedule):
             has been executed.
           - success (bool) - True if all experiments completed successfully,
             else False.
+    """
+    # Copy the benchmark script and suites before checking out other versions.
+    snapshot_dir = tempfile.mkdtemp()
+    try:
+        return _profile(schedule, snapshot_benchmark(schedule, snapshot_dir))
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+def _profile(schedule, benchmark):
+    """Perform profiling for the provided schedule, see profile().
+
+    Run benchmark experiments with benchmark, a (script, suite_dirs) tuple as
+    returned by snapshot_benchmark.
+
     """
     checkout_count = 0
     results = {}
@@ -305,7 +420,8 @@ def profile(schedule):
         # Run Experiment.
         for experiment in experiments:
             try:
-                result_files = run_experiment(experiment['config'])
+                result_files = run_experiment(experiment['config'],
+                                              benchmark=benchmark)
             except ProfilingKilledException as exc:
                 # Profiling has been terminated, return what results we have.
                 print exc
@@ -17,8 +17,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Provide data access object for the suite runtime database."""
 
+from glob import glob
+import os
 import sqlite3
 import sys
+from time import gmtime, strftime
 import traceback
 
 import cylc.flags
@@ -41,15 +44,21 @@ class CylcSuiteDAOTable(object):
     """Represent a table in the suite runtime database."""
 
     FMT_CREATE = "CREATE TABLE %(name)s(%(columns_str)s%(primary_keys_str)s)"
+    FMT_CREATE_INDEX = (
+        "CREATE INDEX IF NOT EXISTS %(index_name)s"
+        " ON %(name)s(%(columns_str)s)")
     FMT_DELETE = "DELETE FROM %(name)s%(where_str)s"
     FMT_INSERT = "INSERT OR REPLACE INTO %(name)s VALUES(%(values_str)s)"
     FMT_UPDATE = "UPDATE %(name)s SET %(set_str)s%(where_str)s"
 
-    __slots__ = ('name', 'columns', 'delete_queues', 'insert_queue',
+    __slots__ = ('name', 'columns', 'indexes', 'delete_queues', 'insert_queue',
                  'update_queues')
 
-    def __init__(self, name, column_items):
+    def __init__(self, name, column_items, index_items=None):
         self.name = name
+        self.indexes = []
+        if index_items:
+            self.indexes = [list(index_item) for index_item in index_items]
         self.columns = []
         for column_item in column_items:
             name = column_item[0]
@@ -80,6 +89,22 @@ class CylcSuiteDAOTable(object):
             "columns_str": ", ".join(column_str_list),
             "primary_keys_str": primary_keys_str}
 
+    def get_create_index_stmts(self):
+        """Return SQL statements to create indexes of this table.
+
+        Return a dict {index_name: stmt, ...}. Each index is named after the
+        table and its columns. The statements do nothing for indexes that
+        already exist.
+        """
+        stmts = {}
+        for index in self.indexes:
+            index_name = "_".join([self.name] + index + ["idx"])
+            stmts[index_name] = self.FMT_CREATE_INDEX % {
+                "index_name": index_name,
+                "name": self.name,
+                "columns_str": ", ".join(index)}
+        return stmts
+
     def get_insert_stmt(self):
         """Return an SQL statement to insert a row to this table."""
         return self.FMT_INSERT % {
@@ -163,10 +188,74 @@ class CylcSuiteDAOTable(object):
             self.update_queues[stmt] = []
         self.update_queues[stmt].append(stmt_args)
 
+    def has_queued_items(self):
+        """Return True if there are queued items."""
+        return bool(
+            self.delete_queues or self.insert_queue or self.update_queues)
+
+    def can_merge(self, other):
+        """Return True if queued items of other table can be merged.
+
+        Queued DELETE, INSERT and UPDATE items are executed in that order, so
+        the result of merging the items of other (to be executed later) into
+        this table must be the same as executing the two sets of items one
+        after the other. This is not the case if other has DELETE items, or
+        if other has INSERT items while this table has UPDATE items.
+        """
+        return not self.has_queued_items() or not (
+            other.delete_queues or
+            (other.insert_queue and self.update_queues))
+
+    def merge(self, other):
+        """Merge queued items of other table (to be executed later).
+
+        Caller should ensure that "self.can_merge(other)" is True. Drop
+        redundant items, i.e. INSERT items with the same primary key as a
+        later INSERT item, and UPDATE items with the same statement and WHERE
+        arguments as a later UPDATE item.
+        """
+        for stmt, stmt_args_list in other.delete_queues.items():
+            self.delete_queues.setdefault(stmt, []).extend(stmt_args_list)
+        if other.insert_queue:
+            self.insert_queue.extend(other.insert_queue)
+            indexes = [
+                i for i, column in enumerate(self.columns)
+                if column.is_primary_key]
+            if indexes:
+                self.insert_queue[:] = self._get_last_items(
+                    self.insert_queue,
+                    lambda stmt_args: [stmt_args[i] for i in indexes])
+        for stmt, stmt_args_list in other.update_queues.items():
+            if stmt not in self.update_queues:
+                self.update_queues[stmt] = list(stmt_args_list)
+                continue
+            self.update_queues[stmt].extend(stmt_args_list)
+            n_where = stmt.count("==?")
+            self.update_queues[stmt] = self._get_last_items(
+                self.update_queues[stmt],
+                lambda stmt_args: stmt_args[len(stmt_args) - n_where:])
+
+    @staticmethod
+    def _get_last_items(stmt_args_list, get_key):
+        """Return items in stmt_args_list that have the last of each key."""
+        keys = set()
+        items = []
+        for stmt_args in reversed(stmt_args_list):
+            key = tuple(get_key(stmt_args))
+            if key not in keys:
+                keys.add(key)
+                items.append(stmt_args)
+        items.reverse()
+        return items
+
 
 class CylcSuiteDAO(object):
     """Data access object for the suite runtime database."""
 
+    ARCHIVE_DIR_BASE_NAME = "db-archive"
+    # strftime format of archive file base names, one file per month
+    ARCHIVE_FILE_BASE_NAME_FMT = "db-%Y%m"
+    ARCHIVE_FILE_BASE_NAME_GLOB = "db-[0-9]*"
     CONN_TIMEOUT = 0.2
     DB_FILE_BASE_NAME = "db"
     OLD_DB_FILE_BASE_NAME = "cylc-suite.db"
@@ -306,21 +395,62 @@ class CylcSuiteDAO(object):
         ],
     }
 
-    def __init__(self, db_file_name=None, is_public=False):
+    # Secondary indexes of tables, {table_name: [[column, ...], ...]}, for
+    # queries not served by primary keys. (Queries on task_jobs by run_status,
+    # e.g. "cylc report-timings", select most rows, so a scan is faster.)
+    TABLES_INDEXES = {
+        # Job events of a task, e.g. for job log lookups.
+        TABLE_TASK_EVENTS: [
+            ["cycle", "name", "submit_num"],
+        ],
+        # "cylc suite-state" by cycle point and/or status.
+        TABLE_TASK_STATES: [
+            ["cycle", "status"],
+            ["status"],
+        ],
+    }
+
+    # Tables with rows of each task at each cycle point, whose rows of old
+    # cycle points can be moved to archive files, see "archive_cycles".
+    TABLES_ARCHIVED = [
+        TABLE_TASK_EVENTS,
+        TABLE_TASK_JOBS,
+        TABLE_TASK_OUTPUTS,
+        TABLE_TASK_STATES,
+    ]
+
+    def __init__(self, db_file_name=None, is_public=False,
+                 is_persistent=False, pragmas=None, archive_dir=None):
         """Initialise object.
 
         db_file_name - Path to the database file
         is_public - If True, allow retries, etc
+        is_persistent - If True, keep the connection open after executing
+                        queued items, instead of reconnecting every time
+        pragmas - List of (name, value) to set with PRAGMA on connect
+        archive_dir - Path to the directory of archive database files,
+                      default is ARCHIVE_DIR_BASE_NAME beside the database file
 
         """
         self.db_file_name = db_file_name
+        if archive_dir is None and db_file_name:
+            archive_dir = os.path.join(
+                os.path.dirname(db_file_name), self.ARCHIVE_DIR_BASE_NAME)
+        self.archive_dir = archive_dir
         self.is_public = is_public
+        self.is_persistent = is_persistent
+        self.pragmas = []
+        if pragmas:
+            self.pragmas = list(pragmas)
         self.conn = None
+        # (st_dev, st_ino) of the database file when connection was made
+        self.db_file_id = None
         self.n_tries = 0
 
         self.tables = {}
         for name, attrs in sorted(self.TABLES_ATTRS.items()):
-            self.tables[name] = CylcSuiteDAOTable(name, attrs)
+            self.tables[name] = CylcSuiteDAOTable(
+                name, attrs, self.TABLES_INDEXES.get(name))
 
         if not self.is_public:
             self.create_tables()
@@ -357,6 +487,40 @@ class CylcSuiteDAO(object):
         """
         self.tables[table_name].add_update_item(set_args, where_args)
 
+    def pop_queued_tables(self):
+        """Remove and return tables with queued items.
+
+        Return a dict {table_name: table, ...}. The removed tables are
+        replaced with empty ones.
+        """
+        tables = {}
+        for name, table in self.tables.items():
+            if table.has_queued_items():
+                tables[name] = table
+                self.tables[name] = CylcSuiteDAOTable(
+                    name, self.TABLES_ATTRS[name],
+                    self.TABLES_INDEXES.get(name))
+        return tables
+
+    def can_merge_queued_tables(self, tables):
+        """Return True if queued items in tables can be merged.
+
+        tables should be a dict {table_name: table, ...}, as returned by
+        "pop_queued_tables".
+        """
+        return all(
+            self.tables[name].can_merge(table)
+            for name, table in tables.items())
+
+    def merge_queued_tables(self, tables):
+        """Merge queued items in tables, to be executed after existing ones.
+
+        tables should be a dict {table_name: table, ...}, as returned by
+        "pop_queued_tables".
+        """
+        for name, table in tables.items():
+            self.tables[name].merge(table)
+
     def close(self):
         """Explicitly close the connection."""
         if self.conn is not None:
@@ -365,29 +529,75 @@ class CylcSuiteDAO(object):
             except sqlite3.Error:
                 pass
             self.conn = None
+            self.db_file_id = None
 
     def connect(self):
         """Connect to the database."""
         if self.conn is None:
             self.conn = sqlite3.connect(self.db_file_name, self.CONN_TIMEOUT)
+            try:
+                for name, value in self.pragmas:
+                    self.conn.execute("PRAGMA %s=%s" % (name, value))
+            except sqlite3.Error:
+                self.close()
+                raise
+            self.db_file_id = self._get_db_file_id()
         return self.conn
 
-    def create_tables(self):
-        """Create tables."""
-        names = []
+    def _get_db_file_id(self):
+        """Return (st_dev, st_ino) of the database file, or None if gone."""
+        try:
+            stat = os.stat(self.db_file_name)
+        except (OSError, TypeError):
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def _check_db_file(self):
+        """Close a persistent connection if its database file has gone.
+
+        An open connection can carry on writing to a database file that has
+        been removed or replaced, e.g. with the suite run directory. Closing
+        the connection ensures that the next statement will reconnect to the
+        database file path (and fail if the run directory has been removed).
+        """
+        if self.conn is None:
+            return
+        db_file_id = self._get_db_file_id()
+        if db_file_id is None or self.db_file_id not in (None, db_file_id):
+            self.close()
+        else:
+            # File may not exist on connect, until something is written to it
+            self.db_file_id = db_file_id
+
+    def create_tables(self, table_names=None):
+        """Create tables and indexes that do not exist.
+
+        Indexes missing from an existing database, e.g. of an older version of
+        cylc, are created on restart. If table_names is specified, only create
+        these tables, e.g. in an archive file.
+        """
+        names = set()
         for row in self.connect().execute(
-                "SELECT name FROM sqlite_master WHERE type==? ORDER BY name",
-                ["table"]):
-            names.append(row[0])
+                "SELECT name FROM sqlite_master WHERE type IN (?, ?)",
+                ["table", "index"]):
+            names.add(row[0])
         cur = None
-        for name, table in self.tables.items():
+        for name, table in sorted(self.tables.items()):
+            if table_names is not None and name not in table_names:
+                continue
             if name not in names:
                 cur = self.conn.execute(table.get_create_stmt())
+            for index_name, stmt in sorted(
+                    table.get_create_index_stmts().items()):
+                if index_name not in names:
+                    cur = self.conn.execute(stmt)
         if cur is not None:
             self.conn.commit()
 
     def execute_queued_items(self):
         """Execute queued items for each table."""
+        if self.is_persistent:
+            self._check_db_file()
         try:
             for table in self.tables.values():
                 # DELETE statements may have varying number of WHERE args so we
@@ -420,6 +630,8 @@ class CylcSuiteDAO(object):
                     self.conn.rollback()
                 except sqlite3.Error:
                     pass
+            # Retry with a new connection
+            self.close()
             return
         else:
             # Clear the queues
@@ -436,8 +648,10 @@ class CylcSuiteDAO(object):
         finally:
             # Note: This is not strictly necessary. However, if the suite run
             # directory is removed, a forced reconnection to the private
-            # database will ensure that the suite dies.
-            self.close()
+            # database will ensure that the suite dies. (A persistent
+            # connection is checked with "self._check_db_file" instead.)
+            if not self.is_persistent:
+                self.close()
 
     def _execute_stmt(self, stmt, stmt_args_list):
         """Helper for "self.execute_queued_items".
@@ -464,6 +678,94 @@ class CylcSuiteDAO(object):
             ERR.warning(err_log)
             raise
 
+    def archive_cycles(self, cycles):
+        """Move rows of cycle points in TABLES_ARCHIVED to an archive file.
+
+        The rows are moved to the archive file of the current month (UTC) in
+        self.archive_dir, which is created, with the tables, as necessary.
+        They are copied to the archive file and deleted from this database in
+        a single transaction. The freed pages are then returned to the file
+        system, if the database is in incremental auto-vacuum mode (see
+        "vacuum"). Return the number of rows moved.
+        """
+        if not cycles:
+            return 0
+        if not os.path.isdir(self.archive_dir):
+            os.makedirs(self.archive_dir)
+        archive_file_name = os.path.join(
+            self.archive_dir,
+            strftime(self.ARCHIVE_FILE_BASE_NAME_FMT, gmtime()))
+        archive_dao = CylcSuiteDAO(archive_file_name, is_public=True)
+        archive_dao.create_tables(self.TABLES_ARCHIVED)
+        archive_dao.close()
+        conn = self.connect()
+        conn.execute(r"ATTACH DATABASE ? AS archive", [archive_file_name])
+        n_rows = 0
+        try:
+            conn.execute(
+                r"CREATE TEMP TABLE archive_cycles(cycle TEXT PRIMARY KEY)")
+            conn.executemany(
+                r"INSERT OR IGNORE INTO archive_cycles VALUES(?)",
+                [[cycle] for cycle in cycles])
+            for table_name in self.TABLES_ARCHIVED:
+                form_data = {
+                    "name": table_name,
+                    "columns_str": ",".join(
+                        column.name
+                        for column in self.tables[table_name].columns)}
+                n_rows += conn.execute((
+                    r"INSERT OR REPLACE INTO archive.%(name)s(%(columns_str)s)"
+                    r" SELECT %(columns_str)s FROM main.%(name)s"
+                    r" WHERE cycle IN (SELECT cycle FROM archive_cycles)"
+                ) % form_data).rowcount
+                conn.execute((
+                    r"DELETE FROM main.%(name)s"
+                    r" WHERE cycle IN (SELECT cycle FROM archive_cycles)"
+                ) % form_data)
+            conn.commit()
+            # Return freed pages to the file system (see "vacuum")
+            conn.execute(r"PRAGMA incremental_vacuum").fetchall()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            if self.is_persistent:
+                conn.execute(r"DROP TABLE IF EXISTS temp.archive_cycles")
+                conn.execute(r"DETACH DATABASE archive")
+            else:
+                self.close()
+        return n_rows
+
+    def get_archive_file_names(self):
+        """Return paths of archive database files, newest first."""
+        if not self.archive_dir:
+            return []
+        return sorted(
+            glob(os.path.join(
+                self.archive_dir, self.ARCHIVE_FILE_BASE_NAME_GLOB)),
+            reverse=True)
+
+    def execute_with_archives(self, stmt, stmt_args=None):
+        """Execute a SELECT statement on this database and its archives.
+
+        Yield the rows from this database, then those from each archive file,
+        newest first. The statement should only select from TABLES_ARCHIVED.
+        The rows of a cycle point are normally in one file only, but tasks of
+        an archived cycle point may be re-run and archived again later, so
+        callers wanting the latest row of a task should take the first.
+        """
+        if stmt_args is None:
+            stmt_args = []
+        for row in self.connect().execute(stmt, stmt_args):
+            yield row
+        for archive_file_name in self.get_archive_file_names():
+            conn = sqlite3.connect(archive_file_name, self.CONN_TIMEOUT)
+            try:
+                for row in conn.execute(stmt, stmt_args):
+                    yield row
+            finally:
+                conn.close()
+
     def select_broadcast_states(self, callback, id_key=None):
         """Select from broadcast_states or broadcast_states_checkpoints.
 
@@ -570,7 +872,7 @@ class CylcSuiteDAO(object):
                 "table": self.TABLE_TASK_JOBS}
             stmt_args = [cycle, name, submit_num]
         try:
-            for row in self.connect().execute(stmt, stmt_args):
+            for row in self.execute_with_archives(stmt, stmt_args):
                 ret = {}
                 for key, value in zip(keys, row):
                     ret[key] = value
@@ -578,6 +880,19 @@ class CylcSuiteDAO(object):
         except sqlite3.DatabaseError:
             return None
 
+    def select_task_cycles_updated(self):
+        """Select cycle points in task_states, and when they were updated.
+
+        Return a dict {cycle: time_updated, ...}, where time_updated is the
+        latest update time of the tasks at the cycle point.
+        """
+        stmt = r"SELECT cycle,MAX(time_updated) FROM %s GROUP BY cycle" % (
+            self.TABLE_TASK_STATES)
+        ret = {}
+        for cycle, time_updated in self.connect().execute(stmt):
+            ret[cycle] = time_updated
+        return ret
+
     def select_task_job_run_times(self, callback):
         """Select run times of succeeded task jobs grouped by task names.
 
@@ -624,8 +939,9 @@ class CylcSuiteDAO(object):
             for name, cycle in task_ids:
                 stmt_args += [name, cycle]
         ret = {}
-        for name, cycle, submit_num in self.connect().execute(stmt, stmt_args):
-            ret[(name, cycle)] = submit_num
+        for name, cycle, submit_num in self.execute_with_archives(
+                stmt, stmt_args):
+            ret.setdefault((name, cycle), submit_num)
         return ret
 
     def select_task_pool(self, callback, id_key=None):
@@ -738,7 +1054,7 @@ class CylcSuiteDAO(object):
             'name', 'cycle', 'host', 'batch_system',
             'submit_time', 'start_time', 'succeed_time'
         )
-        return columns, [r for r in self.connect().execute(q)]
+        return columns, [r for r in self.execute_with_archives(q)]
 
     def take_checkpoints(self, event, other_daos=None):
         """Add insert items to *_checkpoints tables.
@@ -904,6 +1220,32 @@ class CylcSuiteDAO(object):
             conn.execute(r"DROP TABLE " + t_name + "_old")
         conn.commit()
 
+    def wal_checkpoint(self):
+        """Checkpoint the write-ahead log, if database is in WAL mode.
+
+        Copy content of the write-ahead log into the database file, and
+        truncate the log. This is a no-op if the database is not in WAL mode
+        or if there is no open connection. (The log is checkpointed when the
+        last connection to the database file is closed.)
+        """
+        if self.conn is None:
+            return
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        except sqlite3.Error:
+            if not self.is_public:
+                raise
+            if cylc.flags.debug:
+                traceback.print_exc()
+
     def vacuum(self):
-        """Vacuum to the database."""
-        return self.connect().execute("VACUUM")
+        """Vacuum to the database.
+
+        Switch the database to incremental auto-vacuum mode, if not already,
+        so that pages freed by "archive_cycles" can be returned to the file
+        system while the suite is running. (A new suite database is created in
+        this mode, but the database of an older suite may not be.)
+        """
+        conn = self.connect()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        return conn.execute("VACUUM")
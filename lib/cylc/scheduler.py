@@ -17,13 +17,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Cylc scheduler server."""
 
-from collections import deque
 from logging import DEBUG
 import os
 from Queue import Empty, Queue
 from shutil import copytree, rmtree
 from subprocess import Popen, PIPE
 import sys
+from threading import Event
 from time import sleep, time
 import traceback
 
@@ -39,6 +39,8 @@ from cylc.daemonize import daemonize
 from cylc.exceptions import CylcError
 import cylc.flags
 from cylc.log_diagnosis import LogSpec
+from cylc.loop_metrics import LoopMetrics, RollingStats, get_cpu_times
+from cylc.lru_cache import get_lru_cache_stats
 from cylc.mp_pool import SuiteProcPool
 from cylc.network import PRIVILEGE_LEVELS
 from cylc.network.httpserver import HTTPServer
@@ -76,6 +78,18 @@ class SchedulerStop(CylcError):
     pass
 
 
+class WakeupQueue(Queue):
+    """A queue that sets an event whenever an item is put in it."""
+
+    def __init__(self, event, maxsize=0):
+        Queue.__init__(self, maxsize)
+        self.event = event
+
+    def put(self, item, block=True, timeout=None):
+        Queue.put(self, item, block, timeout)
+        self.event.set()
+
+
 class Scheduler(object):
     """Cylc scheduler server."""
 
@@ -86,10 +100,12 @@ class Scheduler(object):
     EVENT_STALLED = SuiteEventHandler.EVENT_STALLED
 
     # Intervals in seconds
-    INTERVAL_MAIN_LOOP = 1.0
     INTERVAL_STOP_KILL = 10.0
     INTERVAL_STOP_PROCESS_POOL_EMPTY = 0.5
 
+    # Maximum number of task messages to handle in each main loop iteration
+    MAX_TASK_MESSAGES_PER_LOOP = 1000
+
     START_MESSAGE_PREFIX = 'Suite starting: '
     START_MESSAGE_TMPL = (
         START_MESSAGE_PREFIX + 'server=%(host)s:%(port)s pid=%(pid)s')
@@ -164,12 +180,26 @@ class Scheduler(object):
         self.task_events_mgr = None
         self.suite_event_handler = None
         self.httpserver = None
+        self.main_loop_wakeup = None
+        self.main_loop_min_interval = None
+        self.main_loop_max_interval = None
         self.command_queue = None
         self.message_queue = None
+        self.message_backlog = 0
+        self.message_latency = None
+        # Receive time of the oldest task message since task processing,
+        # and the sum and count of message to job submit latencies.
+        self.message_recv_time = None
+        self.submit_latency_sum = 0.0
+        self.submit_latency_count = 0
         self.ext_trigger_queue = None
 
-        self._profile_amounts = {}
+        # {category: RollingStats, ...}
+        self._profile_stats = {}
         self._profile_update_times = {}
+        self._profile_cpu_times = None
+        # Timings and counters of main loop phases
+        self.loop_metrics = LoopMetrics()
 
         self.stop_mode = None
 
@@ -198,8 +228,8 @@ class Scheduler(object):
         self.suite_log = None
 
         self.ref_test_allowed_failures = []
-        # Last 10 durations (in seconds) of the main loop
-        self.main_loop_intervals = deque(maxlen=10)
+        # Durations (in seconds) of the main loop
+        self.main_loop_intervals = RollingStats()
 
         self.can_auto_stop = True
         self.previous_profile_point = 0
@@ -301,9 +331,15 @@ conditions; see `cylc conditions`.
         # Start up essential services
         self.suite_log = SuiteLog.get_inst(self.suite)
         self.state_summary_mgr = StateSummaryMgr()
-        self.command_queue = Queue()
-        self.message_queue = Queue()
-        self.ext_trigger_queue = Queue()
+        self.main_loop_wakeup = Event()
+        self.main_loop_min_interval = GLOBAL_CFG.get(
+            ['main loop minimum interval'])
+        self.main_loop_max_interval = GLOBAL_CFG.get(
+            ['main loop maximum interval'])
+        self.command_queue = WakeupQueue(self.main_loop_wakeup)
+        self.message_queue = WakeupQueue(self.main_loop_wakeup)
+        self.ext_trigger_queue = WakeupQueue(self.main_loop_wakeup)
+        self.proc_pool.wakeup_event = self.main_loop_wakeup
         self.suite_event_handler = SuiteEventHandler(self.proc_pool)
         self.task_job_mgr = TaskJobManager(
             self.suite, self.proc_pool, self.suite_db_mgr,
@@ -345,7 +381,7 @@ conditions; see `cylc conditions`.
                 raise SchedulerError(
                     'ERROR: this suite requires the %s run mode' % reqmode)
 
-        self.task_events_mgr.broadcast_mgr.linearized_ancestors.update(
+        self.task_events_mgr.broadcast_mgr.set_linearized_ancestors(
             self.config.get_linearized_ancestors())
         self.task_events_mgr.mail_interval = self._get_cylc_conf(
             "task event mail interval")
@@ -368,7 +404,7 @@ conditions; see `cylc conditions`.
 
         self.pool = TaskPool(
             self.config, self.final_point, self.suite_db_mgr,
-            self.task_events_mgr)
+            self.task_events_mgr, self.task_job_mgr.suite_state_poller)
 
         self.profiler.log_memory("scheduler.py: before load_tasks")
         if self.is_restart:
@@ -522,32 +558,56 @@ conditions; see `cylc conditions`.
             return
 
     def process_queued_task_messages(self):
-        """Handle incoming task messages for each task proxy."""
+        """Handle incoming task messages for each task proxy.
+
+        Handle at most MAX_TASK_MESSAGES_PER_LOOP messages, so that a burst of
+        messages does not hold up the rest of the main loop. Any remaining
+        messages are left in the queue for the next iteration.
+
+        Return the number of messages handled.
+        """
         task_id_messages = {}
-        while self.message_queue.qsize():
+        task_ids = []
+        now = time()
+        latency = 0.0
+        n_messages = 0
+        while n_messages < self.MAX_TASK_MESSAGES_PER_LOOP:
             try:
-                task_id, severity, message = self.message_queue.get(
+                task_id, severity, message, recv_time = self.message_queue.get(
                     block=False)
             except Empty:
                 break
             self.message_queue.task_done()
-            task_id_messages.setdefault(task_id, [])
+            n_messages += 1
+            latency = max(latency, now - recv_time)
+            if task_id not in task_id_messages:
+                task_id_messages[task_id] = []
+                task_ids.append(task_id)
             task_id_messages[task_id].append((severity, message))
-        for itask in self.pool.get_tasks():
-            if itask.identity in task_id_messages:
-                for severity, message in task_id_messages[itask.identity]:
-                    self.task_events_mgr.process_message(
-                        itask, severity, message,
-                        self.task_job_mgr.poll_task_jobs, is_incoming=True)
+        self.message_backlog = self.message_queue.qsize()
+        if n_messages:
+            self.message_latency = latency
+            if self.message_recv_time is None:
+                self.message_recv_time = now - latency
+        for task_id in task_ids:
+            itask = self.pool.get_task_by_id(task_id)
+            if itask is None:
+                continue
+            for severity, message in task_id_messages[task_id]:
+                self.task_events_mgr.process_message(
+                    itask, severity, message,
+                    self.task_job_mgr.poll_task_jobs, is_incoming=True)
+        return n_messages
 
     def process_command_queue(self):
-        """Process queued commands."""
+        """Process queued commands. Return the number of commands."""
         qsize = self.command_queue.qsize()
         if qsize > 0:
             log_msg = 'Processing ' + str(qsize) + ' queued command(s)'
         else:
-            return
+            return 0
 
+        n_commands = 0
         while True:
             try:
                 name, args, kwargs = self.command_queue.get(False)
@@ -583,7 +643,9 @@ conditions; see `cylc conditions`.
                 if name in self.PROC_CMDS:
                     self.task_events_mgr.pflag = True
             self.command_queue.task_done()
+            n_commands += 1
         LOG.info(log_msg)
+        return n_commands
 
     def _task_type_exists(self, name_or_id):
         """Does a task name or id match a known task type in this suite?"""
@@ -631,6 +693,13 @@ conditions; see `cylc conditions`.
         """Return the global, task, and family summary data structures."""
         return self.state_summary_mgr.get_state_summary()
 
+    def info_get_metrics(self):
+        """Return timings and counters of main loop phases.
+
+        See LoopMetrics.get for the structure of the return value.
+        """
+        return self.loop_metrics.get()
+
     def info_get_task_info(self, names):
         """Return info of a task."""
         results = {}
@@ -641,7 +710,9 @@ conditions; see `cylc conditions`.
                 results[name] = {}
         return results
 
-    def info_get_latest_state(self, client_info, full_mode):
+    def info_get_latest_state(
+            self, client_info, full_mode, summary_revision=None,
+            summary_run_id=None):
         """Return latest suite state (suitable for a GUI update).
 
         If previous update time is set, return only information since previous
@@ -651,12 +722,21 @@ conditions; see `cylc conditions`.
         Args:
             client_info (dict): store 'prev_time', 'prev_err_size'.
             full_mode (bool): force full update
+            summary_revision (int):
+                state summary revision of client, if it can apply changes
+            summary_run_id (str):
+                run ID of state summary revision of client
 
         Return:
             (dict):
                 cylc_version (str): version of cylc running this suite
                 full_mode (bool): is this returning a full update?
                 summary (tuple): (global_summary, task_summary, family_summary)
+                summary_delta (tuple):
+                    changes to summary since summary_revision, see
+                    StateSummaryMgr.get_state_summary_delta, instead of summary
+                summary_revision (int): revision of summary or summary_delta
+                summary_run_id (str): run ID of summary_revision
                 ancestors (dict): first parent ancestors
                 ancestors_pruned (dict):
                     first parent ancestors, without non-task namespaces
@@ -664,7 +744,8 @@ conditions; see `cylc conditions`.
                 err_content (str): new content in error log
                 err_size (int): new size of error log
                 mean_main_loop_interval (float):
-                    average time interval (seconds) of last 10 main loops
+                    average time interval (seconds) of main loops in the last
+                    minute, or in the last 15 minutes if none
 
         See Also:
             info_get_graph_raw
@@ -680,9 +761,21 @@ conditions; see `cylc conditions`.
         if prev_time is None:
             full_mode = True
             ret['full_mode'] = True
-        if full_mode or (
+        summary_delta = None
+        if not full_mode and summary_revision is not None:
+            summary_delta = self.state_summary_mgr.get_state_summary_delta(
+                summary_revision, summary_run_id)
+        if summary_delta is not None:
+            if summary_delta[0] > summary_revision:
+                ret['summary_delta'] = summary_delta
+            ret['summary_revision'] = summary_delta[0]
+            ret['summary_run_id'] = summary_run_id
+        elif full_mode or summary_revision is not None or (
                 self.state_summary_mgr.update_time and
                 prev_time < self.state_summary_mgr.update_time):
+            # Revision first, as the summary may only be newer
+            ret['summary_revision'] = self.state_summary_mgr.revision
+            ret['summary_run_id'] = self.state_summary_mgr.run_id
             ret['summary'] = self.state_summary_mgr.get_state_summary()
         if full_mode or (
                 self.suiterc_update_time and
@@ -696,9 +789,10 @@ conditions; see `cylc conditions`.
                 self.suite_log.ERR, client_info.get('prev_err_size'))
             client_info['prev_err_size'] = ret['err_size']
         client_info['prev_time'] = client_info['time']
-        if self.main_loop_intervals:
-            ret['mean_main_loop_interval'] = (
-                sum(self.main_loop_intervals) / len(self.main_loop_intervals))
+        stats = (
+            self.main_loop_intervals.get(60) or self.main_loop_intervals.get())
+        if stats:
+            ret['mean_main_loop_interval'] = stats['mean']
         return ret
 
     def info_get_graph_raw(self, cto, ctn, group_nodes=None,
@@ -861,7 +955,7 @@ conditions; see `cylc conditions`.
         old_tasks = set(self.config.get_task_name_list())
         self.suite_db_mgr.checkpoint("reload-init")
         self.load_suiterc(is_reload=True)
-        self.task_events_mgr.broadcast_mgr.linearized_ancestors = (
+        self.task_events_mgr.broadcast_mgr.set_linearized_ancestors(
             self.config.get_linearized_ancestors())
         self.suite_db_mgr.put_runtime_inheritance(self.config)
         self.pool.set_do_reload(self.config, self.final_point)
@@ -1170,24 +1264,34 @@ conditions; see `cylc conditions`.
 
     def process_task_pool(self):
         """Process ALL TASKS whenever something has changed that might
-        require renegotiation of dependencies, etc"""
+        require renegotiation of dependencies, etc
+
+        Return the number of task jobs submitted.
+        """
         if cylc.flags.debug:
             LOG.debug("BEGIN TASK PROCESSING")
             time0 = time()
         if (self._get_events_conf(self.EVENT_INACTIVITY_TIMEOUT) and
                 self._get_events_conf('reset inactivity timer')):
             self.set_suite_inactivity_timer()
-        self.pool.match_dependencies()
+        self._run_loop_phase(
+            'match_dependencies', 'tasks_scanned',
+            self.pool.match_dependencies)
+        done_tasks = []
         if self.stop_mode is None:
             itasks = self.pool.get_ready_tasks()
             if itasks:
                 cylc.flags.iflag = True
             done_tasks = self.task_job_mgr.submit_task_jobs(
                 self.suite, itasks, self.run_mode == 'simulation')
+            if done_tasks and self.message_recv_time is not None:
+                self.submit_latency_sum += time() - self.message_recv_time
+                self.submit_latency_count += 1
             if self.config.cfg['cylc']['log resolved dependencies']:
                 for itask in done_tasks:
                     deps = itask.state.get_resolved_dependencies()
                     LOG.info('triggered off %s' % deps, itask=itask)
+        self.message_recv_time = None
         for meth in [
                 self.pool.spawn_all_tasks,
                 self.pool.remove_spent_tasks,
@@ -1200,11 +1304,12 @@ conditions; see `cylc conditions`.
         if cylc.flags.debug:
             LOG.debug("END TASK PROCESSING (took %s seconds)" %
                       (time() - time0))
+        return len(done_tasks)
 
     def process_suite_db_queue(self):
-        """Update suite DB."""
+        """Update suite DB. Return the number of rows written."""
         try:
-            self.suite_db_mgr.process_queued_ops()
+            return self.suite_db_mgr.process_queued_ops()
         except OSError as err:
             if cylc.flags.debug:
                 ERR.debug(traceback.format_exc())
@@ -1226,7 +1331,7 @@ conditions; see `cylc conditions`.
             self.check_suite_inactive()
         # check submission and execution timeout and polling timers
         if self.run_mode != 'simulation':
-            self.task_job_mgr.check_task_jobs(self.suite, self.pool)
+            self.task_job_mgr.check_task_jobs(self.suite, self.pool, time())
 
     def suite_shutdown(self):
         """Determines if the suite can be shutdown yet."""
@@ -1274,6 +1379,13 @@ conditions; see `cylc conditions`.
                 self.profiler.log_memory(
                     "scheduler.py: end main loop (total loops %d): %s" %
                     (self.count, get_current_time_string()))
+                if self.submit_latency_count:
+                    LOG.info(
+                        "PROFILE: task message to job submit latency (s):"
+                        " mean: %.3f count: %d" % (
+                            self.submit_latency_sum /
+                            self.submit_latency_count,
+                            self.submit_latency_count))
             if self.stop_mode == TaskPool.STOP_AUTO_ON_TASK_FAILURE:
                 raise SchedulerError(self.stop_mode)
             else:
@@ -1319,14 +1431,53 @@ conditions; see `cylc conditions`.
         now = time()
         self._update_profile_info("scheduler loop dt (s)", now - tinit,
                                   amount_format="%.3f")
+        pub_write_lag = self.suite_db_mgr.get_pub_write_lag()
+        if pub_write_lag is not None:
+            self._update_profile_info(
+                "public database write lag (s)", pub_write_lag,
+                amount_format="%.3f")
+        self._update_profile_info("task message backlog", self.message_backlog)
+        if self.message_latency is not None:
+            self._update_profile_info(
+                "task message latency (s)", self.message_latency,
+                amount_format="%.3f")
+            self.message_latency = None
         self._update_cpu_usage()
         if now - self.previous_profile_point >= 60:
             # Only get this every minute.
             self.previous_profile_point = now
             self.profiler.log_memory("scheduler.py: loop #%d: %s" % (
                 self.count, get_current_time_string()))
+            self._log_lru_cache_stats()
+            for line in self.loop_metrics.get_summary_lines():
+                LOG.info("PROFILE: main loop phase %s" % line)
         self.count += 1
 
+    @staticmethod
+    def _log_lru_cache_stats():
+        """Log the sizes and hit, miss and eviction counts of LRU caches."""
+        for name, size, max_size, hits, misses, evictions in (
+                get_lru_cache_stats()):
+            LOG.info(
+                "PROFILE: cache %s: size: %d/%d hits: %d misses: %d"
+                " evictions: %d" % (
+                    name, size, max_size, hits, misses, evictions))
+
+    def _run_loop_phase(self, name, count_key, func, *args):
+        """Call func(*args) as main loop phase "name", return its result.
+
+        Record the duration of the call in self.loop_metrics. If count_key is
+        set, record the result as a count under that key.
+        """
+        time0 = time()
+        result = func(*args)
+        if count_key is None:
+            self.loop_metrics.add(name, time() - time0)
+        else:
+            self.loop_metrics.add(
+                name, time() - time0, **{count_key: result or 0})
+        return result
+
     def run(self):
         """Main loop."""
 
@@ -1339,8 +1490,12 @@ conditions; see `cylc conditions`.
                 self.suite_db_mgr.checkpoint("reload-done")
                 cylc.flags.iflag = True
 
-            self.process_command_queue()
-            if self.pool.release_runahead_tasks():
+            self._run_loop_phase(
+                'process_command_queue', 'commands',
+                self.process_command_queue)
+            if self._run_loop_phase(
+                    'release_runahead_tasks', 'tasks_released',
+                    self.pool.release_runahead_tasks):
                 cylc.flags.iflag = True
                 self.task_events_mgr.pflag = True
             self.proc_pool.handle_results_async()
@@ -1348,24 +1503,49 @@ conditions; see `cylc conditions`.
             # PROCESS ALL TASKS whenever something has changed that might
             # require renegotiation of dependencies, etc.
             if self.process_tasks():
-                self.process_task_pool()
-
-            self.process_queued_task_messages()
-            self.process_command_queue()
+                self._run_loop_phase(
+                    'process_task_pool', 'jobs_submitted',
+                    self.process_task_pool)
+
+            self._run_loop_phase(
+                'process_queued_task_messages', 'messages',
+                self.process_queued_task_messages)
+            self._run_loop_phase(
+                'process_command_queue', 'commands',
+                self.process_command_queue)
+            time0 = time()
+            n_event_timers = len(self.task_events_mgr.event_timers)
             self.task_events_mgr.process_events(self)
+            self.loop_metrics.add(
+                'process_events', time() - time0,
+                event_timers=n_event_timers)
 
             # Update database
-            self.suite_db_mgr.put_task_event_timers(self.task_events_mgr)
+            self._run_loop_phase(
+                'put_task_event_timers', None,
+                self.suite_db_mgr.put_task_event_timers, self.task_events_mgr)
             has_changes = cylc.flags.iflag
             if cylc.flags.iflag:
-                self.suite_db_mgr.put_task_pool(self.pool)
-                self.update_state_summary()  # Will reset cylc.flags.iflag
-            self.process_suite_db_queue()
+                self._run_loop_phase(
+                    'put_task_pool', 'tasks_written',
+                    self.suite_db_mgr.put_task_pool, self.pool)
+                # Will reset cylc.flags.iflag
+                self._run_loop_phase(
+                    'update_state_summary', 'summaries_changed',
+                    self.update_state_summary)
+            self._run_loop_phase(
+                'process_suite_db_queue', 'rows_written',
+                self.process_suite_db_queue)
 
             # If public database is stuck, blast it away by copying the content
             # of the private database into it.
             self.database_health_check()
 
+            # Move task rows of old cycle points to the database archives
+            self._run_loop_phase(
+                'archive_task_rows', 'cycles_archived',
+                self.suite_db_mgr.archive_task_rows, self.pool)
+
             # Shutdown suite if timeouts have occurred
             self.timeout_check()
 
@@ -1378,13 +1558,19 @@ conditions; see `cylc conditions`.
             if self.options.profile_mode:
                 self.update_profiler_logs(tinit)
 
-            sleep(self.INTERVAL_MAIN_LOOP)
-            self.main_loop_intervals.append(time() - tinit)
+            # Task timers were checked after tinit.
+            self.pool.set_timer_deadlines(tinit)
+            self.wait_main_loop(tinit)
+            self.main_loop_intervals.add(time() - tinit)
+            self.loop_metrics.add('main_loop', time() - tinit)
             # END MAIN LOOP
 
     def update_state_summary(self):
-        """Update state summary, e.g. for GUI."""
-        self.state_summary_mgr.update(self)
+        """Update state summary, e.g. for GUI.
+
+        Return the number of task and family summaries changed.
+        """
+        n_changed = self.state_summary_mgr.update(self)
         cylc.flags.iflag = False
         self.is_stalled = False
         if self.suite_timer_active:
@@ -1394,6 +1580,7 @@ conditions; see `cylc conditions`.
                     get_seconds_as_interval_string(
                         self._get_events_conf(self.EVENT_TIMEOUT)),
                     get_current_time_string()))
+        return n_changed
 
     def check_suite_timer(self):
         """Check if suite has timed out or not."""
@@ -1441,6 +1628,36 @@ conditions; see `cylc conditions`.
             if self._get_events_conf(self.EVENT_TIMEOUT):
                 self.set_suite_timer()
 
+    def wait_main_loop(self, tinit):
+        """Wait until the next iteration of the main loop is due.
+
+        Wait at least the minimum interval since tinit. Then wait until a
+        task message, command, external trigger or process pool result
+        arrives, or the next task timer is due, but no longer than the
+        maximum interval since tinit. Don't wait for anything if task
+        processing is already required, or if task messages (e.g. those left
+        over by MAX_TASK_MESSAGES_PER_LOOP), commands, external triggers or
+        process pool results are already waiting.
+        """
+        # Anything that arrives after this sets the event again
+        self.main_loop_wakeup.clear()
+        if (self.task_events_mgr.pflag or
+                self.message_queue.qsize() or
+                self.command_queue.qsize() or
+                self.ext_trigger_queue.qsize() or
+                self.proc_pool.has_ready_results()):
+            self.main_loop_wakeup.set()
+        now = time()
+        if now < tinit + self.main_loop_min_interval:
+            sleep(tinit + self.main_loop_min_interval - now)
+            now = time()
+        timeout = tinit + self.main_loop_max_interval - now
+        next_deadline = self.pool.get_next_timer_deadline()
+        if next_deadline is not None:
+            timeout = min(timeout, next_deadline - now)
+        if timeout > 0:
+            self.main_loop_wakeup.wait(timeout)
+
     def process_tasks(self):
         """Return True if waiting tasks are ready."""
         # do we need to do a pass through the main task processing loop?
@@ -1465,14 +1682,18 @@ conditions; see `cylc conditions`.
             process = True
             self.task_job_mgr.task_remote_mgr.ready = False  # reset
 
-        self.pool.set_expired_tasks()
-        if self.pool.waiting_tasks_ready():
+        now = time()
+        self.pool.set_expired_tasks(now)
+        if self.pool.waiting_tasks_ready(now):
             process = True
 
         if self.run_mode == 'simulation' and self.pool.sim_time_check(
                 self.message_queue):
             process = True
 
+        if self.task_job_mgr.suite_state_poller.poll(self.message_queue, now):
+            process = True
+
         return process
 
     def shutdown(self, reason=None):
@@ -1669,43 +1890,42 @@ conditions; see `cylc conditions`.
             return False
 
     def _update_profile_info(self, category, amount, amount_format="%s"):
-        """Update the 1, 5, 15 minute dt averages for a given category."""
+        """Update the 1, 5, 15 minute dt averages for a given category.
+
+        Log the averages, and the 15 minute maximum and 90th percentile, at
+        most once a minute.
+        """
         now = time()
-        self._profile_amounts.setdefault(category, [])
-        amounts = self._profile_amounts[category]
-        amounts.append((now, amount))
-        self._profile_update_times.setdefault(category, None)
-        last_update = self._profile_update_times[category]
+        try:
+            stats = self._profile_stats[category]
+        except KeyError:
+            stats = RollingStats()
+            self._profile_stats[category] = stats
+        stats.add(amount, now)
+        last_update = self._profile_update_times.get(category)
         if last_update is not None and now < last_update + 60:
             return
         self._profile_update_times[category] = now
-        averages = {1: [], 5: [], 15: []}
-        for then, amount in list(amounts):
-            age = (now - then) / 60.0
-            if age > 15:
-                amounts.remove((then, amount))
-                continue
-            for minute_num in averages.keys():
-                if age <= minute_num:
-                    averages[minute_num].append(amount)
         output_text = "PROFILE: %s:" % category
-        for minute_num, minute_amounts in sorted(averages.items()):
-            averages[minute_num] = sum(minute_amounts) / len(minute_amounts)
+        for minute_num in (1, 5, 15):
             output_text += (" %d: " + amount_format) % (
-                minute_num, averages[minute_num])
+                minute_num, stats.get(minute_num * 60, now)['mean'])
+        stats_15 = stats.get(now=now)
+        output_text += (" max: " + amount_format) % stats_15['max']
+        output_text += (" p90: " + amount_format) % stats_15['p90']
         LOG.info(output_text)
 
     def _update_cpu_usage(self):
-        """Obtain CPU usage statistics."""
-        proc = Popen(
-            ["ps", "-o%cpu= ", str(os.getpid())],
-            stdin=open(os.devnull), stdout=PIPE)
-        try:
-            cpu_frac = float(proc.communicate()[0])
-        except (TypeError, OSError, IOError, ValueError) as exc:
-            LOG.warning("Cannot get CPU % statistics: %s" % exc)
-            return
-        self._update_profile_info("CPU %", cpu_frac, amount_format="%.1f")
+        """Obtain CPU usage statistics, since the previous call."""
+        now = time()
+        cpu_time = sum(get_cpu_times())
+        if (self._profile_cpu_times is not None and
+                now > self._profile_cpu_times[0]):
+            prev_now, prev_cpu_time = self._profile_cpu_times
+            self._update_profile_info(
+                "CPU %", 100.0 * (cpu_time - prev_cpu_time) / (now - prev_now),
+                amount_format="%.1f")
+        self._profile_cpu_times = (now, cpu_time)
 
     def _get_cylc_conf(self, key, default=None):
         """Return a named setting under [cylc] from suite.rc or global.rc."""
@@ -17,7 +17,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Manage suite state summary for client, e.g. GUI."""
 
+from array import array
+from collections import deque
+from threading import RLock
 from time import time
+import unittest
+from uuid import uuid4
 
 import cylc.flags
 from cylc.task_id import TaskID
@@ -27,13 +32,33 @@ from cylc.suite_status import (
     SUITE_STATUS_RUNNING, SUITE_STATUS_RUNNING_TO_STOP,
     SUITE_STATUS_RUNNING_TO_HOLD)
 from cylc.task_state import TASK_STATUS_RUNAHEAD
-from cylc.task_state_prop import extract_group_state
+from cylc.task_state_prop import GROUP_STATES_ORDERED
 
 
 class StateSummaryMgr(object):
-    """Manage suite state summary for client, e.g. GUI."""
+    """Manage suite state summary for client, e.g. GUI.
+
+    Each update rebuilds the summary of each task proxy flagged as changed
+    since the previous update, and compares it with a snapshot taken then.
+    Only cycle points with changed task states have their state counts
+    recomputed. The state of a family at a cycle point is looked up from a
+    histogram of the states of its member tasks, kept in step as tasks change
+    state.
+
+    Each update increments the revision number. The revision of the latest
+    change to each task and family summary is kept, so that clients can ask
+    for changes since a revision (see get_state_summary_delta). Revisions
+    start again for each run of a suite, so they are only valid with the run
+    ID of the manager.
+
+    """
 
     TIME_FIELDS = ['submitted_time', 'started_time', 'finished_time']
+    # Number of revisions to keep the IDs of pruned tasks and families for.
+    MAX_DELTA_REVISIONS = 1000
+    # {state: index, ...}, in order of precedence in family state histograms.
+    GROUP_STATE_INDICES = dict(
+        (state, i) for i, state in enumerate(GROUP_STATES_ORDERED))
 
     def __init__(self):
         self.task_summary = {}
@@ -42,72 +67,147 @@ class StateSummaryMgr(object):
         self.update_time = None
         self.state_count_totals = {}
         self.state_count_cycles = {}
+        self.revision = 0
+        self.run_id = str(uuid4())
+        self.lock = RLock()
+        self._config = None
+        self._suite_urls = {}
+        # Family names, and (description, title) of each family
+        self._fam_names = []
+        self._fam_metas = []
+        # {task name: array of family indices of first-parent ancestors, ...}
+        self._fam_indices_of_tasks = {}
+        # {(family index, point_string): array of task counts by state, ...}
+        self._fam_state_counts = {}
+        # {task_id: summary snapshot, ...}, {task_id: revision, ...}
+        self._tasks = {}
+        self._task_revs = {}
+        # {family_id: summary, ...}, {family_id: revision, ...}
+        self._fams = {}
+        self._fam_revs = {}
+        # {point_string: {state: count, ...}, ...}, {state: count, ...}
+        self._state_count_cycles = {}
+        self._state_count_totals = {}
+        # [(revision, [pruned task or family ID, ...]), ...]
+        self._pruned = deque()
 
     def update(self, schd):
-        """Update."""
+        """Update.
+
+        Return the number of task and family summaries changed or pruned.
+        """
+        with self.lock:
+            return self._update(schd)
+
+    def _update(self, schd):
+        """Update, with self.lock held."""
         self.update_time = time()
+        revision = self.revision + 1
         global_summary = {}
-        family_summary = {}
 
-        task_summary, task_states = self._get_tasks_info(schd)
+        changed_points = set()
+        changed_fams = set()
+        is_reloaded = schd.config is not self._config
+        if is_reloaded:
+            # New or reloaded suite definition
+            self._config = schd.config
+            self._suite_urls = dict(
+                (i, j['meta']['URL'])
+                for (i, j) in schd.config.cfg['runtime'].items())
+            self._suite_urls['suite'] = schd.config.cfg['meta']['URL']
+            self._set_family_index(schd.config)
+            self._fam_state_counts.clear()
+            for summary in self._tasks.values():
+                self._count_family_state(
+                    summary['name'], summary['label'], summary['state'], 1,
+                    changed_fams)
+
+        # Rebuild summaries of changed tasks, compare with their snapshots
+        pruned_ids = []
+        changed_ids = []
+        task_ids = set()
+        # {task name: mean elapsed time, or None if no elapsed times, ...}
+        means = {}
+        for itasks, is_runahead in [
+                (schd.pool.get_tasks(), False),
+                (schd.pool.get_rh_tasks(), True)]:
+            for itask in itasks:
+                task_ids.add(itask.identity)
+                snapshot = self._tasks.get(itask.identity)
+                if not (
+                        is_reloaded or
+                        snapshot is None or
+                        itask.is_summary_updated or
+                        itask.state.is_summary_updated or
+                        is_runahead != (
+                            snapshot['state'] == TASK_STATUS_RUNAHEAD) or
+                        self._is_mean_elapsed_time_changed(
+                            itask.tdef, snapshot, means)):
+                    continue
+                itask.is_summary_updated = False
+                itask.state.is_summary_updated = False
+                summary = itask.get_state_summary()
+                if is_runahead:
+                    summary['state'] = TASK_STATUS_RUNAHEAD
+                if summary != snapshot:
+                    self._set_task_summary(
+                        itask.identity, self._get_snapshot(summary),
+                        changed_points, changed_fams)
+                    self._task_revs[itask.identity] = revision
+                    changed_ids.append(itask.identity)
+        for task_id in set(self._tasks) - task_ids:
+            self._set_task_summary(
+                task_id, None, changed_points, changed_fams)
+            del self._task_revs[task_id]
+            pruned_ids.append(task_id)
+
+        # Look up states of changed families
+        fam_ids = set()
+        for key in changed_fams:
+            fam_index, point_string = key
+            f_id = TaskID.get(self._fam_names[fam_index], point_string)
+            for state_index, count in enumerate(self._fam_state_counts[key]):
+                if count:
+                    break
+            else:
+                # No member tasks left
+                del self._fam_state_counts[key]
+                continue
+            fam_ids.add(f_id)
+            description, title = self._fam_metas[fam_index]
+            fam_summary = {'name': self._fam_names[fam_index],
+                           'description': description,
+                           'title': title,
+                           'label': point_string,
+                           'state': GROUP_STATES_ORDERED[state_index]}
+            if fam_summary != self._fams.get(f_id):
+                self._fams[f_id] = fam_summary
+                self._fam_revs[f_id] = revision
+                changed_ids.append(f_id)
+        for key in changed_fams:
+            if key not in self._fam_state_counts:
+                f_id = TaskID.get(self._fam_names[key[0]], key[1])
+                if f_id in self._fams and f_id not in fam_ids:
+                    fam_ids.add(f_id)
+                    del self._fams[f_id]
+                    del self._fam_revs[f_id]
+                    pruned_ids.append(f_id)
+        if is_reloaded:
+            # Families no longer in the suite definition
+            for f_id in set(self._fams) - fam_ids:
+                del self._fams[f_id]
+                del self._fam_revs[f_id]
+                pruned_ids.append(f_id)
+
+        if pruned_ids:
+            self._pruned.append((revision, pruned_ids))
+        while (self._pruned and
+                self._pruned[0][0] <= revision - self.MAX_DELTA_REVISIONS):
+            self._pruned.popleft()
 
         all_states = []
-        ancestors_dict = schd.config.get_first_parent_ancestors()
-
-        # Compute state_counts (total, and per cycle).
-        state_count_totals = {}
-        state_count_cycles = {}
-
-        for point_string, c_task_states in task_states.items():
-            # For each cycle point, construct a family state tree
-            # based on the first-parent single-inheritance tree
-
-            c_fam_task_states = {}
-
-            count = {}
-
-            for key in c_task_states:
-                state = c_task_states[key]
-                if state is None:
-                    continue
-                try:
-                    count[state] += 1
-                except KeyError:
-                    count[state] = 1
-
-                all_states.append(state)
-                for parent in ancestors_dict.get(key, []):
-                    if parent == key:
-                        continue
-                    c_fam_task_states.setdefault(parent, set([]))
-                    c_fam_task_states[parent].add(state)
-
-            state_count_cycles[point_string] = count
-
-            for fam, child_states in c_fam_task_states.items():
-                f_id = TaskID.get(fam, point_string)
-                state = extract_group_state(child_states)
-                if state is None:
-                    continue
-                try:
-                    famcfg = schd.config.cfg['runtime'][fam]['meta']
-                except KeyError:
-                    famcfg = {}
-                description = famcfg.get('description')
-                title = famcfg.get('title')
-                family_summary[f_id] = {'name': fam,
-                                        'description': description,
-                                        'title': title,
-                                        'label': point_string,
-                                        'state': state}
-
-        state_count_totals = {}
-        for point_string, count in state_count_cycles.items():
-            for state, state_count in count.items():
-                state_count_totals.setdefault(state, 0)
-                state_count_totals[state] += state_count
-
-        all_states.sort()
+        for state, state_count in sorted(self._state_count_totals.items()):
+            all_states += [state] * state_count
 
         for key, value in (
                 ('oldest cycle point string', schd.pool.get_min_point()),
@@ -128,12 +228,8 @@ class StateSummaryMgr(object):
         global_summary['namespace definition order'] = (
             schd.config.ns_defn_order)
         global_summary['reloading'] = schd.pool.do_reload
-        global_summary['state totals'] = state_count_totals
-        # Extract suite and task URLs from config.
-        global_summary['suite_urls'] = dict(
-            (i, j['meta']['URL'])
-            for (i, j) in schd.config.cfg['runtime'].items())
-        global_summary['suite_urls']['suite'] = schd.config.cfg['meta']['URL']
+        global_summary['state totals'] = dict(self._state_count_totals)
+        global_summary['suite_urls'] = self._suite_urls
 
         # Construct a suite status string for use by monitoring clients.
         if schd.pool.is_held:
@@ -159,40 +255,172 @@ class StateSummaryMgr(object):
             global_summary['status_string'] = SUITE_STATUS_RUNNING
 
         # Replace the originals (atomic update, for access from other threads).
-        self.task_summary = task_summary
+        if changed_ids or pruned_ids:
+            self.task_summary = dict(self._tasks)
+            self.family_summary = dict(self._fams)
+        if changed_points:
+            self.state_count_totals = global_summary['state totals']
+            self.state_count_cycles = dict(
+                (point_string, dict(count))
+                for point_string, count in self._state_count_cycles.items())
         self.global_summary = global_summary
-        self.family_summary = family_summary
-        self.state_count_totals = state_count_totals
-        self.state_count_cycles = state_count_cycles
+        # Set last, for clients reading the revision then the summary.
+        self.revision = revision
+        return len(changed_ids) + len(pruned_ids)
 
     @staticmethod
-    def _get_tasks_info(schd):
-        """Retrieve task summary info and states."""
-
-        task_summary = {}
-        task_states = {}
+    def _is_mean_elapsed_time_changed(tdef, snapshot, means):
+        """Return True if the mean elapsed time of tdef is not in snapshot.
+
+        Any task of the same definition that finishes changes the mean, so
+        it is checked without the flags of each task. Cache means by task
+        name in means.
+        """
+        try:
+            mean = means[tdef.name]
+        except KeyError:
+            mean = None
+            if tdef.elapsed_times:
+                mean = (
+                    float(sum(tdef.elapsed_times)) / len(tdef.elapsed_times))
+            means[tdef.name] = mean
+        return mean is not None and mean != snapshot.get('mean_elapsed_time')
 
-        for task in schd.pool.get_tasks():
-            ts = task.get_state_summary()
-            task_summary[task.identity] = ts
-            name, point_string = TaskID.split(task.identity)
-            task_states.setdefault(point_string, {})
-            task_states[point_string][name] = ts['state']
-
-        for task in schd.pool.get_rh_tasks():
-            ts = task.get_state_summary()
-            ts['state'] = TASK_STATUS_RUNAHEAD
-            task_summary[task.identity] = ts
-            name, point_string = TaskID.split(task.identity)
-            task_states.setdefault(point_string, {})
-            task_states[point_string][name] = ts['state']
-
-        return task_summary, task_states
+    @staticmethod
+    def _get_snapshot(summary):
+        """Return a copy of a task summary, with its own mutable values."""
+        snapshot = dict(summary)
+        for key, value in summary.items():
+            if isinstance(value, dict):
+                snapshot[key] = dict(value)
+            elif isinstance(value, list):
+                snapshot[key] = list(value)
+        return snapshot
+
+    def _set_family_index(self, config):
+        """Index the first-parent ancestor families of each task name."""
+        del self._fam_names[:]
+        del self._fam_metas[:]
+        self._fam_indices_of_tasks.clear()
+        fam_indices = {}
+        for name, ancestors in config.get_first_parent_ancestors().items():
+            indices = array('i')
+            for fam in ancestors:
+                if fam == name:
+                    continue
+                if fam not in fam_indices:
+                    fam_indices[fam] = len(self._fam_names)
+                    self._fam_names.append(fam)
+                    try:
+                        famcfg = config.cfg['runtime'][fam]['meta']
+                    except KeyError:
+                        famcfg = {}
+                    self._fam_metas.append(
+                        (famcfg.get('description'), famcfg.get('title')))
+                indices.append(fam_indices[fam])
+            self._fam_indices_of_tasks[name] = indices
+
+    def _set_task_summary(
+            self, task_id, summary, changed_points, changed_fams):
+        """Set (or remove if summary is None) the summary of a task.
+
+        Keep state counts and family state histograms in step. Add the cycle
+        point to changed_points and (family index, cycle point) keys to
+        changed_fams if the task state changes.
+
+        """
+        old_summary = self._tasks.get(task_id)
+        if summary is None:
+            del self._tasks[task_id]
+        else:
+            self._tasks[task_id] = summary
+        old_state = new_state = None
+        if old_summary is not None:
+            old_state = old_summary['state']
+            name, point_string = old_summary['name'], old_summary['label']
+        if summary is not None:
+            new_state = summary['state']
+            name, point_string = summary['name'], summary['label']
+        if old_state == new_state:
+            return
+        changed_points.add(point_string)
+        if old_state is not None:
+            self._count_state(point_string, old_state, -1)
+            self._count_family_state(
+                name, point_string, old_state, -1, changed_fams)
+        if new_state is not None:
+            self._count_state(point_string, new_state, 1)
+            self._count_family_state(
+                name, point_string, new_state, 1, changed_fams)
+
+    def _count_state(self, point_string, state, increment):
+        """Add increment to the state counts of a cycle point and in total."""
+        self._state_count_cycles.setdefault(point_string, {})
+        for count in (
+                self._state_count_cycles[point_string],
+                self._state_count_totals):
+            count[state] = count.get(state, 0) + increment
+            if not count[state]:
+                del count[state]
+        if not self._state_count_cycles[point_string]:
+            del self._state_count_cycles[point_string]
+
+    def _count_family_state(
+            self, name, point_string, state, increment, changed_fams):
+        """Add increment to the state histograms of the families of a task.
+
+        Add the (family index, cycle point) keys to changed_fams.
+
+        """
+        state_index = self.GROUP_STATE_INDICES[state]
+        for fam_index in self._fam_indices_of_tasks.get(name, ()):
+            key = (fam_index, point_string)
+            try:
+                counts = self._fam_state_counts[key]
+            except KeyError:
+                counts = array('i', [0] * len(GROUP_STATES_ORDERED))
+                self._fam_state_counts[key] = counts
+            counts[state_index] += increment
+            changed_fams.add(key)
 
     def get_state_summary(self):
         """Return the global, task, and family summary data structures."""
         return (self.global_summary, self.task_summary, self.family_summary)
 
+    def get_state_summary_delta(self, revision, run_id):
+        """Return changes to the state summary since revision of run_id.
+
+        Return a tuple (revision, global_summary, task_summary, family_summary,
+        pruned_ids), where task_summary and family_summary only contain items
+        changed since the given revision, and pruned_ids is a list of IDs of
+        tasks and families removed since the given revision. Apply pruned_ids
+        before the changed items, as a task can be removed then added back.
+
+        Return None if the given revision is unknown or too old, or is of
+        another run, in which case the client should get the full state
+        summary.
+
+        """
+        with self.lock:
+            if run_id != self.run_id or not (
+                    self.revision - self.MAX_DELTA_REVISIONS <=
+                    revision <= self.revision):
+                return None
+            task_summary = dict(
+                (task_id, self._tasks[task_id])
+                for task_id, rev in self._task_revs.items() if rev > revision)
+            family_summary = dict(
+                (f_id, self._fams[f_id])
+                for f_id, rev in self._fam_revs.items() if rev > revision)
+            pruned_ids = []
+            for rev, ids in reversed(self._pruned):
+                if rev <= revision:
+                    break
+                pruned_ids.extend(ids)
+            return (
+                self.revision, self.global_summary, task_summary,
+                family_summary, pruned_ids)
+
     def get_state_totals(self):
         """Return dict of count per state and dict of state count per cycle."""
         return (self.state_count_totals, self.state_count_cycles)
@@ -224,3 +452,237 @@ class StateSummaryMgr(object):
                     (None, len(ret[state]) - 5, None,)]
 
         return ret
+
+
+class TestStateSummaryMgr(unittest.TestCase):
+    """Unit tests for StateSummaryMgr."""
+
+    class FakeTaskDef(object):
+        """Task definition with just a name and elapsed times."""
+
+        def __init__(self, name):
+            self.name = name
+            self.elapsed_times = []
+
+    class FakeTaskState(object):
+        """Task state with just a status and a summary flag."""
+
+        def __init__(self, status):
+            self.status = status
+            self.is_summary_updated = True
+
+    class FakeTaskProxy(object):
+        """Task proxy with just a state summary."""
+
+        def __init__(self, name, point_string, state):
+            self.identity = TaskID.get(name, point_string)
+            self.tdef = TestStateSummaryMgr.FakeTaskDef(name)
+            self.state = TestStateSummaryMgr.FakeTaskState(state)
+            self.is_summary_updated = True
+            self.summary = {
+                'name': name, 'label': point_string, 'job_hosts': {}}
+
+        def get_state_summary(self):
+            """Return the state summary."""
+            self.summary['state'] = self.state.status
+            if self.tdef.elapsed_times:
+                self.summary['mean_elapsed_time'] = (
+                    float(sum(self.tdef.elapsed_times)) /
+                    len(self.tdef.elapsed_times))
+            return self.summary
+
+        def set_state(self, status):
+            """Set the status, and flag the change."""
+            self.state.status = status
+            self.state.is_summary_updated = True
+
+    class FakeSuiteConfig(object):
+        """Suite configuration with tasks "foo" and "bar" in family "FAM"."""
+
+        ns_defn_order = ['root', 'FAM', 'foo', 'bar']
+
+        def __init__(self):
+            self.cfg = {'meta': {'URL': ''}, 'runtime': {}}
+            for name in self.ns_defn_order:
+                self.cfg['runtime'][name] = {'meta': {
+                    'URL': '', 'description': '', 'title': name}}
+
+        @staticmethod
+        def get_first_parent_ancestors():
+            """Return the first parent ancestors of each namespace."""
+            return {
+                'root': ['root'],
+                'FAM': ['FAM', 'root'],
+                'foo': ['foo', 'FAM', 'root'],
+                'bar': ['bar', 'FAM', 'root']}
+
+    class FakeTaskPool(object):
+        """Task pool with tasks and runahead tasks."""
+
+        do_reload = False
+        is_held = False
+        hold_point = None
+
+        def __init__(self):
+            self.tasks = []
+            self.rh_tasks = []
+
+        def get_tasks(self):
+            """Return the tasks."""
+            return self.tasks
+
+        def get_rh_tasks(self):
+            """Return the runahead tasks."""
+            return self.rh_tasks
+
+        @staticmethod
+        def get_min_point():
+            """Return None, as cycle points are not needed."""
+            return None
+
+        get_max_point = get_max_point_runahead = get_min_point
+
+    class FakeScheduler(object):
+        """Scheduler with a suite configuration and a task pool."""
+
+        run_mode = 'live'
+        stop_mode = stop_point = stop_clock_time = stop_task = None
+        final_point = None
+
+        def __init__(self, config, pool):
+            self.config = config
+            self.pool = pool
+
+    def setUp(self):
+        self.pool = self.FakeTaskPool()
+        self.schd = self.FakeScheduler(self.FakeSuiteConfig(), self.pool)
+        self.foo = self.FakeTaskProxy('foo', '1', 'waiting')
+        self.bar = self.FakeTaskProxy('bar', '1', 'running')
+        self.pool.tasks[:] = [self.foo, self.bar]
+        self.mgr = StateSummaryMgr()
+        self.mgr.update(self.schd)
+
+    def test_update(self):
+        """Test the full state summary after changes."""
+        self.assertEqual(self.mgr.revision, 1)
+        self.assertEqual(
+            sorted(self.mgr.task_summary), ['bar.1', 'foo.1'])
+        self.assertEqual(
+            self.mgr.family_summary['FAM.1']['state'], 'running')
+        self.assertEqual(
+            self.mgr.get_state_totals(),
+            ({'running': 1, 'waiting': 1},
+             {'1': {'running': 1, 'waiting': 1}}))
+        self.bar.set_state('succeeded')
+        self.pool.rh_tasks[:] = [self.FakeTaskProxy('foo', '2', 'waiting')]
+        self.mgr.update(self.schd)
+        self.assertEqual(
+            self.mgr.family_summary['FAM.1']['state'], 'waiting')
+        self.assertEqual(
+            self.mgr.family_summary['FAM.2']['state'], 'runahead')
+        self.assertEqual(
+            self.mgr.global_summary['states'],
+            ['runahead', 'succeeded', 'waiting'])
+        self.pool.tasks[:] = []
+        self.mgr.update(self.schd)
+        self.assertEqual(sorted(self.mgr.task_summary), ['foo.2'])
+        self.assertEqual(
+            sorted(self.mgr.family_summary), ['FAM.2', 'root.2'])
+        self.assertEqual(
+            self.mgr.get_state_totals(),
+            ({'runahead': 1}, {'2': {'runahead': 1}}))
+
+    def test_update_reload(self):
+        """Test family states after a reload changes the families."""
+        self.assertEqual(
+            self.mgr.family_summary['FAM.1']['state'], 'running')
+        config = self.FakeSuiteConfig()
+        config.get_first_parent_ancestors = lambda: {
+            'root': ['root'],
+            'FAM': ['FAM', 'root'],
+            'foo': ['foo', 'FAM', 'root'],
+            'bar': ['bar', 'root']}
+        config.cfg['runtime']['FAM']['meta']['title'] = 'Family'
+        self.schd.config = config
+        self.mgr.update(self.schd)
+        self.assertEqual(
+            self.mgr.family_summary['FAM.1']['state'], 'waiting')
+        self.assertEqual(
+            self.mgr.family_summary['FAM.1']['title'], 'Family')
+        self.assertEqual(
+            self.mgr.family_summary['root.1']['state'], 'running')
+        self.bar.set_state('succeeded')
+        self.foo.set_state('succeeded')
+        self.mgr.update(self.schd)
+        self.assertEqual(
+            self.mgr.family_summary['FAM.1']['state'], 'succeeded')
+        self.assertEqual(
+            self.mgr.family_summary['root.1']['state'], 'succeeded')
+
+    def test_update_flagged(self):
+        """Test that only flagged tasks have their summaries rebuilt."""
+        self.foo.summary['latest_message'] = 'hello'
+        self.mgr.update(self.schd)
+        self.assertNotIn('latest_message', self.mgr.task_summary['foo.1'])
+        self.foo.is_summary_updated = True
+        self.mgr.update(self.schd)
+        self.assertEqual(
+            self.mgr.task_summary['foo.1']['latest_message'], 'hello')
+        # A finished task changes the mean elapsed time of others
+        self.bar.tdef.elapsed_times.append(10.0)
+        self.mgr.update(self.schd)
+        self.assertEqual(
+            self.mgr.task_summary['bar.1']['mean_elapsed_time'], 10.0)
+        # Released from the runahead pool
+        self.pool.rh_tasks[:] = [self.FakeTaskProxy('foo', '2', 'waiting')]
+        self.mgr.update(self.schd)
+        self.assertEqual(
+            self.mgr.task_summary['foo.2']['state'], 'runahead')
+        self.pool.tasks.append(self.pool.rh_tasks.pop())
+        self.mgr.update(self.schd)
+        self.assertEqual(
+            self.mgr.task_summary['foo.2']['state'], 'waiting')
+
+    def test_get_state_summary_delta(self):
+        """Test changes since a revision."""
+        run_id = self.mgr.run_id
+        self.assertEqual(self.mgr.get_state_summary_delta(2, run_id), None)
+        self.assertEqual(
+            self.mgr.get_state_summary_delta(1, run_id)[1:], (
+                self.mgr.global_summary, {}, {}, []))
+        self.bar.summary['job_hosts'][1] = 'localhost'
+        self.bar.is_summary_updated = True
+        self.mgr.update(self.schd)
+        revision, _, task_summary, family_summary, pruned_ids = (
+            self.mgr.get_state_summary_delta(1, run_id))
+        self.assertEqual(revision, 2)
+        self.assertEqual(list(task_summary), ['bar.1'])
+        self.assertEqual(family_summary, {})
+        self.pool.tasks[:] = [self.foo]
+        self.mgr.update(self.schd)
+        self.foo.set_state('succeeded')
+        self.mgr.update(self.schd)
+        revision, _, task_summary, family_summary, pruned_ids = (
+            self.mgr.get_state_summary_delta(1, run_id))
+        self.assertEqual(revision, 4)
+        self.assertEqual(list(task_summary), ['foo.1'])
+        self.assertEqual(family_summary['FAM.1']['state'], 'succeeded')
+        self.assertEqual(pruned_ids, ['bar.1'])
+        self.assertEqual(
+            self.mgr.get_state_summary_delta(3, run_id)[2:], (
+                {'foo.1': self.mgr.task_summary['foo.1']},
+                {'FAM.1': self.mgr.family_summary['FAM.1'],
+                 'root.1': self.mgr.family_summary['root.1']},
+                []))
+
+    def test_get_state_summary_delta_other_run(self):
+        """Test that revisions of another run are unknown."""
+        self.assertEqual(
+            self.mgr.get_state_summary_delta(1, self.mgr.run_id)[0], 1)
+        self.assertEqual(
+            self.mgr.get_state_summary_delta(1, StateSummaryMgr().run_id),
+            None)
+
+
+if __name__ == '__main__':
+    unittest.main()
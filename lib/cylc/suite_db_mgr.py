@@ -23,18 +23,184 @@ This module provides the logic to:
 * Hide logic that is relevant for database operations.
 * Recover public run database file lock.
 * Manage existing run database files on restart.
+* Write to public run database file in a separate thread, if configured.
 """
 
+from collections import deque
 import os
 import pickle
 from shutil import copy, rmtree
+import sqlite3
 from subprocess import call
+import sys
 from tempfile import mkstemp
+from threading import Condition, Thread
+from time import time
 
 from cylc.broadcast_report import get_broadcast_change_iter
+from cylc.cfgspec.globalcfg import GLOBAL_CFG
+from cylc.cycling.loader import get_interval, get_point
 from cylc.rundb import CylcSuiteDAO
 from cylc.suite_logging import ERR, LOG
-from cylc.wallclock import get_current_time_string
+from cylc.wallclock import (
+    get_current_time_string, get_unix_time_from_time_string)
+
+
+class SuitePublicDatabaseWriter(Thread):
+    """Write queued items to the public database in a separate thread.
+
+    Queued items are passed to the writer in batches of tables, as returned
+    by "CylcSuiteDAO.pop_queued_tables". Batches waiting to be written are
+    merged where possible, to drop redundant items and to reduce the number
+    of commits. The number of waiting batches is bounded. If it overflows,
+    waiting batches are dropped, and the public database should be
+    recovered from the private database (see "reset").
+    """
+
+    INTVL_RETRY = 1.0
+
+    def __init__(self, dao, max_size):
+        Thread.__init__(self, name="public-database-writer")
+        self.daemon = True
+        self.dao = dao
+        self.max_size = max_size
+        self.cond = Condition()
+        # [(time_queued, {table_name: table, ...}), ...]
+        self.queue = deque()
+        # Time when oldest batch merged into self.dao was queued
+        self.time_queued = None
+        self.is_overflowed = False
+        self.is_stopping = False
+        # [callback, is_done, exc_info]
+        self.reset_request = None
+
+    def get_lag(self):
+        """Return age (in seconds) of the oldest item not yet written."""
+        with self.cond:
+            times = [self.time_queued]
+            if self.queue:
+                times.append(self.queue[0][0])
+        times = [time_queued for time_queued in times if time_queued]
+        if not times:
+            return 0.0
+        return time() - min(times)
+
+    def put(self, tables):
+        """Queue a batch of tables for writing."""
+        if not tables:
+            return
+        with self.cond:
+            if self.is_overflowed:
+                # Will be recovered from private database
+                return
+            if self.queue and self._can_merge(self.queue[-1][1], tables):
+                self._merge(self.queue[-1][1], tables)
+            elif len(self.queue) >= self.max_size:
+                self.queue.clear()
+                self.is_overflowed = True
+                LOG.warning("%s: writer buffer overflowed (%d batches)" % (
+                    self.dao.db_file_name, self.max_size))
+            else:
+                self.queue.append((time(), tables))
+            self.cond.notify_all()
+
+    def reset(self, callback):
+        """Drop queued items, close connection, and call callback.
+
+        Call callback in the writer thread with its connection closed, e.g. to
+        replace the database file. Block until done. Re-raise any exception
+        raised by the callback.
+        """
+        request = [callback, False, None]
+        with self.cond:
+            if self.is_alive():
+                self.reset_request = request
+                self.cond.notify_all()
+                while not request[1] and self.is_alive():
+                    self.cond.wait(self.INTVL_RETRY)
+            if not request[1]:
+                # Writer not running
+                self.reset_request = None
+                self._reset()
+                return callback()
+        if request[2] is not None:
+            raise request[2][0], request[2][1], request[2][2]
+
+    def run(self):
+        """Write queued items until stopped."""
+        while True:
+            with self.cond:
+                self._handle_reset_request()
+                while (self.queue and self.dao.can_merge_queued_tables(
+                        self.queue[0][1])):
+                    time_queued, tables = self.queue.popleft()
+                    self.dao.merge_queued_tables(tables)
+                    if self.time_queued is None:
+                        self.time_queued = time_queued
+                if self.time_queued is None:
+                    if self.is_stopping:
+                        break
+                    self.cond.wait()
+                    continue
+            self.dao.execute_queued_items()
+            with self.cond:
+                if self.dao.n_tries:
+                    if self.is_stopping:
+                        LOG.warning("%s: writer stopped with %d batch(es) "
+                                    "not written" % (
+                                        self.dao.db_file_name,
+                                        len(self.queue) + 1))
+                        break
+                    self.cond.wait(self.INTVL_RETRY)
+                else:
+                    self.time_queued = None
+        self.dao.close()
+
+    def stop(self):
+        """Write remaining queued items and stop."""
+        with self.cond:
+            self.is_stopping = True
+            self.cond.notify_all()
+        self.join()
+
+    def _handle_reset_request(self):
+        """Helper for "run", handle reset request, if any."""
+        if self.reset_request is None:
+            return
+        request = self.reset_request
+        self.reset_request = None
+        self._reset()
+        try:
+            request[0]()
+        except Exception:
+            request[2] = sys.exc_info()
+        request[1] = True
+        self.cond.notify_all()
+
+    def _reset(self):
+        """Helper for "reset", drop queued items and close connection."""
+        self.queue.clear()
+        self.dao.pop_queued_tables()
+        self.time_queued = None
+        self.is_overflowed = False
+        self.dao.close()
+        self.dao.n_tries = 0
+
+    @staticmethod
+    def _can_merge(target, tables):
+        """Return True if tables can be merged into target tables."""
+        return all(
+            target[name].can_merge(table)
+            for name, table in tables.items() if name in target)
+
+    @staticmethod
+    def _merge(target, tables):
+        """Merge tables into target tables."""
+        for name, table in tables.items():
+            if name in target:
+                target[name].merge(table)
+            else:
+                target[name] = table
 
 
 class SuiteDatabaseManager(object):
@@ -52,16 +218,57 @@ class SuiteDatabaseManager(object):
     TABLE_TASK_STATES = CylcSuiteDAO.TABLE_TASK_STATES
     TABLE_TASK_TIMEOUT_TIMERS = CylcSuiteDAO.TABLE_TASK_TIMEOUT_TIMERS
 
+    # Maximum number of cycle points to archive in one main loop pass
+    ARCHIVE_MAX_CYCLES = 10
+
     def __init__(self, pri_d=None, pub_d=None):
         self.pri_path = None
         if pri_d:
             self.pri_path = os.path.join(pri_d, CylcSuiteDAO.DB_FILE_BASE_NAME)
         self.pub_path = None
+        # Archive files of old task rows, beside the public database
+        self.archive_dir = None
         if pub_d:
             self.pub_path = os.path.join(pub_d, CylcSuiteDAO.DB_FILE_BASE_NAME)
+            self.archive_dir = os.path.join(
+                pub_d, CylcSuiteDAO.ARCHIVE_DIR_BASE_NAME)
         self.pri_dao = None
         self.pub_dao = None
 
+        # Connection settings, see "[suite database]" in the global config.
+        db_cfg = GLOBAL_CFG.get(['suite database'])
+        self.is_persistent = db_cfg['persistent connection']
+        self.is_wal = db_cfg['journal mode'] == 'wal'
+        self.pri_pragmas = []
+        self.pub_pragmas = []
+        if self.is_wal:
+            self.pri_pragmas.append(('journal_mode', 'WAL'))
+            # Public database may be read from other hosts, where WAL mode
+            # does not work, so it is always in the default journal mode.
+            self.pub_pragmas.append(('journal_mode', 'DELETE'))
+        for key, name in [
+                ('synchronous', 'synchronous'),
+                ('cache size', 'cache_size'),
+                ('mmap size', 'mmap_size')]:
+            if db_cfg[key] not in [None, '']:
+                self.pri_pragmas.append((name, db_cfg[key]))
+                self.pub_pragmas.append((name, db_cfg[key]))
+        self.wal_checkpoint_interval = db_cfg['checkpoint interval']
+        self.time_next_wal_checkpoint = None
+        self.is_pub_threaded = db_cfg['public database writer'] == 'thread'
+        self.pub_buffer_size = db_cfg['public database buffer size']
+        # If threaded, "self.pub_dao" only queues items for this writer
+        self.pub_writer = None
+        # Archival of task rows of old cycle points. The cycle point offset is
+        # parsed on suite start, when the cycling mode is known.
+        self.archive_point_offset_str = db_cfg['archive cycle point offset']
+        self.archive_point_offset = None
+        self.archive_age = db_cfg['archive age']
+        self.archive_interval = db_cfg['archive interval']
+        self.time_next_archive = None
+        # Cycle points selected for archival, but not yet archived
+        self.archive_cycles_queue = deque()
+
         self.db_deletes_map = {
             self.TABLE_BROADCAST_STATES: [],
             self.TABLE_SUITE_PARAMS: [],
@@ -82,6 +289,78 @@ class SuiteDatabaseManager(object):
             self.TABLE_TASK_TIMEOUT_TIMERS: []}
         self.db_updates_map = {}
 
+        # Keys of rows written by put_task_pool and put_task_event_timers, so
+        # that only changed rows are written on subsequent calls.
+        # (None until the relevant tables are first written.)
+        # {(cycle, name): set([ctx_key_pickle, ...]), ...}
+        self.task_timer_keys = None
+        # set([(cycle, name), ...])
+        self.task_timeout_keys = None
+        # {(cycle, name, ctx_key_pickle): {column: value, ...}, ...}
+        self.event_timer_rows = None
+
+    def archive_task_rows(self, pool):
+        """Move task rows of old cycle points to the database archives.
+
+        Do nothing unless "archive cycle point offset" or "archive age" is set
+        in "[suite database]" of the global config. Once per "archive
+        interval", select cycle points with no tasks in the pool that are
+        earlier than the earliest cycle point in the pool less the offset, or
+        whose tasks were last updated longer ago than the age. Move the rows
+        of up to ARCHIVE_MAX_CYCLES of these per call from the private
+        database to the archive files (see "CylcSuiteDAO.archive_cycles"), so
+        that a large backlog does not hold up the main loop, and delete them
+        from the public database.
+
+        Return the number of cycle points archived.
+        """
+        if self.archive_point_offset is None and self.archive_age is None:
+            return 0
+        now = time()
+        if self.time_next_archive is None:
+            self.time_next_archive = now + self.archive_interval
+        pool_points = None
+        if not self.archive_cycles_queue:
+            if now < self.time_next_archive:
+                return 0
+            self.time_next_archive = now + self.archive_interval
+            pool_points = set(itask.point for itask in pool.get_all_tasks())
+            horizon_point = None
+            if self.archive_point_offset is not None and pool_points:
+                horizon_point = min(pool_points) - self.archive_point_offset
+            for cycle, time_updated in sorted(
+                    self.pri_dao.select_task_cycles_updated().items()):
+                if ((horizon_point is not None and
+                        get_point(cycle) < horizon_point) or
+                        (self.archive_age is not None and time_updated and
+                         get_unix_time_from_time_string(time_updated) <
+                         now - self.archive_age)):
+                    self.archive_cycles_queue.append(cycle)
+        if pool_points is None:
+            pool_points = set(itask.point for itask in pool.get_all_tasks())
+        pool_cycles = set(str(point) for point in pool_points)
+        cycles = []
+        while self.archive_cycles_queue and (
+                len(cycles) < self.ARCHIVE_MAX_CYCLES):
+            cycle = self.archive_cycles_queue.popleft()
+            if cycle not in pool_cycles:
+                cycles.append(cycle)
+        if not cycles:
+            return 0
+        try:
+            n_rows = self.pri_dao.archive_cycles(cycles)
+        except (OSError, sqlite3.Error) as exc:
+            # Rows stay in the live database, to be archived next time
+            LOG.warning("%s: archive failed: %s" % (self.archive_dir, exc))
+            self.archive_cycles_queue.clear()
+            return 0
+        for cycle in cycles:
+            for table_name in CylcSuiteDAO.TABLES_ARCHIVED:
+                self.pub_dao.add_delete_item(table_name, {"cycle": cycle})
+        LOG.info("%s: archived %d cycle point(s), %d row(s)" % (
+            self.archive_dir, len(cycles), n_rows))
+        return len(cycles)
+
     def checkpoint(self, name):
         """Checkpoint the task pool, etc."""
         return self.pri_dao.take_checkpoints(name, other_daos=[self.pub_dao])
@@ -92,6 +371,16 @@ class SuiteDatabaseManager(object):
         Use temporary file to ensure that we do not end up with a partial file.
 
         """
+        # Ensure private database file is up to date, if in WAL mode
+        self.pri_dao.wal_checkpoint()
+        if self.pub_writer is None:
+            self._copy_pri_to_pub()
+        else:
+            # Items queued in the writer are already in the private database
+            self.pub_writer.reset(self._copy_pri_to_pub)
+
+    def _copy_pri_to_pub(self):
+        """Helper for "copy_pri_to_pub"."""
         temp_pub_db_file_name = None
         self.pub_dao.close()
         try:
@@ -102,6 +391,11 @@ class SuiteDatabaseManager(object):
                 prefix=self.pub_dao.DB_FILE_BASE_NAME,
                 dir=os.path.dirname(self.pub_dao.db_file_name))[1]
             copy(self.pri_dao.db_file_name, temp_pub_db_file_name)
+            if self.is_wal:
+                # Copy is in WAL mode, switch it back before it is exposed
+                CylcSuiteDAO(
+                    temp_pub_db_file_name, is_public=True,
+                    pragmas=self.pub_pragmas).connect().close()
             os.rename(temp_pub_db_file_name, self.pub_dao.db_file_name)
             os.chmod(self.pub_dao.db_file_name, st_mode)
         except (IOError, OSError):
@@ -111,7 +405,9 @@ class SuiteDatabaseManager(object):
 
     def get_pri_dao(self):
         """Return the primary DAO."""
-        return CylcSuiteDAO(self.pri_path)
+        return CylcSuiteDAO(
+            self.pri_path, pragmas=self.pri_pragmas,
+            archive_dir=self.archive_dir)
 
     def on_suite_start(self, is_restart):
         """Initialise data access objects.
@@ -126,10 +422,32 @@ class SuiteDatabaseManager(object):
             except OSError:
                 # Just in case the path is a directory!
                 rmtree(self.pri_path, ignore_errors=True)
-        self.pri_dao = self.get_pri_dao()
+            # Archives of a previous run
+            if self.archive_dir:
+                rmtree(self.archive_dir, ignore_errors=True)
+        self.archive_point_offset = get_interval(
+            self.archive_point_offset_str)
+        pri_pragmas = self.pri_pragmas
+        if not is_restart:
+            # Auto-vacuum mode of a new database must be set before its tables
+            # are created, for "archive_task_rows" to shrink the file.
+            pri_pragmas = pri_pragmas + [('auto_vacuum', 'INCREMENTAL')]
+        self.pri_dao = CylcSuiteDAO(
+            self.pri_path, is_persistent=self.is_persistent,
+            pragmas=pri_pragmas, archive_dir=self.archive_dir)
         os.chmod(self.pri_path, 0600)
-        self.pub_dao = CylcSuiteDAO(self.pub_path, is_public=True)
+        self.pub_dao = CylcSuiteDAO(
+            self.pub_path, is_public=True, is_persistent=self.is_persistent,
+            pragmas=self.pub_pragmas)
         self.copy_pri_to_pub()
+        if self.is_pub_threaded:
+            self.pub_writer = SuitePublicDatabaseWriter(
+                CylcSuiteDAO(
+                    self.pub_path, is_public=True,
+                    is_persistent=self.is_persistent,
+                    pragmas=self.pub_pragmas),
+                self.pub_buffer_size)
+            self.pub_writer.start()
         pub_db_path_symlink = os.path.join(
             os.path.dirname(os.path.dirname(self.pub_path)),
             CylcSuiteDAO.OLD_DB_FILE_BASE_NAME)
@@ -150,14 +468,30 @@ class SuiteDatabaseManager(object):
         if self.pri_dao:
             self.pri_dao.close()
             self.pri_dao = None
+        if self.pub_writer:
+            self.pub_writer.stop()
+            self.pub_writer = None
         if self.pub_dao:
             self.pub_dao.close()
             self.pub_dao = None
 
+    def get_pub_write_lag(self):
+        """Return lag (in seconds) of the public database writer thread.
+
+        Return None if the public database is not written in a thread.
+        """
+        if self.pub_writer is None:
+            return None
+        return self.pub_writer.get_lag()
+
     def process_queued_ops(self):
-        """Handle queued db operations for each task proxy."""
+        """Handle queued db operations for each task proxy.
+
+        Return the number of rows written (inserted, updated or deleted).
+        """
+        n_rows = 0
         if self.pri_dao is None:
-            return
+            return n_rows
         # Record suite parameters and tasks in pool
         # Record any broadcast settings to be dumped out
         if any(self.db_deletes_map.values()):
@@ -167,6 +501,7 @@ class SuiteDatabaseManager(object):
                     where_args = db_deletes.pop(0)
                     self.pri_dao.add_delete_item(table_name, where_args)
                     self.pub_dao.add_delete_item(table_name, where_args)
+                    n_rows += 1
         if any(self.db_inserts_map.values()):
             for table_name, db_inserts in sorted(
                     self.db_inserts_map.items()):
@@ -174,6 +509,7 @@ class SuiteDatabaseManager(object):
                     db_insert = db_inserts.pop(0)
                     self.pri_dao.add_insert_item(table_name, db_insert)
                     self.pub_dao.add_insert_item(table_name, db_insert)
+                    n_rows += 1
         if (hasattr(self, 'db_updates_map') and
                 any(self.db_updates_map.values())):
             for table_name, db_updates in sorted(
@@ -184,17 +520,30 @@ class SuiteDatabaseManager(object):
                         table_name, set_args, where_args)
                     self.pub_dao.add_update_item(
                         table_name, set_args, where_args)
+                    n_rows += 1
 
-        # Previously, we used a separate thread for database writes. This has
-        # now been removed. For the private database, there is no real
-        # advantage in using a separate thread as it needs to be always in sync
-        # with what is current. For the public database, which does not need to
-        # be fully in sync, there is some advantage of using a separate
-        # thread/process, if writing to it becomes a bottleneck. At the moment,
-        # there is no evidence that this is a bottleneck, so it is better to
-        # keep the logic simple.
+        # For the private database, there is no real advantage in using a
+        # separate thread as it needs to be always in sync with what is
+        # current. The public database does not need to be fully in sync, so
+        # it can be written in a separate thread, if writing to it becomes a
+        # bottleneck, e.g. on a busy shared file system.
         self.pri_dao.execute_queued_items()
-        self.pub_dao.execute_queued_items()
+        if self.pub_writer is None:
+            self.pub_dao.execute_queued_items()
+        else:
+            self.pub_writer.put(self.pub_dao.pop_queued_tables())
+
+        # Stop the write-ahead log of a persistent connection from growing
+        if self.is_wal and self.is_persistent:
+            now = time()
+            if self.time_next_wal_checkpoint is None:
+                self.time_next_wal_checkpoint = (
+                    now + self.wal_checkpoint_interval)
+            elif now >= self.time_next_wal_checkpoint:
+                self.pri_dao.wal_checkpoint()
+                self.time_next_wal_checkpoint = (
+                    now + self.wal_checkpoint_interval)
+        return n_rows
 
     def put_broadcast(self, modified_settings, is_cancel=False):
         """Put or clear broadcasts in runtime database."""
@@ -270,58 +619,51 @@ class SuiteDatabaseManager(object):
                 {"key": key, "value": value})
 
     def put_task_event_timers(self, task_events_mgr):
-        """Put statements to update the task_action_timers table."""
-        if task_events_mgr.event_timers:
-            self.db_deletes_map[self.TABLE_TASK_ACTION_TIMERS].append({})
-            for key, timer in task_events_mgr.event_timers.items():
-                key1, point, name, submit_num = key
-                self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
-                    "name": name,
-                    "cycle": point,
-                    "ctx_key_pickle": pickle.dumps((key1, submit_num,)),
-                    "ctx_pickle": pickle.dumps(timer.ctx),
-                    "delays_pickle": pickle.dumps(timer.delays),
-                    "num": timer.num,
-                    "delay": timer.delay,
-                    "timeout": timer.timeout})
+        """Put statements to update the task_action_timers table.
+
+        Only rows of event timers that are new, changed or removed since the
+        previous call are inserted or deleted.
+        """
+        self._init_task_pool_tables()
+        rows = {}
+        for key, timer in task_events_mgr.event_timers.items():
+            key1, point, name, submit_num = key
+            row = {
+                "name": name,
+                "cycle": point,
+                "ctx_key_pickle": pickle.dumps((key1, submit_num,)),
+                "ctx_pickle": pickle.dumps(timer.ctx),
+                "delays_pickle": pickle.dumps(timer.delays),
+                "num": timer.num,
+                "delay": timer.delay,
+                "timeout": timer.timeout}
+            rows[(point, name, row["ctx_key_pickle"])] = row
+        for cycle, name, ctx_key_pickle in (
+                set(self.event_timer_rows) - set(rows)):
+            self._put_delete_task_x(self.TABLE_TASK_ACTION_TIMERS, {
+                "cycle": cycle, "name": name,
+                "ctx_key_pickle": ctx_key_pickle})
+        for key, row in rows.items():
+            if self.event_timer_rows.get(key) != row:
+                self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append(row)
+        self.event_timer_rows = rows
 
     def put_task_pool(self, pool):
         """Put statements to update the task_pool table in runtime database.
 
-        Update the task_pool table and the task_action_timers table.
-        Queue delete (everything) statements to wipe the tables, and queue the
-        relevant insert statements for the current tasks in the pool.
+        Update the task_pool table, the task_timeout_timers table and the
+        task_action_timers table. Only rows of task proxies that have changed
+        since the previous call are written. Rows of task proxies removed
+        from the pool are deleted by "put_delete_task_pool".
+
+        Return the number of task proxies with changed rows.
         """
-        self.db_deletes_map[self.TABLE_TASK_POOL].append({})
-        # No need to do:
-        # self.db_deletes_map[self.TABLE_TASK_ACTION_TIMERS].append({})
-        # Should already be done by self.put_task_event_timers above.
-        self.db_deletes_map[self.TABLE_TASK_TIMEOUT_TIMERS].append({})
+        self._init_task_pool_tables()
+        n_tasks = 0
         for itask in pool.get_all_tasks():
-            self.db_inserts_map[self.TABLE_TASK_POOL].append({
-                "name": itask.tdef.name,
-                "cycle": str(itask.point),
-                "spawned": int(itask.has_spawned),
-                "status": itask.state.status,
-                "hold_swap": itask.state.hold_swap})
-            if itask.state.status in itask.timeout_timers:
-                self.db_inserts_map[self.TABLE_TASK_TIMEOUT_TIMERS].append({
-                    "name": itask.tdef.name,
-                    "cycle": str(itask.point),
-                    "timeout": itask.timeout_timers[itask.state.status]})
-            for ctx_key_0 in ["poll_timers", "try_timers"]:
-                for ctx_key_1, timer in getattr(itask, ctx_key_0).items():
-                    if timer is None:
-                        continue
-                    self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
-                        "name": itask.tdef.name,
-                        "cycle": str(itask.point),
-                        "ctx_key_pickle": pickle.dumps((ctx_key_0, ctx_key_1)),
-                        "ctx_pickle": pickle.dumps(timer.ctx),
-                        "delays_pickle": pickle.dumps(timer.delays),
-                        "num": timer.num,
-                        "delay": timer.delay,
-                        "timeout": timer.timeout})
+            if itask.is_updated or itask.state.is_updated:
+                self._put_task_pool_rows(itask)
+                n_tasks += 1
             if itask.state.time_updated:
                 set_args = {
                     "time_updated": itask.state.time_updated,
@@ -342,6 +684,94 @@ class SuiteDatabaseManager(object):
             "id": CylcSuiteDAO.CHECKPOINT_LATEST_ID,
             "time": get_current_time_string(),
             "event": CylcSuiteDAO.CHECKPOINT_LATEST_EVENT})
+        return n_tasks
+
+    def put_delete_task_pool(self, itask):
+        """Put DELETE statements for rows of a task removed from the pool."""
+        if self.task_timer_keys is None:
+            # Tables will be wiped on first write.
+            return
+        key = (str(itask.point), itask.tdef.name)
+        where_args = {"cycle": key[0], "name": key[1]}
+        self._put_delete_task_x(self.TABLE_TASK_POOL, where_args)
+        if key in self.task_timeout_keys:
+            self.task_timeout_keys.remove(key)
+            self._put_delete_task_x(self.TABLE_TASK_TIMEOUT_TIMERS, where_args)
+        for ctx_key_pickle in self.task_timer_keys.pop(key, []):
+            self._put_delete_task_x(self.TABLE_TASK_ACTION_TIMERS, {
+                "cycle": key[0], "name": key[1],
+                "ctx_key_pickle": ctx_key_pickle})
+
+    def _init_task_pool_tables(self):
+        """Wipe the task pool tables before they are first written.
+
+        Subsequent writes to these tables are incremental.
+        """
+        if self.task_timer_keys is not None:
+            return
+        for table_name in [
+                self.TABLE_TASK_POOL, self.TABLE_TASK_ACTION_TIMERS,
+                self.TABLE_TASK_TIMEOUT_TIMERS]:
+            self.db_deletes_map[table_name].append({})
+        self.task_timer_keys = {}
+        self.task_timeout_keys = set()
+        self.event_timer_rows = {}
+
+    def _put_task_pool_rows(self, itask):
+        """Put statements to write the task pool rows of a task proxy."""
+        itask.is_updated = False
+        itask.state.is_updated = False
+        key = (str(itask.point), itask.tdef.name)
+        where_args = {"cycle": key[0], "name": key[1]}
+        self.db_inserts_map[self.TABLE_TASK_POOL].append({
+            "name": itask.tdef.name,
+            "cycle": str(itask.point),
+            "spawned": int(itask.has_spawned),
+            "status": itask.state.status,
+            "hold_swap": itask.state.hold_swap})
+        if itask.state.status in itask.timeout_timers:
+            self.task_timeout_keys.add(key)
+            self.db_inserts_map[self.TABLE_TASK_TIMEOUT_TIMERS].append({
+                "name": itask.tdef.name,
+                "cycle": str(itask.point),
+                "timeout": itask.timeout_timers[itask.state.status]})
+        elif key in self.task_timeout_keys:
+            self.task_timeout_keys.remove(key)
+            self._put_delete_task_x(self.TABLE_TASK_TIMEOUT_TIMERS, where_args)
+        ctx_key_pickles = set()
+        for ctx_key_0 in ["poll_timers", "try_timers"]:
+            for ctx_key_1, timer in getattr(itask, ctx_key_0).items():
+                if timer is None:
+                    continue
+                ctx_key_pickle = pickle.dumps((ctx_key_0, ctx_key_1))
+                ctx_key_pickles.add(ctx_key_pickle)
+                self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
+                    "name": itask.tdef.name,
+                    "cycle": str(itask.point),
+                    "ctx_key_pickle": ctx_key_pickle,
+                    "ctx_pickle": pickle.dumps(timer.ctx),
+                    "delays_pickle": pickle.dumps(timer.delays),
+                    "num": timer.num,
+                    "delay": timer.delay,
+                    "timeout": timer.timeout})
+        for ctx_key_pickle in (
+                self.task_timer_keys.pop(key, set()) - ctx_key_pickles):
+            self._put_delete_task_x(self.TABLE_TASK_ACTION_TIMERS, {
+                "cycle": key[0], "name": key[1],
+                "ctx_key_pickle": ctx_key_pickle})
+        if ctx_key_pickles:
+            self.task_timer_keys[key] = ctx_key_pickles
+
+    def _put_delete_task_x(self, table_name, where_args):
+        """Put DELETE statement for a task_* table.
+
+        Delete statements are executed before insert statements, so drop any
+        queued insert statements for the rows deleted here.
+        """
+        self.db_deletes_map[table_name].append(where_args)
+        self.db_inserts_map[table_name] = [
+            args for args in self.db_inserts_map[table_name]
+            if any(args[key] != value for key, value in where_args.items())]
 
     def put_insert_task_events(self, itask, args):
         """Put INSERT statement for task_events table."""
@@ -400,13 +830,18 @@ class SuiteDatabaseManager(object):
 
     def recover_pub_from_pri(self):
         """Recover public database from private database."""
-        if self.pub_dao.n_tries >= self.pub_dao.MAX_TRIES:
+        pub_dao = self.pub_dao
+        is_overflowed = False
+        if self.pub_writer is not None:
+            pub_dao = self.pub_writer.dao
+            is_overflowed = self.pub_writer.is_overflowed
+        if pub_dao.n_tries >= pub_dao.MAX_TRIES or is_overflowed:
             self.copy_pri_to_pub()
             LOG.warning(
                 "%(pub_db_name)s: recovered from %(pri_db_name)s" % {
-                    "pub_db_name": self.pub_dao.db_file_name,
+                    "pub_db_name": pub_dao.db_file_name,
                     "pri_db_name": self.pri_dao.db_file_name})
-            self.pub_dao.n_tries = 0
+            pub_dao.n_tries = 0
 
     def restart_upgrade(self):
         """Vacuum/upgrade runtime DB on restart."""
@@ -40,6 +40,7 @@ class SuiteSrvFilesManager(object):
 
     DELIM = "/"
     DIR_BASE_AUTH = "auth"
+    DIR_BASE_CACHE = "cache"
     DIR_BASE_SRV = ".service"
     FILE_BASE_CONTACT = "contact"
     FILE_BASE_PASSPHRASE = "passphrase"
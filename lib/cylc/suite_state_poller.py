@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Poll suite databases for automatic suite state polling tasks.
+
+A suite state polling task, e.g. "foo<other.suite::bar:fail>" in the graph,
+would otherwise run "cylc suite-state" in a job, which connects to the target
+suite database and polls it in a sleep loop. Here, the suite server program
+polls instead, without job submission. The conditions of all polling tasks
+are grouped by target suite database, so that each target is read with one
+batched query per polling interval, however many tasks are waiting on it.
+"""
+
+import os
+from shutil import rmtree
+import sqlite3
+from tempfile import mkdtemp
+from time import time
+import unittest
+
+from isodatetime.parsers import TimePointParser
+
+from cylc.cfgspec.globalcfg import GLOBAL_CFG
+from cylc.dbstatecheck import CylcSuiteDBChecker
+from cylc.rundb import CylcSuiteDAO
+from cylc.task_state import TASK_STATUS_FAILED, TASK_STATUS_SUCCEEDED
+
+
+class SuiteStatePollCondition(object):
+    """The condition of a suite state polling task, and its polls."""
+
+    __slots__ = ('task_id', 'task', 'point', 'statuses', 'interval',
+                 'max_polls', 'template', 'n_polls', 'next_time')
+
+    def __init__(self, task_id, task, point, statuses, interval, max_polls,
+                 template=None):
+        self.task_id = task_id
+        self.task = task
+        self.point = point
+        self.statuses = statuses
+        self.interval = interval
+        self.max_polls = max_polls
+        # Cycle point format of the target, if set by the task
+        self.template = template
+        self.n_polls = 0
+        self.next_time = None
+
+
+class SuiteStatePoller(object):
+    """Poll suite databases for the conditions of suite state polling tasks.
+
+    Only tasks that would poll a database on the suite host, i.e. with no
+    "[suite state polling]user" or "host", are handled here. Others are still
+    submitted as jobs, to run "cylc suite-state" on the remote host.
+
+    Tasks are added when they would otherwise be submitted. Each call of
+    "poll" reads each target suite database with conditions due to be polled,
+    with one query for up to CylcSuiteDBChecker.MAX_TASKS_PER_QUERY
+    conditions, and checks all the conditions on the target. A task whose
+    condition is met is sent a succeeded message. A task whose condition is
+    still not met after its maximum number of polls is sent a failed message,
+    like a "cylc suite-state" job that gives up.
+
+    """
+
+    # Shown as the batch system of the tasks
+    BATCH_SYS_NAME = 'suite-state'
+    # As "cylc suite-state"
+    DEFAULT_INTERVAL = 60.0
+    DEFAULT_MAX_POLLS = 10
+    # Do not hold up the main loop for long on a locked target database, as
+    # the suite database manager does not with its own databases.
+    CONN_TIMEOUT = CylcSuiteDAO.CONN_TIMEOUT
+
+    def __init__(self):
+        # {(run_dir, suite): {task_id: condition, ...}, ...}
+        self.targets = {}
+        # {(run_dir, suite): cycle point format of target, ...}
+        self.point_formats = {}
+
+    @staticmethod
+    def can_poll(itask):
+        """Return True if itask is a suite state polling task to poll here.
+        """
+        if not itask.tdef.suite_polling_cfg:
+            return False
+        rtconfig = itask.tdef.rtconfig['suite state polling']
+        return not rtconfig['user'] and not rtconfig['host']
+
+    def add(self, itask, now=None):
+        """Add (or re-add) the condition of a polling task.
+
+        The condition is polled in the next call of "poll". If the task is
+        already being polled, it is polled again then, without counting.
+        """
+        if now is None:
+            now = time()
+        rtconfig = itask.tdef.rtconfig['suite state polling']
+        run_dir = os.path.expandvars(os.path.expanduser(
+            rtconfig['run-dir'] or
+            GLOBAL_CFG.get_host_item('run directory')))
+        target = (run_dir, itask.tdef.suite_polling_cfg['suite'])
+        conditions = self.targets.setdefault(target, {})
+        condition = conditions.get(itask.identity)
+        if condition is None:
+            interval = rtconfig['interval']
+            if interval is None:
+                interval = self.DEFAULT_INTERVAL
+            max_polls = rtconfig['max-polls']
+            if max_polls is None:
+                max_polls = self.DEFAULT_MAX_POLLS
+            condition = SuiteStatePollCondition(
+                itask.identity, itask.tdef.suite_polling_cfg['task'],
+                str(itask.point),
+                CylcSuiteDBChecker.state_lookup(
+                    itask.tdef.suite_polling_cfg['status']),
+                float(interval), max_polls, rtconfig['template'] or None)
+            conditions[itask.identity] = condition
+        condition.next_time = now
+
+    def remove(self, itask):
+        """Remove the condition of a polling task, if any.
+
+        Return True if the task was being polled.
+        """
+        for target, conditions in self.targets.items():
+            if conditions.pop(itask.identity, None) is not None:
+                if not conditions:
+                    del self.targets[target]
+                return True
+        return False
+
+    def poll(self, message_queue, now=None):
+        """Poll targets with conditions due, queue messages of done tasks.
+
+        Put (task_id, severity, message, time) items on message_queue, as
+        for messages from task jobs. Return True if any message was queued.
+        """
+        if now is None:
+            now = time()
+        is_done = False
+        for target, conditions in sorted(self.targets.items()):
+            if not any(
+                    condition.next_time <= now
+                    for condition in conditions.values()):
+                continue
+            results = self._poll_target(target, conditions.values())
+            for task_id, condition in sorted(conditions.items()):
+                if condition.statuses and results.get(
+                        (condition.task, condition.point)) in (
+                        condition.statuses):
+                    message_queue.put(
+                        (task_id, 'NORMAL', TASK_STATUS_SUCCEEDED, now))
+                elif condition.next_time <= now:
+                    condition.n_polls += 1
+                    if condition.n_polls < condition.max_polls:
+                        condition.next_time = now + condition.interval
+                        continue
+                    message_queue.put(
+                        (task_id, 'CRITICAL', TASK_STATUS_FAILED, now))
+                else:
+                    continue
+                del conditions[task_id]
+                is_done = True
+            if not conditions:
+                del self.targets[target]
+        return is_done
+
+    def _poll_target(self, target, conditions):
+        """Query the statuses of the tasks of conditions in a target.
+
+        Return {(task, point): status, ...}, with the points of the
+        conditions, which are converted for the query to the cycle point
+        format of each condition's template if set, or else of the target.
+        Return an empty dict if the target database cannot be read, e.g. if
+        the target suite has not started yet, or is locked.
+        """
+        run_dir, suite = target
+        checker = None
+        try:
+            checker = CylcSuiteDBChecker(
+                run_dir, suite, conn_timeout=self.CONN_TIMEOUT)
+            if target not in self.point_formats:
+                self.point_formats[target] = (
+                    checker.get_remote_point_format())
+            task_cycles = {}
+            for condition in conditions:
+                cycle = condition.point
+                fmt = condition.template or self.point_formats[target]
+                if fmt:
+                    try:
+                        cycle = str(TimePointParser().parse(
+                            cycle, dump_format=fmt))
+                    except ValueError:
+                        pass
+                task_cycles[(condition.task, cycle)] = (
+                    condition.task, condition.point)
+            results = {}
+            for task_cycle, status in checker.task_states_query(
+                    task_cycles.keys()).items():
+                results[task_cycles[task_cycle]] = status
+            return results
+        except (OSError, sqlite3.Error):
+            return {}
+        finally:
+            # The target suite may replace its public database file
+            if checker is not None:
+                checker.dao.close()
+
+
+class FakeSuiteStatePoller(SuiteStatePoller):
+    """Suite state poller with fake targets, for testing."""
+
+    def __init__(self, statuses):
+        SuiteStatePoller.__init__(self)
+        self.statuses = statuses
+        self.n_queries = 0
+
+    def _poll_target(self, target, conditions):
+        self.n_queries += 1
+        return self.statuses.get(target, {})
+
+
+class TestSuiteStatePoller(unittest.TestCase):
+    """Unit tests for SuiteStatePoller."""
+
+    class MessageQueue(list):
+        """A message queue that is a list."""
+        put = list.append
+
+    def test_poll(self):
+        """Test batched polls, met and exhausted conditions."""
+        target = ('/run', 'up')
+        poller = FakeSuiteStatePoller({target: {('foo', '1'): 'failed'}})
+        poller.targets[target] = {}
+        for task_id, task, statuses in [
+                ('x.1', 'foo', ['succeeded']),
+                ('y.1', 'foo', CylcSuiteDBChecker.state_lookup('finish')),
+                ('z.1', 'bar', ['succeeded'])]:
+            condition = SuiteStatePollCondition(
+                task_id, task, '1', statuses, 10.0, 2)
+            condition.next_time = 100.0
+            poller.targets[target][task_id] = condition
+        messages = self.MessageQueue()
+        self.assertFalse(poller.poll(messages, now=99.0))
+        self.assertEqual(poller.n_queries, 0)
+        self.assertTrue(poller.poll(messages, now=100.0))
+        self.assertEqual(messages, [('y.1', 'NORMAL', 'succeeded', 100.0)])
+        self.assertEqual(sorted(poller.targets[target]), ['x.1', 'z.1'])
+        self.assertFalse(poller.poll(messages, now=105.0))
+        self.assertTrue(poller.poll(messages, now=110.0))
+        self.assertEqual(poller.n_queries, 2)
+        self.assertEqual(messages[1:], [
+            ('x.1', 'CRITICAL', 'failed', 110.0),
+            ('z.1', 'CRITICAL', 'failed', 110.0)])
+        self.assertEqual(poller.targets, {})
+
+    def test_remove(self):
+        """Test removed conditions, and targets left with none."""
+        poller = FakeSuiteStatePoller({})
+        for target, task_id in [
+                (('/run', 'up'), 'x.1'),
+                (('/run', 'up'), 'y.1'),
+                (('/run', 'other'), 'z.1')]:
+            poller.targets.setdefault(target, {})[task_id] = (
+                SuiteStatePollCondition(
+                    task_id, 'foo', '1', ['succeeded'], 10.0, 2))
+
+        class FakeTaskProxy(object):
+            """Task proxy with just an identity."""
+            def __init__(self, identity):
+                self.identity = identity
+
+        self.assertTrue(poller.remove(FakeTaskProxy('x.1')))
+        self.assertFalse(poller.remove(FakeTaskProxy('x.1')))
+        self.assertTrue(poller.remove(FakeTaskProxy('z.1')))
+        self.assertEqual(poller.targets.keys(), [('/run', 'up')])
+        self.assertEqual(list(poller.targets[('/run', 'up')]), ['y.1'])
+
+    def test_poll_target(self):
+        """Test queries of a target database, with a template, and locked."""
+        run_dir = mkdtemp()
+        try:
+            os.makedirs(os.path.join(run_dir, 'up', 'log'))
+            db_file_name = os.path.join(run_dir, 'up', 'log', 'db')
+            dao = CylcSuiteDAO(db_file_name)
+            dao.add_insert_item(CylcSuiteDAO.TABLE_TASK_STATES, {
+                'name': 'foo', 'cycle': '2010', 'status': 'succeeded'})
+            dao.execute_queued_items()
+            dao.close()
+            poller = SuiteStatePoller()
+            target = (run_dir, 'up')
+            self.assertEqual(
+                poller._poll_target(target, [SuiteStatePollCondition(
+                    'x.1', 'foo', '20100101T0000Z', ['succeeded'], 10.0, 2,
+                    '%Y')]),
+                {('foo', '20100101T0000Z'): 'succeeded'})
+            self.assertEqual(
+                poller._poll_target(target, [SuiteStatePollCondition(
+                    'x.1', 'foo', '20100101T0000Z', ['succeeded'], 10.0, 2)]),
+                {})
+            conn = sqlite3.connect(db_file_name)
+            conn.execute('BEGIN EXCLUSIVE')
+            try:
+                start = time()
+                self.assertEqual(
+                    poller._poll_target(target, [SuiteStatePollCondition(
+                        'x.1', 'foo', '20100101T0000Z', ['succeeded'], 10.0,
+                        2, '%Y')]),
+                    {})
+                self.assertTrue(time() - start < 5.0)
+            finally:
+                conn.rollback()
+                conn.close()
+        finally:
+            rmtree(run_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
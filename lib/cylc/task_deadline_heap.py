@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Min-heap of wall clock deadlines of tasks."""
+
+from heapq import heappop, heappush
+import unittest
+
+
+class TaskDeadlineHeap(object):
+    """Wall clock deadlines of tasks, earliest first.
+
+    Each task ID has at most one live deadline. Setting a new deadline for a
+    task, or discarding it, leaves the old entry in the heap, to be skipped
+    when it reaches the top.
+
+    """
+
+    __slots__ = ["_heap", "_deadlines"]
+
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def discard(self, id_):
+        """Remove the deadline of task id_, if any."""
+        self._deadlines.pop(id_, None)
+
+    def get_next(self):
+        """Return the earliest live deadline, or None if there is none."""
+        self._skip_stale()
+        if self._heap:
+            return self._heap[0][0]
+        return None
+
+    def pop_due(self, now):
+        """Remove and return IDs of tasks with deadlines earlier than now."""
+        ids = []
+        while self._heap and self._heap[0][0] < now:
+            deadline, id_ = heappop(self._heap)
+            if self._deadlines.get(id_) == deadline:
+                del self._deadlines[id_]
+                ids.append(id_)
+        return ids
+
+    def set(self, id_, deadline):
+        """Set the deadline of task id_, or discard it if deadline is None."""
+        if deadline is None:
+            self.discard(id_)
+        elif self._deadlines.get(id_) != deadline:
+            self._deadlines[id_] = deadline
+            heappush(self._heap, (deadline, id_))
+        # Rebuild the heap if it is mostly superseded entries.
+        if len(self._heap) > 2 * len(self._deadlines) + 100:
+            self._heap = [
+                (deadline, id_) for id_, deadline in self._deadlines.items()]
+            self._heap.sort()
+
+    def _skip_stale(self):
+        """Remove superseded entries from the top of the heap."""
+        while (self._heap and
+                self._deadlines.get(self._heap[0][1]) != self._heap[0][0]):
+            heappop(self._heap)
+
+
+class TestTaskDeadlineHeap(unittest.TestCase):
+    """Unit tests for TaskDeadlineHeap."""
+
+    def test_pop_due(self):
+        """Test that only live deadlines earlier than now are popped."""
+        heap = TaskDeadlineHeap()
+        heap.set('a.1', 30.0)
+        heap.set('b.1', 10.0)
+        heap.set('c.1', 20.0)
+        heap.set('b.1', 40.0)
+        heap.discard('c.1')
+        heap.set('d.1', None)
+        self.assertEqual(len(heap), 2)
+        self.assertEqual(heap.get_next(), 30.0)
+        self.assertEqual(heap.pop_due(30.0), [])
+        self.assertEqual(heap.pop_due(35.0), ['a.1'])
+        self.assertEqual(heap.pop_due(35.0), [])
+        self.assertEqual(heap.get_next(), 40.0)
+        self.assertEqual(heap.pop_due(50.0), ['b.1'])
+        self.assertEqual(heap.get_next(), None)
+        self.assertEqual(len(heap), 0)
+
+    def test_rebuild(self):
+        """Test that superseded entries do not accumulate."""
+        heap = TaskDeadlineHeap()
+        for i in range(1000):
+            heap.set('a.1', float(i))
+        self.assertTrue(len(heap._heap) <= 102)
+        self.assertEqual(heap.get_next(), 999.0)
+        self.assertEqual(heap.pop_due(1000.0), ['a.1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -302,6 +302,7 @@ class TaskEventsManager(object):
         itask.summary['latest_message'] = message
         if is_polled:
             itask.summary['latest_message'] += " %s" % self.POLLED_INDICATOR
+        itask.is_summary_updated = True
         cylc.flags.iflag = True
 
         # Satisfy my output, if possible, and record the result.
@@ -414,6 +415,7 @@ class TaskEventsManager(object):
         if timer.num is None:
             timer.num = 0
         delay = timer.next(no_exhaust=True)
+        itask.is_updated = True
         if delay is not None:
             LOG.info(
                 'next job poll in %s (after %s)' % (
@@ -618,6 +620,7 @@ class TaskEventsManager(object):
             msg = "failed, %s (after %s)" % (delay_msg, timeout_str)
             LOG.info("job(%02d) %s" % (itask.submit_num, msg), itask=itask)
             itask.summary['latest_message'] = msg
+            itask.is_summary_updated = True
             self.setup_event_handlers(
                 itask, "retry", "%s, %s" % (self.JOB_FAILED, delay_msg))
             itask.state.reset_state(TASK_STATUS_RETRYING)
@@ -680,6 +683,7 @@ class TaskEventsManager(object):
             "submit_status": 1,
         })
         itask.summary['submit_method_id'] = None
+        itask.is_summary_updated = True
         if (TASK_STATUS_SUBMIT_RETRYING not in itask.try_timers or
                 itask.try_timers[TASK_STATUS_SUBMIT_RETRYING].next() is None):
             # No submission retry lined up: definitive failure.
@@ -699,6 +703,7 @@ class TaskEventsManager(object):
                 self.EVENT_SUBMIT_FAILED, delay_msg, timeout_str)
             LOG.info("job(%02d) %s" % (itask.submit_num, msg), itask=itask)
             itask.summary['latest_message'] = msg
+            itask.is_summary_updated = True
             self.setup_event_handlers(
                 itask, self.EVENT_SUBMIT_RETRY,
                 "job %s, %s" % (self.EVENT_SUBMIT_FAILED, delay_msg))
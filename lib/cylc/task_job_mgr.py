@@ -29,7 +29,6 @@ This module provides logic to:
 from logging import CRITICAL, INFO, WARNING
 import os
 from shutil import rmtree
-from time import time
 import traceback
 
 from parsec.util import pdeepcopy, poverride
@@ -43,12 +42,14 @@ from cylc.job_file import JobFileWriter
 from cylc.mkdir_p import mkdir_p
 from cylc.mp_pool import SuiteProcPool, SuiteProcContext
 from cylc.suite_logging import LOG
+from cylc.suite_state_poller import SuiteStatePoller
 from cylc.task_action_timer import TaskActionTimer
 from cylc.task_events_mgr import TaskEventsManager
 from cylc.task_message import TaskMessage
 from cylc.task_outputs import (
     TASK_OUTPUT_SUBMITTED, TASK_OUTPUT_STARTED, TASK_OUTPUT_SUCCEEDED,
     TASK_OUTPUT_FAILED)
+from cylc.task_proxy import TaskProxy
 from cylc.task_remote_mgr import (
     REMOTE_INIT_FAILED, TaskRemoteMgmtError, TaskRemoteMgr)
 from cylc.task_state import (
@@ -66,6 +67,8 @@ class TaskJobManager(object):
     * Submit task jobs.
     * Poll task jobs.
     * Kill task jobs.
+    * Poll suite databases for local automatic suite state polling tasks,
+      instead of submitting their jobs.
     * Set up the directory structure on job hosts.
     * Install suite communicate client files on job hosts.
     * Remove suite contact files on job hosts.
@@ -77,7 +80,7 @@ class TaskJobManager(object):
     JOBS_SUBMIT = SuiteProcPool.JOBS_SUBMIT
     REMOTE_SELECT_MSG = 'waiting for remote host selection'
     REMOTE_INIT_MSG = 'remote host initialising'
-    KEY_EXECUTE_TIME_LIMIT = 'execution_time_limit'
+    KEY_EXECUTE_TIME_LIMIT = TaskProxy.KEY_EXECUTE_TIME_LIMIT
 
     def __init__(self, suite, proc_pool, suite_db_mgr, suite_srv_files_mgr):
         self.suite = suite
@@ -89,15 +92,15 @@ class TaskJobManager(object):
         self.suite_srv_files_mgr = suite_srv_files_mgr
         self.task_remote_mgr = TaskRemoteMgr(
             suite, proc_pool, suite_srv_files_mgr)
+        self.suite_state_poller = SuiteStatePoller()
 
-    def check_task_jobs(self, suite, task_pool):
+    def check_task_jobs(self, suite, task_pool, now):
         """Check submission and execution timeout and polling timers.
 
         Poll tasks that have timed out and/or have reached next polling time.
         """
-        now = time()
         poll_tasks = set()
-        for itask in task_pool.get_tasks():
+        for itask in task_pool.get_timer_tasks(now):
             if (self._check_timeout(itask, now) or
                     self.task_events_mgr.set_poll_time(itask, now)):
                 poll_tasks.add(itask)
@@ -114,7 +117,10 @@ class TaskJobManager(object):
         for itask in itasks:
             if itask.state.status in TASK_STATUSES_ACTIVE:
                 itask.state.set_held()
-                active_itasks.append(itask)
+                if self.suite_state_poller.remove(itask):
+                    self._suite_state_kill_task_job(itask)
+                else:
+                    active_itasks.append(itask)
             else:
                 LOG.warning('skipping %s: task not killable' % itask.identity)
         self._run_job_cmd(
@@ -137,7 +143,14 @@ class TaskJobManager(object):
         pollable = [TASK_STATUS_SUBMITTED, TASK_STATUS_RUNNING,
                     TASK_STATUS_FAILED]
         for itask in itasks:
-            if itask.state.status in pollable or (
+            if self.suite_state_poller.can_poll(itask):
+                # No job: poll the target suite database again instead
+                if itask.state.status in [
+                        TASK_STATUS_SUBMITTED, TASK_STATUS_RUNNING]:
+                    self.suite_state_poller.add(itask)
+                else:
+                    LOG.debug("skipping %s: not pollable" % itask.identity)
+            elif itask.state.status in pollable or (
                     itask.state.status == TASK_STATUS_SUCCEEDED and poll_succ):
                 poll_me.append(itask)
             else:
@@ -184,6 +197,19 @@ class TaskJobManager(object):
         if is_simulation:
             return self._simulation_submit_task_jobs(itasks)
 
+        # Local suite state polling tasks do not need jobs
+        poll_itasks = []
+        job_itasks = []
+        for itask in itasks:
+            if self.suite_state_poller.can_poll(itask):
+                poll_itasks.append(itask)
+            else:
+                job_itasks.append(itask)
+        if poll_itasks:
+            return (
+                self._suite_state_submit_task_jobs(poll_itasks) +
+                self.submit_task_jobs(suite, job_itasks))
+
         # Prepare tasks for job submission
         prepared_tasks, bad_tasks = self.prep_submit_task_jobs(suite, itasks)
         if not prepared_tasks:
@@ -205,6 +231,7 @@ class TaskJobManager(object):
                 # Remote is waiting to be initialised
                 for itask in itasks:
                     itask.summary['latest_message'] = self.REMOTE_INIT_MSG
+                    itask.is_summary_updated = True
                 continue
             # Persist
             if owner:
@@ -298,9 +325,11 @@ class TaskJobManager(object):
             if timer is not None:
                 if not timer.is_timeout_set():
                     timer.next()
+                    itask.is_updated = True
                 if not timer.is_delay_done():
                     # Don't poll
                     return False
+                itask.is_updated = True
                 if timer.next() is not None:
                     # Poll now, and more retries lined up
                     return True
@@ -310,6 +339,7 @@ class TaskJobManager(object):
             if timeout is None or now <= timeout:
                 return False
             itask.timeout_timers[itask.state.status] = None
+            itask.is_updated = True
             if (itask.state.status == TASK_STATUS_RUNNING and
                     itask.summary['started_time'] is not None):
                 msg = 'job started %s ago, but has not finished' % (
@@ -472,6 +502,7 @@ class TaskJobManager(object):
                 'ignoring job kill result, unexpected task state: %s' %
                 itask.state.status)
         itask.summary['latest_message'] = log_msg
+        itask.is_summary_updated = True
         LOG.log(log_lvl, "[%s] -job(%02d) %s" % (
             itask.identity, itask.submit_num, log_msg))
 
@@ -547,6 +578,7 @@ class TaskJobManager(object):
             ) = items[4:10]
         except IndexError:
             itask.summary['latest_message'] = 'poll failed'
+            itask.is_summary_updated = True
             cylc.flags.iflag = True
             ctx.cmd = cmd_ctx.cmd  # print original command on failure
             return
@@ -666,6 +698,7 @@ class TaskJobManager(object):
                     itask.try_timers[key].set_delays(delays)
                 except KeyError:
                     itask.try_timers[key] = TaskActionTimer(delays=delays)
+            itask.is_updated = True
 
     def _simulation_submit_task_jobs(self, itasks):
         """Simulation mode task jobs submission."""
@@ -676,10 +709,65 @@ class TaskJobManager(object):
             itask.summary['batch_sys_name'] = 'SIMULATION'
             itask.summary[self.KEY_EXECUTE_TIME_LIMIT] = (
                 itask.tdef.rtconfig['job']['simulated run length'])
+            itask.is_summary_updated = True
             self.task_events_mgr.process_message(
                 itask, INFO, TASK_OUTPUT_SUBMITTED, self.poll_task_jobs)
         return itasks
 
+    def _suite_state_kill_task_job(self, itask):
+        """Kill a suite state polling task, which has no job."""
+        if itask.state.status == TASK_STATUS_SUBMITTED:
+            self.task_events_mgr.process_message(
+                itask, CRITICAL, self.task_events_mgr.EVENT_SUBMIT_FAILED,
+                self.poll_task_jobs)
+        else:
+            self.task_events_mgr.process_message(
+                itask, CRITICAL, TASK_OUTPUT_FAILED, self.poll_task_jobs)
+        cylc.flags.iflag = True
+        itask.summary['latest_message'] = 'killed'
+        itask.is_summary_updated = True
+        LOG.info("[%s] -job(%02d) killed" % (
+            itask.identity, itask.submit_num))
+
+    def _suite_state_submit_task_jobs(self, itasks):
+        """Suite state polling tasks submission, without jobs.
+
+        The tasks are added to the suite state poller, and set to running
+        straight away. The poller sends them a succeeded message when their
+        conditions are met, or a failed message when they run out of polls.
+        """
+        now_str = get_current_time_string()
+        for itask in itasks:
+            self._set_retry_timers(itask)
+            itask.submit_num += 1
+            itask.summary['submit_num'] = itask.submit_num
+            itask.task_host = 'localhost'
+            itask.task_owner = None
+            itask.summary['host'] = itask.task_host
+            itask.summary['job_hosts'][itask.submit_num] = itask.task_host
+            itask.summary['batch_sys_name'] = SuiteStatePoller.BATCH_SYS_NAME
+            itask.is_summary_updated = True
+            LOG.info(
+                'submit-num=%d, owner@host=%s' % (
+                    itask.submit_num, itask.task_host),
+                itask=itask)
+            self.suite_db_mgr.put_insert_task_jobs(itask, {
+                'is_manual_submit': itask.is_manual_submit,
+                'try_num': itask.get_try_num(),
+                'time_submit': now_str,
+                'user_at_host': itask.task_host,
+                'batch_sys_name': itask.summary['batch_sys_name'],
+            })
+            itask.is_manual_submit = False
+            itask.state.reset_state(TASK_STATUS_READY)
+            # A new submission starts with no polls, as a new job would
+            self.suite_state_poller.remove(itask)
+            self.suite_state_poller.add(itask)
+            for message in [TASK_OUTPUT_SUBMITTED, TASK_OUTPUT_STARTED]:
+                self.task_events_mgr.process_message(
+                    itask, INFO, message, self.poll_task_jobs)
+        return itasks
+
     def _submit_task_jobs_callback(self, ctx, suite, itasks):
         """Callback when submit task jobs command exits."""
         self._manip_task_jobs_callback(
@@ -715,6 +803,7 @@ class TaskJobManager(object):
             itask.summary['submit_method_id'] = None
         if itask.summary['submit_method_id'] == "None":
             itask.summary['submit_method_id'] = None
+        itask.is_summary_updated = True
         if itask.summary['submit_method_id'] and ctx.ret_code == 0:
             self.task_events_mgr.process_message(
                 itask, INFO, '%s at %s' % (
@@ -753,12 +842,14 @@ class TaskJobManager(object):
             # Submit number not yet incremented
             itask.submit_num += 1
             itask.summary['submit_num'] = itask.submit_num
+            itask.is_summary_updated = True
             self._prep_submit_task_job_error(
                 suite, itask, dry_run, '(remote host select)', exc)
             return False
         else:
             if task_host is None:  # host select not ready
                 itask.summary['latest_message'] = self.REMOTE_SELECT_MSG
+                itask.is_summary_updated = True
                 return
             itask.task_host = task_host
 
@@ -778,6 +869,7 @@ class TaskJobManager(object):
         if dry_run:
             # This will be shown next to submit num in gcylc:
             itask.summary['latest_message'] = 'job file written (edit/dry-run)'
+            itask.is_summary_updated = True
             LOG.debug(itask.summary['latest_message'], itask=itask)
 
         # Return value used by "cylc submit" and "cylc jobscript":
@@ -807,6 +899,7 @@ class TaskJobManager(object):
         # Submit number
         itask.submit_num += 1
         itask.summary['submit_num'] = itask.submit_num
+        itask.is_summary_updated = True
 
         itask.task_owner = rtconfig['remote']['owner']
         if itask.task_owner:
@@ -845,6 +938,7 @@ class TaskJobManager(object):
                     itask, label, skey='job')
                 if values:
                     itask.poll_timers[key] = TaskActionTimer(delays=values)
+        itask.is_updated = True
 
         scripts = self._get_job_scripts(itask, rtconfig)
 
@@ -52,14 +52,19 @@ class TaskOutputs(object):
                 trigger1 = message 1
 
     Can search item by message string or by trigger string.
+
+    The "completion_changed" flag is set whenever the completion status of
+    any output may have changed. The task pool resets it after propagating
+    newly completed outputs to dependent prerequisites.
     """
 
     # Memory optimization - constrain possible attributes to this list.
-    __slots__ = ["_by_message", "_by_trigger"]
+    __slots__ = ["_by_message", "_by_trigger", "completion_changed"]
 
     def __init__(self, tdef):
         self._by_message = {}
         self._by_trigger = {}
+        self.completion_changed = True
         for trigger, message in tdef.outputs:
             self.add(message, trigger)
 
@@ -69,6 +74,7 @@ class TaskOutputs(object):
             trigger = message
         self._by_message[message] = [trigger, message, is_completed]
         self._by_trigger[trigger] = self._by_message[message]
+        self.completion_changed = True
 
     def all_completed(self):
         """Return True if all all outputs completed."""
@@ -132,21 +138,25 @@ class TaskOutputs(object):
         else:
             del self._by_message[message]
             del self._by_trigger[trigger]
+            self.completion_changed = True
 
     def set_all_completed(self):
         """Set all outputs to complete."""
         for value in self._by_message.values():
             value[_IS_COMPLETED] = True
+        self.completion_changed = True
 
     def set_all_incomplete(self):
         """Set all outputs to incomplete."""
         for value in self._by_message.values():
             value[_IS_COMPLETED] = False
+        self.completion_changed = True
 
     def set_completion(self, message, is_completed):
         """Set output message completion status to is_completed (bool)."""
         if message in self._by_message:
             self._by_message[message][_IS_COMPLETED] = is_completed
+            self.completion_changed = True
 
     def set_msg_trg_completion(self, message=None, trigger=None,
                                is_completed=True):
@@ -163,6 +173,7 @@ class TaskOutputs(object):
         except KeyError:
             return None
         else:
+            self.completion_changed = True
             return bool(old_is_completed) != bool(is_completed)
 
     def _get_item(self, message, trigger):
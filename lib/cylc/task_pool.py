@@ -31,6 +31,8 @@ tasks against the new stop cycle.
 
 """
 
+from bisect import bisect_left, insort
+from collections import OrderedDict
 from fnmatch import fnmatchcase
 import pickle
 from time import time
@@ -41,6 +43,7 @@ from cylc.cycling.loader import get_point, standardise_point_string
 import cylc.flags
 from cylc.suite_logging import ERR, LOG
 from cylc.task_action_timer import TaskActionTimer
+from cylc.task_deadline_heap import TaskDeadlineHeap
 from cylc.task_id import TaskID
 from cylc.task_proxy import TaskProxy
 from cylc.task_state import (
@@ -53,6 +56,52 @@ from cylc.task_state import (
 from cylc.wallclock import (
     get_current_time_string, get_time_string_from_unix_time)
 
+# Task statuses that no longer hold back the runahead limit.
+TASK_STATUSES_FINISHED = set([
+    TASK_STATUS_FAILED, TASK_STATUS_SUCCEEDED, TASK_STATUS_EXPIRED])
+
+
+class TaskQueueCounter(object):
+    """Live status counts of the tasks in an internal queue.
+
+    n_active -- number of tasks that count against the queue limit
+    queued -- TASK_STATUS_QUEUED task IDs, in the order they were queued
+              (an OrderedDict used as an ordered set)
+
+    Tasks are added on release to the main pool, and removed on removal
+    from it. In between, the task pool calls status_changed on status
+    changes.
+
+    """
+
+    STATUSES_ACTIVE = set([
+        TASK_STATUS_READY, TASK_STATUS_SUBMITTED, TASK_STATUS_RUNNING])
+
+    __slots__ = ["n_active", "queued"]
+
+    def __init__(self):
+        self.n_active = 0
+        self.queued = OrderedDict()
+
+    def add(self, itask):
+        """Start counting itask."""
+        self.status_changed(itask.identity, None, itask.state.status)
+
+    def remove(self, itask):
+        """Stop counting itask."""
+        self.status_changed(itask.identity, itask.state.status, None)
+
+    def status_changed(self, identity, old_status, new_status):
+        """Update counts for a task status change."""
+        if old_status in self.STATUSES_ACTIVE:
+            self.n_active -= 1
+        elif old_status == TASK_STATUS_QUEUED:
+            self.queued.pop(identity, None)
+        if new_status in self.STATUSES_ACTIVE:
+            self.n_active += 1
+        elif new_status == TASK_STATUS_QUEUED:
+            self.queued[identity] = None
+
 
 class TaskPool(object):
     """Task pool of a suite."""
@@ -66,11 +115,13 @@ class TaskPool(object):
     STOP_REQUEST_NOW = 'REQUEST(NOW)'
     STOP_REQUEST_NOW_NOW = 'REQUEST(NOW-NOW)'
 
-    def __init__(self, config, stop_point, suite_db_mgr, task_events_mgr):
+    def __init__(self, config, stop_point, suite_db_mgr, task_events_mgr,
+                 suite_state_poller=None):
         self.config = config
         self.stop_point = stop_point
         self.suite_db_mgr = suite_db_mgr
         self.task_events_mgr = task_events_mgr
+        self.suite_state_poller = suite_state_poller
 
         self.do_reload = False
         self.custom_runahead_limit = self.config.get_custom_runahead_limit()
@@ -82,15 +133,44 @@ class TaskPool(object):
 
         self.pool = {}
         self.runahead_pool = {}
+        # Tasks in the main and runahead pools: {identity: itask, ...}
+        self._id_index = {}
+        # Cycle points of tasks in the main and runahead pools, and for each
+        # point the number of tasks and the number of unfinished tasks.
+        self._task_points = {}
+        self._unfinished_ids = set()
+        self._point_n_tasks = {}
+        self._point_n_unfinished = {}
+        # Sorted cycle points of tasks in both pools, and in the runahead
+        # pool only, and finished tasks in the runahead pool.
+        self._points = []
+        self._runahead_points = []
+        self._runahead_finished = {}
         self.myq = {}
         self.queues = {}
+        self.queue_counters = {}
+        # Queue counters of tasks in the main pool: {identity: counter, ...}
+        self._queue_counter_of = {}
         self.assign_queues()
 
+        # Next timer deadlines of tasks in the main pool, and IDs of tasks
+        # whose timers must be checked because they are new, have changed
+        # status or have reached their deadlines.
+        self._timer_heap = TaskDeadlineHeap()
+        self._timer_task_ids = set()
+
         self.pool_list = []
         self.rhpool_list = []
         self.pool_changed = []
         self.rhpool_changed = []
 
+        # Inverted index of prerequisites of tasks in the main pool:
+        # {(name, point_str, output): {identity: itask, ...}, ...}
+        self._prereq_index = {}
+        # Completed outputs of tasks in the main pool, as last matched:
+        # {identity: set([output, ...]), ...}
+        self._completed_outputs = {}
+
         self.is_held = False
         self.hold_point = None
         self.held_future_tasks = []
@@ -208,8 +288,15 @@ class TaskPool(object):
             itask.state.set_held()
 
         # add to the runahead pool
-        self.runahead_pool.setdefault(itask.point, {})
+        if itask.point not in self.runahead_pool:
+            self.runahead_pool[itask.point] = {}
+            insort(self._runahead_points, itask.point)
         self.runahead_pool[itask.point][itask.identity] = itask
+        self._id_index[itask.identity] = itask
+        self._add_to_point_index(itask)
+        if itask.state.status in TASK_STATUSES_FINISHED:
+            self._runahead_finished[itask.identity] = itask
+        itask.state.status_callback = self._task_status_changed
         self.rhpool_changed = True
 
         if is_restart:
@@ -232,44 +319,30 @@ class TaskPool(object):
     def release_runahead_tasks(self):
         """Release tasks from the runahead pool to the main pool.
 
-        Return True if any tasks are released, else False.
+        Return the number of tasks released.
         """
-        released = False
+        n_released = 0
         if not self.runahead_pool:
-            return released
+            return n_released
 
         # Any finished tasks can be released immediately (this can happen at
         # restart when all tasks are initially loaded into the runahead pool).
-        for itask_id_maps in self.runahead_pool.copy().values():
-            for itask in itask_id_maps.copy().values():
-                if itask.state.status in [TASK_STATUS_FAILED,
-                                          TASK_STATUS_SUCCEEDED,
-                                          TASK_STATUS_EXPIRED]:
-                    self.release_runahead_task(itask)
-                    released = True
+        for itask in self._runahead_finished.values():
+            self.release_runahead_task(itask)
+            n_released += 1
 
         limit = self.max_num_active_cycle_points
 
-        points = []
-        for point, itasks in sorted(
-                self.get_tasks_by_point(incl_runahead=True).items()):
-            has_unfinished_itasks = False
-            for itask in itasks:
-                if itask.state.status not in [TASK_STATUS_FAILED,
-                                              TASK_STATUS_SUCCEEDED,
-                                              TASK_STATUS_EXPIRED]:
-                    has_unfinished_itasks = True
-                    break
-            if not points and not has_unfinished_itasks:
-                # We need to begin with an unfinished cycle point.
-                continue
-            points.append(point)
-
-        if not points:
-            return False
-
         # Get the earliest point with unfinished tasks.
-        runahead_base_point = min(points)
+        for i, point in enumerate(self._points):
+            if self._point_n_unfinished.get(point):
+                break
+        else:
+            return n_released
+        runahead_base_point = point
+        # Points with tasks from the base point, of which the first "limit"
+        # are all that matter.
+        points = self._points[i:i + limit]
 
         # Get all cycling points possible after the runahead base point.
         if (self._prev_runahead_base_point is not None and
@@ -289,12 +362,11 @@ class TaskPool(object):
             self._prev_runahead_sequence_points = sequence_points
             self._prev_runahead_base_point = runahead_base_point
 
-        points = set(points).union(sequence_points)
-
         if self.custom_runahead_limit is None:
             # Calculate which tasks to release based on a maximum number of
             # active cycle points (active meaning non-finished tasks).
-            latest_allowed_point = sorted(points)[:limit][-1]
+            latest_allowed_point = sorted(
+                sequence_points.union(points))[:limit][-1]
             if self.max_future_offset is not None:
                 # For the first N points, release their future trigger tasks.
                 latest_allowed_point += self.max_future_offset
@@ -318,12 +390,14 @@ class TaskPool(object):
         if latest_allowed_point > self.stop_point:
             latest_allowed_point = self.stop_point
 
-        for point, itask_id_map in self.runahead_pool.copy().items():
-            if point <= latest_allowed_point:
-                for itask in itask_id_map.copy().values():
-                    self.release_runahead_task(itask)
-                    released = True
-        return released
+        # Release the earliest runahead points, up to the latest allowed one.
+        while (self._runahead_points and
+                self._runahead_points[0] <= latest_allowed_point):
+            point = self._runahead_points[0]
+            for itask in self.runahead_pool[point].values():
+                self.release_runahead_task(itask)
+                n_released += 1
+        return n_released
 
     def load_db_task_pool_for_restart(self, row_idx, row):
         """Load a task from previous task pool.
@@ -462,36 +536,46 @@ class TaskPool(object):
             queue = self.config.Q_DEFAULT
         self.queues.setdefault(queue, {})
         self.queues[queue][itask.identity] = itask
+        self.queue_counters.setdefault(queue, TaskQueueCounter())
+        self.queue_counters[queue].add(itask)
+        self._queue_counter_of[itask.identity] = self.queue_counters[queue]
+        self._timer_task_ids.add(itask.identity)
         self.pool.setdefault(itask.point, {})
         self.pool[itask.point][itask.identity] = itask
         self.pool_changed = True
+        self._add_to_prereq_index(itask)
         LOG.debug("released to the task pool", itask=itask)
-        del self.runahead_pool[itask.point][itask.identity]
-        if not self.runahead_pool[itask.point]:
-            del self.runahead_pool[itask.point]
-        self.rhpool_changed = True
+        self._remove_from_runahead_pool(itask)
         if itask.tdef.max_future_prereq_offset is not None:
             self.set_max_future_offset()
 
     def remove(self, itask, reason=None):
         """Remove a task proxy from the pool."""
-        try:
-            del self.runahead_pool[itask.point][itask.identity]
-        except KeyError:
-            pass
-        else:
-            if not self.runahead_pool[itask.point]:
-                del self.runahead_pool[itask.point]
-            self.rhpool_changed = True
+        self.suite_db_mgr.put_delete_task_pool(itask)
+        if self.suite_state_poller is not None:
+            self.suite_state_poller.remove(itask)
+        self._id_index.pop(itask.identity, None)
+        self._remove_from_point_index(itask.identity)
+        if itask.identity in self.runahead_pool.get(itask.point, {}):
+            itask.state.status_callback = None
+            self._remove_from_runahead_pool(itask)
             return
 
         # remove from queue
         if itask.tdef.name in self.myq:  # A reload can remove a task
-            del self.queues[self.myq[itask.tdef.name]][itask.identity]
+            queue = self.myq[itask.tdef.name]
+            del self.queues[queue][itask.identity]
+        itask.state.status_callback = None
+        counter = self._queue_counter_of.pop(itask.identity, None)
+        if counter is not None:
+            counter.remove(itask)
+        self._timer_heap.discard(itask.identity)
+        self._timer_task_ids.discard(itask.identity)
         del self.pool[itask.point][itask.identity]
         if not self.pool[itask.point]:
             del self.pool[itask.point]
         self.pool_changed = True
+        self._remove_from_prereq_index(itask)
         msg = "task proxy removed"
         if reason:
             msg += " (%s)" % reason
@@ -500,6 +584,44 @@ class TaskPool(object):
             self.set_max_future_offset()
         del itask
 
+    def _remove_from_runahead_pool(self, itask):
+        """Remove itask from the runahead pool."""
+        del self.runahead_pool[itask.point][itask.identity]
+        if not self.runahead_pool[itask.point]:
+            del self.runahead_pool[itask.point]
+            del self._runahead_points[
+                bisect_left(self._runahead_points, itask.point)]
+        self._runahead_finished.pop(itask.identity, None)
+        self.rhpool_changed = True
+
+    def _add_to_point_index(self, itask):
+        """Count itask in the cycle point index."""
+        self._remove_from_point_index(itask.identity)
+        point = itask.point
+        self._task_points[itask.identity] = point
+        if point not in self._point_n_tasks:
+            self._point_n_tasks[point] = 0
+            self._point_n_unfinished[point] = 0
+            insort(self._points, point)
+        self._point_n_tasks[point] += 1
+        if itask.state.status not in TASK_STATUSES_FINISHED:
+            self._unfinished_ids.add(itask.identity)
+            self._point_n_unfinished[point] += 1
+
+    def _remove_from_point_index(self, identity):
+        """Stop counting task identity in the cycle point index."""
+        point = self._task_points.pop(identity, None)
+        if point is None:
+            return
+        if identity in self._unfinished_ids:
+            self._unfinished_ids.remove(identity)
+            self._point_n_unfinished[point] -= 1
+        self._point_n_tasks[point] -= 1
+        if not self._point_n_tasks[point]:
+            del self._point_n_tasks[point]
+            del self._point_n_unfinished[point]
+            del self._points[bisect_left(self._points, point)]
+
     def get_all_tasks(self):
         """Return a list of all task proxies."""
         return self.get_rh_tasks() + self.get_tasks()
@@ -541,11 +663,60 @@ class TaskPool(object):
 
         Return None if task does not exist.
         """
-        for itask_ids in self.queues.values() + self.runahead_pool.values():
-            try:
-                return itask_ids[id_]
-            except KeyError:
-                pass
+        return self._id_index.get(id_)
+
+    def get_timer_tasks(self, now):
+        """Return tasks in the pool whose timers need checking now.
+
+        These are tasks that are new to the pool or have changed status
+        since set_timer_deadlines was last called, or whose timer deadlines
+        are earlier than now.
+        """
+        self._timer_task_ids.update(self._timer_heap.pop_due(now))
+        itasks = []
+        for id_ in self._timer_task_ids:
+            itask = self._id_index.get(id_)
+            if itask is not None:
+                itasks.append(itask)
+        return itasks
+
+    def set_timer_deadlines(self, now):
+        """Set next timer deadlines of tasks checked since the last call."""
+        for id_ in self._timer_task_ids:
+            itask = self._id_index.get(id_)
+            if itask is not None:
+                self._timer_heap.set(id_, itask.get_timer_deadline(now))
+        self._timer_task_ids.clear()
+
+    def get_next_timer_deadline(self):
+        """Return the earliest timer deadline of tasks in the pool.
+
+        Return None if no task has a timer deadline.
+        """
+        return self._timer_heap.get_next()
+
+    def _task_status_changed(self, identity, old_status, new_status):
+        """Handle a status change of a task in the main or runahead pool."""
+        point = self._task_points.get(identity)
+        if point is not None:
+            if new_status in TASK_STATUSES_FINISHED:
+                if identity in self._unfinished_ids:
+                    self._unfinished_ids.remove(identity)
+                    self._point_n_unfinished[point] -= 1
+            elif identity not in self._unfinished_ids:
+                self._unfinished_ids.add(identity)
+                self._point_n_unfinished[point] += 1
+        itask = self.runahead_pool.get(point, {}).get(identity)
+        if itask is not None:
+            if new_status in TASK_STATUSES_FINISHED:
+                self._runahead_finished[identity] = itask
+            else:
+                self._runahead_finished.pop(identity, None)
+            return
+        self._timer_task_ids.add(identity)
+        counter = self._queue_counter_of.get(identity)
+        if counter is not None:
+            counter.status_changed(identity, old_status, new_status)
 
     def get_ready_tasks(self):
         """
@@ -570,6 +741,7 @@ class TaskPool(object):
 
         # 1) queue unqueued tasks that are ready to run or manually forced
         now = time()
+        manual_queued = {}
         for itask in self.get_tasks():
             if itask.state.status != TASK_STATUS_QUEUED:
                 # only need to check that unqueued tasks are ready
@@ -577,36 +749,38 @@ class TaskPool(object):
                     # queue the task
                     itask.state.reset_state(TASK_STATUS_QUEUED)
                     itask.reset_manual_trigger()
+            elif itask.manual_trigger:
+                queue = self.myq.get(itask.tdef.name, self.config.Q_DEFAULT)
+                manual_queued.setdefault(queue, [])
+                manual_queued[queue].append(itask)
 
         # 2) submit queued tasks if manually forced or not queue-limited
+        # (Only TASK_STATUS_QUEUED tasks are released. This excludes tasks
+        # remaining TASK_STATUS_READY because job submission has been
+        # stopped with 'cylc shutdown').
         ready_tasks = []
         qconfig = self.config.cfg['scheduling']['queues']
-        for queue in self.queues:
-            # 2.1) count active tasks and compare to queue limit
-            n_active = 0
-            n_release = 0
+        for queue, counter in self.queue_counters.items():
             n_limit = qconfig[queue]['limit']
-            tasks = self.queues[queue].values()
-            if n_limit:
-                for itask in tasks:
-                    if itask.state.status in [TASK_STATUS_READY,
-                                              TASK_STATUS_SUBMITTED,
-                                              TASK_STATUS_RUNNING]:
-                        n_active += 1
-                n_release = n_limit - n_active
-
-            # 2.2) release queued tasks if not limited or if manually forced
-            for itask in tasks:
-                if not itask.state.status == TASK_STATUS_QUEUED:
-                    # (This excludes tasks remaining TASK_STATUS_READY because
-                    # job submission has been stopped with 'cylc shutdown').
-                    continue
-                if itask.manual_trigger or not n_limit or n_release > 0:
-                    # manual release, or no limit, or not currently limited
+            n_release = n_limit - counter.n_active
+
+            # 2.1) release manually forced tasks, counting against the limit
+            manual_itasks = manual_queued.get(queue, [])
+            for itask in manual_itasks:
+                n_release -= 1
+                ready_tasks.append(itask)
+                itask.reset_manual_trigger()
+
+            # 2.2) release other queued tasks in order, if not limited
+            if n_limit and n_release <= 0:
+                continue
+            manual_ids = set(itask.identity for itask in manual_itasks)
+            for id_ in counter.queued:
+                if n_limit and n_release <= 0:
+                    break
+                if id_ not in manual_ids:
                     n_release -= 1
-                    ready_tasks.append(itask)
-                    itask.reset_manual_trigger()
-                # else leaved queued
+                    ready_tasks.append(self.queues[queue][id_])
 
         LOG.debug('%d task(s) de-queued' % len(ready_tasks))
 
@@ -639,11 +813,9 @@ class TaskPool(object):
 
     def get_max_point_runahead(self):
         """Return the maximum cycle point currently in the runahead pool."""
-        cycles = self.runahead_pool.keys()
-        maxc = None
-        if cycles:
-            maxc = max(cycles)
-        return maxc
+        if self._runahead_points:
+            return self._runahead_points[-1]
+        return None
 
     def set_max_future_offset(self):
         """Calculate the latest required future trigger offset."""
@@ -669,6 +841,8 @@ class TaskPool(object):
         # self.queues[queue][id_] = task
         self.assign_queues()
         new_queues = {}
+        new_queue_counters = {}
+        self._queue_counter_of.clear()
         for queue in self.queues:
             for id_, itask in self.queues[queue].items():
                 if itask.tdef.name not in self.myq:
@@ -676,8 +850,12 @@ class TaskPool(object):
                 key = self.myq[itask.tdef.name]
                 if key not in new_queues:
                     new_queues[key] = {}
+                    new_queue_counters[key] = TaskQueueCounter()
                 new_queues[key][id_] = itask
+                new_queue_counters[key].add(itask)
+                self._queue_counter_of[id_] = new_queue_counters[key]
         self.queues = new_queues
+        self.queue_counters = new_queue_counters
 
         # find any old tasks that have been removed from the suite
         old_task_name_list = self.task_name_list
@@ -710,6 +888,8 @@ class TaskPool(object):
                 else:
                     # Keep active orphaned task, but stop it from spawning.
                     itask.has_spawned = True
+                    itask.is_updated = True
+                    itask.is_summary_updated = True
                     LOG.warning(
                         "last instance (orphaned by reload)", itask=itask)
             else:
@@ -900,25 +1080,75 @@ class TaskPool(object):
         """Run time dependency negotiation.
 
         Tasks attempt to get their prerequisites satisfied by other tasks'
-        outputs. Brokered negotiation is O(n) in number of tasks.
+        outputs. Newly completed outputs are looked up in an inverted index,
+        so only the prerequisites that depend on them are evaluated. Tasks
+        that are new to the main pool, or whose prerequisites have been
+        reset, are matched against all completed outputs in the pool.
+
+        Return the number of tasks scanned.
 
         """
-        all_task_outputs = set()
-        for itask in self.get_tasks():
-            for output in itask.state.outputs.get_completed():
-                all_task_outputs.add((itask.tdef.name,
-                                      str(itask.point),
-                                      output))
-        for itask in self.get_tasks():
-            # Try to satisfy itask if not already satisfied.
+        rematch_itasks = []
+        itasks = self.get_tasks()
+        for itask in itasks:
+            if itask.state.prerequisites_reset:
+                itask.state.prerequisites_reset = False
+                rematch_itasks.append(itask)
+            if not itask.state.outputs.completion_changed:
+                continue
+            itask.state.outputs.completion_changed = False
+            completed = set(itask.state.outputs.get_completed())
+            prev_completed = self._completed_outputs.get(itask.identity)
+            self._completed_outputs[itask.identity] = completed
+            if prev_completed:
+                completed = completed - prev_completed
+            point_str = str(itask.point)
+            for output in completed:
+                message = (itask.tdef.name, point_str, output)
+                for dep_itask in self._prereq_index.get(message, {}).values():
+                    if dep_itask.state.prerequisites_are_not_all_satisfied():
+                        dep_itask.state.satisfy_me(set([message]))
+        for itask in rematch_itasks:
             if itask.state.prerequisites_are_not_all_satisfied():
-                itask.state.satisfy_me(all_task_outputs)
+                itask.state.satisfy_me(self._get_completed_messages(itask))
+        return len(itasks)
+
+    def _add_to_prereq_index(self, itask):
+        """Index prerequisites of a task proxy released to the main pool."""
+        for message in itask.state.get_prerequisite_messages():
+            self._prereq_index.setdefault(message, {})[itask.identity] = itask
+        # Match prerequisites and propagate outputs on next negotiation.
+        itask.state.prerequisites_reset = True
+        itask.state.outputs.completion_changed = True
+
+    def _remove_from_prereq_index(self, itask):
+        """Remove a task proxy leaving the main pool from the indexes."""
+        for message in itask.state.get_prerequisite_messages():
+            try:
+                del self._prereq_index[message][itask.identity]
+            except KeyError:
+                continue
+            if not self._prereq_index[message]:
+                del self._prereq_index[message]
+        self._completed_outputs.pop(itask.identity, None)
+
+    def _get_completed_messages(self, itask):
+        """Return completed messages that itask's prerequisites refer to."""
+        messages = set()
+        for message in itask.state.get_prerequisite_messages():
+            name, point_str, output = message
+            if output in self._completed_outputs.get(
+                    TaskID.get(name, point_str), ()):
+                messages.add(message)
+        return messages
 
     def force_spawn(self, itask):
         """Spawn successor of itask."""
         if itask.has_spawned:
             return None
         itask.has_spawned = True
+        itask.is_updated = True
+        itask.is_summary_updated = True
         LOG.debug('forced spawning', itask=itask)
         next_point = itask.next_point()
         if next_point is None:
@@ -1042,6 +1272,9 @@ class TaskPool(object):
         for itask in itasks:
             if status and status != itask.state.status:
                 LOG.info("resetting state to %s" % status, itask=itask)
+                if self.suite_state_poller is not None:
+                    # Stop polling for a suite state polling task
+                    self.suite_state_poller.remove(itask)
                 if status == TASK_STATUS_READY:
                     # Pseudo state (in this context) -
                     # set waiting and satisified.
@@ -1150,46 +1383,43 @@ class TaskPool(object):
                         (itask.get_try_num() == 1 or
                          not conf['fail try 1 only'])):
                     message_queue.put(
-                        (itask.identity, 'CRITICAL', TASK_STATUS_FAILED))
+                        (itask.identity, 'CRITICAL', TASK_STATUS_FAILED,
+                         time()))
                 else:
                     # Simulate message outputs.
                     for msg in itask.tdef.rtconfig['outputs'].values():
-                        message_queue.put((itask.identity, 'NORMAL', msg))
+                        message_queue.put(
+                            (itask.identity, 'NORMAL', msg, time()))
                     message_queue.put(
-                        (itask.identity, 'NORMAL', TASK_STATUS_SUCCEEDED))
+                        (itask.identity, 'NORMAL', TASK_STATUS_SUCCEEDED,
+                         time()))
                 sim_task_state_changed = True
         return sim_task_state_changed
 
-    def set_expired_tasks(self):
+    def set_expired_tasks(self, now):
         """Check if any waiting tasks expired.
 
         Set their status accordingly.
         """
-        now = time()
-        for itask in self.get_tasks():
+        for itask in self.get_timer_tasks(now):
             if (itask.state.status != TASK_STATUS_WAITING or
                     itask.tdef.expiration_offset is None):
                 continue
-            if itask.expire_time is None:
-                itask.expire_time = (
-                    itask.get_point_as_seconds() +
-                    itask.get_offset_as_seconds(itask.tdef.expiration_offset))
-            if now > itask.expire_time:
+            if now > itask.get_expire_time():
                 msg = 'Task expired (skipping job).'
                 LOG.warning(msg, itask=itask)
                 self.task_events_mgr.setup_event_handlers(
                     itask, "expired", msg)
                 itask.state.reset_state(TASK_STATUS_EXPIRED)
 
-    def waiting_tasks_ready(self):
+    def waiting_tasks_ready(self, now):
         """Waiting tasks can become ready for internal reasons.
 
         Namely clock-triggers or retry-delay timers
 
         """
-        now = time()
         result = False
-        for itask in self.get_tasks():
+        for itask in self.get_timer_tasks(now):
             if itask.ready_to_run(now):
                 result = True
                 break
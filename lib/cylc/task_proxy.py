@@ -23,7 +23,8 @@ from isodatetime.timezone import get_local_time_zone
 import cylc.cycling.iso8601
 from cylc.task_id import TaskID
 from cylc.task_state import (
-    TaskState, TASK_STATUS_WAITING, TASK_STATUS_RETRYING)
+    TaskState, TASK_STATUS_WAITING, TASK_STATUS_RETRYING,
+    TASK_STATUS_RUNNING)
 from cylc.wallclock import get_unix_time_from_time_string
 
 
@@ -37,6 +38,8 @@ class TaskProxySequenceBoundsError(ValueError):
 class TaskProxy(object):
     """The task proxy."""
 
+    KEY_EXECUTE_TIME_LIMIT = 'execution_time_limit'
+
     # Memory optimization - constrain possible attributes to this list.
     __slots__ = ["tdef", "submit_num",
                  "point", "cleanup_cutoff", "identity", "has_spawned",
@@ -44,7 +47,8 @@ class TaskProxy(object):
                  "is_manual_submit", "summary", "local_job_file_path",
                  "try_timers", "task_host", "task_owner",
                  "job_vacated", "poll_timers", "timeout_timers",
-                 "delayed_start", "expire_time", "state"]
+                 "delayed_start", "expire_time", "state", "is_updated",
+                 "is_summary_updated"]
 
     def __init__(
             self, tdef, start_point, status=TASK_STATUS_WAITING,
@@ -113,6 +117,13 @@ class TaskProxy(object):
         self.delayed_start = None
         self.expire_time = None
 
+        # Set when has_spawned or task timers change, reset when written to
+        # the suite runtime database.
+        self.is_updated = True
+        # Set when has_spawned or the summary change, reset when the suite
+        # state summary is updated.
+        self.is_summary_updated = True
+
         self.state = TaskState(tdef, self.point, status, hold_swap)
 
         if tdef.sequential:
@@ -228,6 +239,7 @@ class TaskProxy(object):
             # unset any retry delay timers
             for timer in self.try_timers.values():
                 timer.timeout = None
+            self.is_updated = True
 
     def set_event_time(self, event_key, time_str=None):
         """Set event time in self.summary
@@ -240,13 +252,54 @@ class TaskProxy(object):
             self.summary[event_key + '_time'] = float(
                 get_unix_time_from_time_string(time_str))
         self.summary[event_key + '_time_string'] = time_str
+        self.is_summary_updated = True
 
     def start_time_reached(self, now):
         """Has this task reached its clock trigger time?"""
         if self.tdef.clocktrigger_offset is None:
             return True
-        if self.delayed_start is None:
+        return now > self.get_delayed_start()
+
+    def get_delayed_start(self):
+        """Return (and store) my clock trigger time, or None if none."""
+        if self.delayed_start is None and (
+                self.tdef.clocktrigger_offset is not None):
             self.delayed_start = (
                 self.get_point_as_seconds() +
                 self.get_offset_as_seconds(self.tdef.clocktrigger_offset))
-        return now > self.delayed_start
+        return self.delayed_start
+
+    def get_expire_time(self):
+        """Return (and store) my expiry time, or None if none."""
+        if self.expire_time is None and (
+                self.tdef.expiration_offset is not None):
+            self.expire_time = (
+                self.get_point_as_seconds() +
+                self.get_offset_as_seconds(self.tdef.expiration_offset))
+        return self.expire_time
+
+    def get_timer_deadline(self, now):
+        """Return the next time after now that one of my timers is due.
+
+        Consider the clock trigger and expiry times of a waiting task, and
+        the retry, poll and timeout timers of the current status. Return now
+        if the execution time limit poll timer of a running task has not
+        been started yet, or None if no timer is due after now.
+
+        """
+        status = self.state.status
+        times = [self.timeout_timers.get(status)]
+        timers = [self.try_timers.get(status), self.poll_timers.get(status)]
+        if status == TASK_STATUS_WAITING:
+            times.append(self.get_delayed_start())
+            times.append(self.get_expire_time())
+        elif status == TASK_STATUS_RUNNING:
+            timer = self.poll_timers.get(self.KEY_EXECUTE_TIME_LIMIT)
+            if timer is not None and not timer.is_timeout_set():
+                return now
+            timers.append(timer)
+        times.extend(timer.timeout for timer in timers if timer is not None)
+        times = [time_ for time_ in times if time_ is not None and time_ > now]
+        if times:
+            return min(times)
+        return None
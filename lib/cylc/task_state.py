@@ -162,14 +162,25 @@ class TaskState(object):
     # Memory optimization - constrain possible attributes to this list.
     __slots__ = ["identity", "status", "hold_swap",
                  "_is_satisfied", "_suicide_is_satisfied", "prerequisites",
-                 "suicide_prerequisites", "external_triggers", "outputs",
-                 "kill_failed", "time_updated", "confirming_with_poll"]
+                 "suicide_prerequisites", "prerequisites_reset",
+                 "external_triggers", "outputs", "kill_failed",
+                 "time_updated", "is_updated", "is_summary_updated",
+                 "confirming_with_poll", "status_callback"]
 
     def __init__(self, tdef, point, status, hold_swap):
         self.identity = TaskID.get(tdef.name, str(point))
         self.status = status
         self.hold_swap = hold_swap
         self.time_updated = None
+        # Set when status or hold_swap changes, reset when written to the
+        # task_pool table of the suite runtime database.
+        self.is_updated = True
+        # Set when status changes, reset when the suite state summary is
+        # updated.
+        self.is_summary_updated = True
+        # Called as status_callback(identity, old_status, new_status) when
+        # status changes, e.g. to keep the counts of an internal queue.
+        self.status_callback = None
 
         self._is_satisfied = None
         self._suicide_is_satisfied = None
@@ -178,6 +189,9 @@ class TaskState(object):
         self.prerequisites = []
         self.suicide_prerequisites = []
         self._add_prerequisites(point, tdef)
+        # Set when prerequisites need to be matched against all outputs in
+        # the task pool again, i.e. on creation and on reset.
+        self.prerequisites_reset = True
 
         # External Triggers.
         self.external_triggers = {}
@@ -232,6 +246,12 @@ class TaskState(object):
                 preq.is_satisfied() for preq in self.suicide_prerequisites)
         return self._suicide_is_satisfied
 
+    def get_prerequisite_messages(self):
+        """Return a set of (name, point_str, output) in all prerequisites."""
+        return set(message for prereqs in [
+            self.prerequisites, self.suicide_prerequisites]
+            for prereq in prereqs for message in prereq.satisfied)
+
     def prerequisites_get_target_points(self):
         """Return a list of cycle points targeted by each prerequisite."""
         return set(point for prerequisite in self.prerequisites for
@@ -255,6 +275,7 @@ class TaskState(object):
         for prereq in self.prerequisites:
             prereq.set_not_satisfied()
         self._is_satisfied = None
+        self.prerequisites_reset = True
 
     def prerequisites_dump(self, list_prereqs=False):
         """Dump prerequisites."""
@@ -296,6 +317,7 @@ class TaskState(object):
         """
         if self.status in TASK_STATUSES_ACTIVE:
             self.hold_swap = TASK_STATUS_HELD
+            self.is_updated = True
             return
         elif self.status in [
                 TASK_STATUS_WAITING, TASK_STATUS_QUEUED,
@@ -310,6 +332,7 @@ class TaskState(object):
             self.reset_state(TASK_STATUS_WAITING)
         elif self.hold_swap == TASK_STATUS_HELD:
             self.hold_swap = None
+            self.is_updated = True
         else:
             self.reset_state(self.hold_swap)
 
@@ -372,6 +395,7 @@ class TaskState(object):
         update task_events table)."""
         if self.status == self.hold_swap:
             self.hold_swap = None
+            self.is_updated = True
         if status == self.status and self.hold_swap is None:
             return
         o_status, o_hold_swap = self.status, self.hold_swap
@@ -388,7 +412,11 @@ class TaskState(object):
             self.hold_swap = None
         self.status = status
         self.time_updated = get_current_time_string()
+        self.is_updated = True
+        self.is_summary_updated = True
         flags.iflag = True
+        if self.status_callback is not None and o_status != self.status:
+            self.status_callback(self.identity, o_status, self.status)
         # Log
         message = str(o_status)
         if o_hold_swap:
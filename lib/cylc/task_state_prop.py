@@ -89,23 +89,32 @@ _STATUS_MAP = {
 }
 
 
+# Task states in order of precedence, for summarising as a group.
+GROUP_STATES_ORDERED = [
+    TASK_STATUS_SUBMIT_FAILED, TASK_STATUS_FAILED,
+    TASK_STATUS_EXPIRED, TASK_STATUS_SUBMIT_RETRYING,
+    TASK_STATUS_RETRYING, TASK_STATUS_RUNNING,
+    TASK_STATUS_SUBMITTED, TASK_STATUS_READY,
+    TASK_STATUS_QUEUED, TASK_STATUS_WAITING,
+    TASK_STATUS_HELD, TASK_STATUS_SUCCEEDED,
+    TASK_STATUS_RUNAHEAD]
+# As above, for a stopped suite.
+GROUP_STATES_ORDERED_STOPPED = [
+    TASK_STATUS_SUBMIT_FAILED, TASK_STATUS_FAILED,
+    TASK_STATUS_RUNNING, TASK_STATUS_SUBMITTED,
+    TASK_STATUS_EXPIRED, TASK_STATUS_READY,
+    TASK_STATUS_SUBMIT_RETRYING, TASK_STATUS_RETRYING,
+    TASK_STATUS_SUCCEEDED, TASK_STATUS_QUEUED,
+    TASK_STATUS_WAITING, TASK_STATUS_HELD,
+    TASK_STATUS_RUNAHEAD]
+
+
 def extract_group_state(child_states, is_stopped=False):
     """Summarise child states as a group."""
-    ordered_states = [TASK_STATUS_SUBMIT_FAILED, TASK_STATUS_FAILED,
-                      TASK_STATUS_EXPIRED, TASK_STATUS_SUBMIT_RETRYING,
-                      TASK_STATUS_RETRYING, TASK_STATUS_RUNNING,
-                      TASK_STATUS_SUBMITTED, TASK_STATUS_READY,
-                      TASK_STATUS_QUEUED, TASK_STATUS_WAITING,
-                      TASK_STATUS_HELD, TASK_STATUS_SUCCEEDED,
-                      TASK_STATUS_RUNAHEAD]
     if is_stopped:
-        ordered_states = [TASK_STATUS_SUBMIT_FAILED, TASK_STATUS_FAILED,
-                          TASK_STATUS_RUNNING, TASK_STATUS_SUBMITTED,
-                          TASK_STATUS_EXPIRED, TASK_STATUS_READY,
-                          TASK_STATUS_SUBMIT_RETRYING, TASK_STATUS_RETRYING,
-                          TASK_STATUS_SUCCEEDED, TASK_STATUS_QUEUED,
-                          TASK_STATUS_WAITING, TASK_STATUS_HELD,
-                          TASK_STATUS_RUNAHEAD]
+        ordered_states = GROUP_STATES_ORDERED_STOPPED
+    else:
+        ordered_states = GROUP_STATES_ORDERED
     for state in ordered_states:
         if state in child_states:
             return state
@@ -62,12 +62,15 @@ class config(object):
                         "Illegal file spec item: %s" % itemstr(
                             pars, repr(value)))
 
-    def loadcfg(self, rcfile, title=""):
+    def loadcfg(self, rcfile, title="", cache_dir=None):
         """Parse a config file, upgrade or deprecate items if necessary,
         validate it against the spec, and if this is not the first load,
-        combine/override with the existing loaded config."""
+        combine/override with the existing loaded config.
 
-        sparse = parse(rcfile, self.output_fname, self.tvars)
+        If cache_dir is specified, use it to cache the processing of the
+        config file (see parsec.fileparse.read_and_proc)."""
+
+        sparse = parse(rcfile, self.output_fname, self.tvars, cache_dir)
 
         if self.upgrader is not None:
             self.upgrader(sparse, title)
@@ -21,6 +21,8 @@ parsec config file parsing:
  1) inline include-files
  2) process with Jinja2
  3) join continuation lines
+    (the result of 1-3 for Jinja2 files may be cached on disk, keyed on
+    everything it depends on)
  4) parse items into a nested ordered dict
     * line-comments and blank lines are skipped
     * trailing comments are stripped from section headings
@@ -32,18 +34,28 @@ parsec config file parsing:
       value type is known).
 """
 
+from hashlib import sha1
+import json
 import os
 import sys
 import re
+from tempfile import NamedTemporaryFile
 import traceback
 
 from parsec import ParsecError
 from parsec.OrderedDict import OrderedDictWithDefaults
 from parsec.include import inline, IncludeFileNotFoundError
-from parsec.jinja2support import jinja2process
+from parsec.jinja2support import get_filter_dirs, jinja2process
 from jinja2 import TemplateError, UndefinedError
 from parsec.util import itemstr
 import cylc.flags
+from cylc.mkdir_p import mkdir_p
+from cylc.version import CYLC_VERSION
+
+# In a cache directory: file of processed lines is named after the config file
+# with this extension, and Jinja2 bytecode is cached in this sub-directory.
+CACHE_FILE_EXT = '.cache'
+CACHE_JINJA2_BYTECODE_DIR = 'jinja2'
 
 
 # heading/sections can contain commas (namespace name lists) and any
@@ -219,12 +231,110 @@ def multiline(flines, value, index, maxline):
     return quot + newvalue + line, index
 
 
-def read_and_proc(fpath, template_vars=None, viewcfg=None, asedit=False):
+def _get_file_checksum(path):
+    """Return the SHA1 checksum of the content of a file."""
+    with open(path, 'rb') as handle:
+        return sha1(handle.read()).hexdigest()
+
+
+def _get_cache_key(fpath, flines, template_vars):
+    """Return the cache key of the inlined lines of a Jinja2 file.
+
+    The key is a checksum of the cylc version, the file path, the template
+    variables, the inlined lines, and the custom Jinja2 filters and suite
+    Python library modules that may be used in processing them.
+    """
+    key = sha1(CYLC_VERSION)
+    key.update('\0' + os.path.realpath(fpath))
+    if template_vars:
+        for item in sorted(template_vars.items()):
+            key.update('\0%s=%r' % item)
+    key.update('\0' + '\n'.join(flines))
+    fdir = os.path.dirname(fpath)
+    for dir_ in get_filter_dirs(fdir) + [os.path.join(fdir, 'lib', 'python')]:
+        for dirpath, dnames, fnames in os.walk(dir_):
+            dnames.sort()
+            for fname in sorted(fnames):
+                if fname.endswith('.py'):
+                    path = os.path.join(dirpath, fname)
+                    key.update('\0%s=%s' % (path, _get_file_checksum(path)))
+    return key.hexdigest()
+
+
+def _load_cache(cache_path, key):
+    """Return the processed lines in cache_path, if still valid for key.
+
+    Return None if there is no cache, or if the cache is for a different key,
+    or if any of the Jinja2 templates or environment variables recorded in
+    the cache have changed, or if any template recorded as missing exists.
+    """
+    try:
+        with open(cache_path, 'rb') as handle:
+            cache = json.load(handle)
+        if cache['key'] != key:
+            return None
+        for path, checksum in cache['deps']['files'].items():
+            if checksum is None:
+                # Looked up in vain before
+                if os.path.exists(path):
+                    return None
+            elif _get_file_checksum(path) != checksum:
+                return None
+        for name, value in cache['deps']['environ'].items():
+            if value is not None:
+                value = value.encode('utf-8')
+            if os.environ.get(name) != value:
+                return None
+        return [line.encode('utf-8') for line in cache['lines']]
+    except (IOError, OSError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _dump_cache(cache_path, key, deps, flines):
+    """Write processed lines and their dependencies to cache_path.
+
+    Do nothing if the lines depend on the whole environment. Failure to
+    write the cache is not an error.
+    """
+    if deps.get('environ') is None:
+        return
+    handle = None
+    try:
+        mkdir_p(os.path.dirname(cache_path))
+        handle = NamedTemporaryFile(
+            prefix=os.path.basename(cache_path),
+            dir=os.path.dirname(cache_path), delete=False)
+        json.dump({'key': key, 'deps': deps, 'lines': flines}, handle)
+        os.fsync(handle.fileno())
+        handle.close()
+        os.rename(handle.name, cache_path)
+    except (IOError, OSError, UnicodeDecodeError) as exc:
+        if cylc.flags.verbose:
+            print >> sys.stderr, 'WARNING: cannot cache %s: %s' % (
+                cache_path, exc)
+        if handle is not None:
+            handle.close()
+            try:
+                os.unlink(handle.name)
+            except OSError:
+                pass
+    else:
+        if cylc.flags.verbose:
+            print "Processed lines cached:", cache_path
+
+
+def read_and_proc(fpath, template_vars=None, viewcfg=None, asedit=False,
+                  cache_dir=None):
     """
     Read a cylc parsec config file (at fpath), inline any include files,
     process with Jinja2, and concatenate continuation lines.
     Jinja2 processing must be done before concatenation - it could be
     used to generate continuation lines.
+
+    If cache_dir is specified, the processed lines of a Jinja2 file are
+    loaded from, or else saved to, a cache file in it, except for partial
+    processing for viewing or editing. Compiled Jinja2 templates are also
+    cached in it.
     """
     fdir = os.path.dirname(fpath)
 
@@ -260,12 +370,29 @@ def read_and_proc(fpath, template_vars=None, viewcfg=None, asedit=False):
             raise FileParseError(str(x))
 
     # process with Jinja2
+    cache_path = None
+    bytecode_cache_dir = None
+    if cache_dir:
+        cache_path = os.path.join(
+            cache_dir, os.path.basename(fpath) + CACHE_FILE_EXT)
+        bytecode_cache_dir = os.path.join(
+            cache_dir, CACHE_JINJA2_BYTECODE_DIR)
+    cache_key = None
+    deps = {}
     if do_jinja2:
         if flines and re.match('^#![jJ]inja2\s*', flines[0]):
+            if cache_path and not viewcfg and not asedit:
+                cache_key = _get_cache_key(fpath, flines, template_vars)
+                cached_lines = _load_cache(cache_path, cache_key)
+                if cached_lines is not None:
+                    if cylc.flags.verbose:
+                        print "Processed lines loaded from:", cache_path
+                    return cached_lines
             if cylc.flags.verbose:
                 print "Processing with Jinja2"
             try:
-                flines = jinja2process(flines, fdir, template_vars)
+                flines = jinja2process(
+                    flines, fdir, template_vars, deps, bytecode_cache_dir)
             except (TemplateError, TypeError, UndefinedError) as exc:
                 # Extract diagnostic info from the end of the Jinja2 traceback.
                 exc_lines = traceback.format_exc().splitlines()
@@ -303,14 +430,17 @@ def read_and_proc(fpath, template_vars=None, viewcfg=None, asedit=False):
         flines = _concatenate(flines)
 
     # return rstripped lines
-    return [fl.rstrip() for fl in flines]
+    flines = [fl.rstrip() for fl in flines]
+    if cache_key:
+        _dump_cache(cache_path, cache_key, deps, flines)
+    return flines
 
 
-def parse(fpath, output_fname=None, template_vars=None):
+def parse(fpath, output_fname=None, template_vars=None, cache_dir=None):
     "Parse file items line-by-line into a corresponding nested dict."
 
     # read and process the file (jinja2, include-files, line continuation)
-    flines = read_and_proc(fpath, template_vars)
+    flines = read_and_proc(fpath, template_vars, cache_dir=cache_dir)
     if output_fname:
         with open(output_fname, 'wb') as handle:
             handle.write('\n'.join(flines) + '\n')
@@ -21,13 +21,27 @@ Importing code should catch ImportError in case Jinja2 is not installed.
 """
 
 from glob import glob
+from hashlib import sha1
+import imp
 import os
+from shutil import rmtree
 import sys
+from tempfile import mkdtemp
+import unittest
 from jinja2 import (
     Environment,
+    FileSystemBytecodeCache,
     FileSystemLoader,
-    StrictUndefined)
+    StrictUndefined,
+    TemplateNotFound)
+from jinja2.loaders import split_template_path
 import cylc.flags
+from cylc.mkdir_p import mkdir_p
+
+# Custom Jinja2 filters loaded by this process: {path: (mtime, filter), ...}
+_FILTERS = {}
+# Name of the main template in the bytecode cache
+_TEMPLATE_NAME = '<template>'
 
 
 def raise_helper(message, error_type='Error'):
@@ -42,12 +56,193 @@ def assert_helper(logical, message):
     return ''  # Prevent None return value polluting output.
 
 
-def jinja2process(flines, dir_, template_vars=None):
-    """Pass configure file through Jinja2 processor."""
+class RecordingFileSystemLoader(FileSystemLoader):
+    """File system loader that records the files it looks up.
+
+    files should be a dict, populated with {path: SHA1 checksum, ...} of the
+    files loaded, and {path: None, ...} of the paths looked up in vain, e.g.
+    by "{% include 'foo.rc' ignore missing %}".
+    """
+
+    def __init__(self, searchpath, files):
+        FileSystemLoader.__init__(self, searchpath)
+        self.files = files
+
+    def get_source(self, environment, template):
+        try:
+            contents, filename, uptodate = FileSystemLoader.get_source(
+                self, environment, template)
+        except TemplateNotFound:
+            try:
+                pieces = split_template_path(template)
+            except TemplateNotFound:
+                # Bad path, e.g. with "..", will never be found
+                raise
+            for searchpath in self.searchpath:
+                self.files[os.path.join(searchpath, *pieces)] = None
+            raise
+        self.files[filename] = sha1(contents.encode('utf-8')).hexdigest()
+        return contents, filename, uptodate
+
+
+class RecordingEnviron(dict):
+    """Copy of the environment that records the variables looked up.
+
+    names should be a dict, populated with {name: value or None, ...}.
+    Listing, comparing or modifying the environment sets the "is_listed"
+    attribute, as the result may then depend on any variable.
+    """
+
+    def __init__(self, names):
+        dict.__init__(self, os.environ)
+        self.names = names
+        self.is_listed = False
+
+    def _record(self, key):
+        """Record the value (or absence) of variable key."""
+        self.names[key] = dict.get(self, key)
+
+    def __getitem__(self, key):
+        self._record(key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self._record(key)
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        self._record(key)
+        return dict.get(self, key, default)
+
+    def has_key(self, key):
+        self._record(key)
+        return dict.has_key(self, key)
+
+    def pop(self, key, *args):
+        self._record(key)
+        self.is_listed = True
+        return dict.pop(self, key, *args)
+
+    def setdefault(self, key, default=None):
+        self._record(key)
+        self.is_listed = True
+        return dict.setdefault(self, key, default)
+
+
+def _get_listing_method(name):
+    """Return a dict method that sets "is_listed" of a RecordingEnviron."""
+    method = getattr(dict, name)
+
+    def _listing_method(self, *args, **kwargs):
+        self.is_listed = True
+        return method(self, *args, **kwargs)
+
+    _listing_method.__name__ = name
+    return _listing_method
+
+
+# All other dict methods that read or modify the content
+for _name in [
+        '__cmp__', '__delitem__', '__eq__', '__ge__', '__gt__', '__iter__',
+        '__le__', '__len__', '__lt__', '__ne__', '__repr__', '__setitem__',
+        'clear', 'copy', 'items', 'iteritems', 'iterkeys', 'itervalues',
+        'keys', 'popitem', 'update', 'values', 'viewitems', 'viewkeys',
+        'viewvalues']:
+    setattr(RecordingEnviron, _name, _get_listing_method(_name))
+
+
+class TolerantBytecodeCache(FileSystemBytecodeCache):
+    """File system bytecode cache that ignores bad or unwritable files.
+
+    A cache file may be unreadable, or part written by another process, in
+    which case the template is compiled again. Failure to write a cache file
+    is not an error.
+    """
+
+    def load_bytecode(self, bucket):
+        try:
+            FileSystemBytecodeCache.load_bytecode(self, bucket)
+        except StandardError:
+            # Could be IOError, EOFError, unpickling error, etc
+            bucket.reset()
+
+    def dump_bytecode(self, bucket):
+        try:
+            FileSystemBytecodeCache.dump_bytecode(self, bucket)
+        except (IOError, OSError):
+            pass
+
+
+def get_filter_dirs(dir_):
+    """Return the directories of custom Jinja2 filters for a suite."""
+    return [
+        os.path.join(os.environ['CYLC_DIR'], 'lib', 'Jinja2Filters'),
+        os.path.join(dir_, 'Jinja2Filters'),
+        os.path.join(os.environ['HOME'], '.cylc', 'Jinja2Filters')]
+
+
+def load_filters(dir_):
+    """Return {name: filter, ...} of custom Jinja2 filters for a suite.
+
+    A filter "foo" is function "foo" in module "foo.py" in a filter
+    directory. Filter modules are loaded once per process, and loaded again
+    only if modified, e.g. before a suite reload. Each filter directory is
+    added to sys.path once, so that filter modules can import other modules
+    in it.
+    """
+    filters = {}
+    for fdir in get_filter_dirs(dir_):
+        if not os.path.isdir(fdir):
+            continue
+        fdir = os.path.abspath(fdir)
+        if fdir not in sys.path:
+            sys.path.append(fdir)
+        for path in sorted(glob(os.path.join(fdir, '*.py'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            mtime = os.stat(path).st_mtime
+            if path not in _FILTERS or _FILTERS[path][0] != mtime:
+                # TODO - EXCEPTION HANDLING FOR LOADING CUSTOM FILTERS
+                # Private module name, unique to the filter directory, in
+                # case the filter shadows another module or filter
+                module = imp.load_source(
+                    '_jinja2filters_%s_%s' % (sha1(fdir).hexdigest(), name),
+                    path)
+                _FILTERS[path] = (mtime, getattr(module, name))
+            filters[name] = _FILTERS[path][1]
+    return filters
+
+
+def jinja2process(flines, dir_, template_vars=None, deps=None,
+                  bytecode_cache_dir=None):
+    """Pass configure file through Jinja2 processor.
+
+    If deps is a dict, populate it with what the result depends on, other
+    than flines, template_vars and custom filters:
+    * deps['files'] = {path: SHA1 checksum, ...} of templates loaded from
+      dir_, e.g. by "{% include %}", and {path: None, ...} of templates not
+      found, e.g. by "{% include ... ignore missing %}".
+    * deps['environ'] = {name: value or None, ...} of environment variables
+      looked up, or None if the template lists the whole environment.
+
+    If bytecode_cache_dir is specified, compiled templates (the main
+    template and any included or imported templates) are cached in it, and
+    are only compiled again if their source changes.
+    """
+    files = {}
+    names = {}
+    bytecode_cache = None
+    if bytecode_cache_dir:
+        try:
+            mkdir_p(bytecode_cache_dir)
+        except OSError:
+            pass
+        else:
+            bytecode_cache = TolerantBytecodeCache(bytecode_cache_dir)
     env = Environment(
-        loader=FileSystemLoader(dir_),
+        loader=RecordingFileSystemLoader(dir_, files),
         undefined=StrictUndefined,
-        extensions=['jinja2.ext.do'])
+        extensions=['jinja2.ext.do'],
+        bytecode_cache=bytecode_cache)
 
     # Load any custom Jinja2 filters in the suite definition directory
     # Example: a filter to pad integer values some fill character:
@@ -55,21 +250,12 @@ def jinja2process(flines, dir_, template_vars=None):
     # |  #!/usr/bin/env python
     # |  def foo( value, length, fillchar ):
     # |     return str(value).rjust( int(length), str(fillchar) )
-    for fdir in [
-            os.path.join(os.environ['CYLC_DIR'], 'lib', 'Jinja2Filters'),
-            os.path.join(dir_, 'Jinja2Filters'),
-            os.path.join(os.environ['HOME'], '.cylc', 'Jinja2Filters')]:
-        if os.path.isdir(fdir):
-            sys.path.append(os.path.abspath(fdir))
-            for name in glob(os.path.join(fdir, '*.py')):
-                fname = os.path.splitext(os.path.basename(name))[0]
-                # TODO - EXCEPTION HANDLING FOR LOADING CUSTOM FILTERS
-                module = __import__(fname)
-                env.filters[fname] = getattr(module, fname)
+    env.filters.update(load_filters(dir_))
 
     # Import SUITE HOST USER ENVIRONMENT into template:
     # (usage e.g.: {{environ['HOME']}}).
-    env.globals['environ'] = os.environ
+    environ = RecordingEnviron(names)
+    env.globals['environ'] = environ
     env.globals['raise'] = raise_helper
     env.globals['assert'] = assert_helper
 
@@ -90,7 +276,17 @@ def jinja2process(flines, dir_, template_vars=None):
     # Convert unicode to plain str, ToDo - still needed for parsec?)
 
     suiterc = []
-    template = env.from_string('\n'.join(flines[1:]))
+    source = '\n'.join(flines[1:])
+    if bytecode_cache is None:
+        template = env.from_string(source)
+    else:
+        # As env.from_string, but with the code from the bytecode cache
+        bucket = bytecode_cache.get_bucket(env, _TEMPLATE_NAME, dir_, source)
+        if bucket.code is None:
+            bucket.code = env.compile(source)
+            bytecode_cache.set_bucket(bucket)
+        template = env.template_class.from_code(
+            env, bucket.code, env.make_globals(None))
     for line in str(template.render(template_vars)).splitlines():
         # Jinja2 leaves blank lines where source lines contain
         # only Jinja2 code; this matters if line continuation
@@ -102,4 +298,50 @@ def jinja2process(flines, dir_, template_vars=None):
         # ##suiterc.append(line + '\n')
         suiterc.append(line)
 
+    if deps is not None:
+        deps['files'] = files
+        if environ.is_listed:
+            deps['environ'] = None
+        else:
+            deps['environ'] = names
     return suiterc
+
+
+class TestLoadFilters(unittest.TestCase):
+    """Unit tests for load_filters."""
+
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+        self.home = os.environ['HOME']
+        os.environ['HOME'] = os.path.join(self.tmpdir, 'home')
+
+    def tearDown(self):
+        os.environ['HOME'] = self.home
+        rmtree(self.tmpdir)
+
+    def _write_filter(self, fdir, value):
+        """Write filter "foo" returning value to fdir."""
+        mkdir_p(fdir)
+        path = os.path.join(fdir, 'foo.py')
+        handle = open(path, 'w')
+        handle.write('VALUE = %r\n\n\ndef foo(_):\n    return VALUE\n' % (
+            value))
+        handle.close()
+        return path
+
+    def test_load_filters_same_name(self):
+        """Test same-named filters in different directories are separate."""
+        suite_dir = os.path.join(self.tmpdir, 'suite')
+        suite_path = self._write_filter(
+            os.path.join(suite_dir, 'Jinja2Filters'), 'suite')
+        home_path = self._write_filter(
+            os.path.join(os.environ['HOME'], '.cylc', 'Jinja2Filters'),
+            'home')
+        filters = load_filters(suite_dir)
+        self.assertEqual('home', filters['foo'](None))
+        self.assertEqual('suite', _FILTERS[suite_path][1](None))
+        self.assertEqual('home', _FILTERS[home_path][1](None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,7 +39,7 @@ __PYTHON__
 }
 
 . "$(dirname "$0")/test_header"
-set_test_number 15
+set_test_number 17
 
 init_suite "${TEST_NAME_BASE}" <<'__SUITERC__'
 [cylc]
@@ -75,7 +75,7 @@ run_ok "${TEST_NAME_BASE}-1" \
     "https://${HOST}:${PORT}/get_latest_state"
 json_keys_cmp "${TEST_NAME_BASE}-1.stdout" \
     'ancestors' 'ancestors_pruned' 'cylc_version' 'descendants' 'err_content' \
-    'err_size' 'full_mode' 'summary'
+    'err_size' 'full_mode' 'summary' 'summary_revision' 'summary_run_id'
 # Call 2, incremental
 run_ok "${TEST_NAME_BASE}-2" \
     env no_proxy=* curl -A "${AGENT}" -v --cacert "${SRV_D}/ssl.cert" \
@@ -95,7 +95,8 @@ run_ok "${TEST_NAME_BASE}-3" \
     --digest -u "cylc:$(<"${SRV_D}/passphrase")" \
     "https://${HOST}:${PORT}/get_latest_state"
 json_keys_cmp "${TEST_NAME_BASE}-3.stdout" \
-    'cylc_version' 'full_mode' 'mean_main_loop_interval' 'summary'
+    'cylc_version' 'full_mode' 'mean_main_loop_interval' 'summary' \
+    'summary_revision' 'summary_run_id'
 # Call 4, incremental
 run_ok "${TEST_NAME_BASE}-4" \
     env no_proxy=* curl -A "${AGENT}" -v --cacert "${SRV_D}/ssl.cert" \
@@ -114,7 +115,8 @@ run_ok "${TEST_NAME_BASE}-5" \
     "https://${HOST}:${PORT}/get_latest_state"
 json_keys_cmp "${TEST_NAME_BASE}-5.stdout" \
     'ancestors' 'ancestors_pruned' 'cylc_version' 'descendants' \
-    'full_mode' 'mean_main_loop_interval' 'summary'
+    'full_mode' 'mean_main_loop_interval' 'summary' 'summary_revision' \
+    'summary_run_id'
 # Call 6, incremental
 run_ok "${TEST_NAME_BASE}-6" \
     env no_proxy=* curl -A "${AGENT}" -v --cacert "${SRV_D}/ssl.cert" \
@@ -130,7 +132,17 @@ run_ok "${TEST_NAME_BASE}-7" \
     "https://${HOST}:${PORT}/get_latest_state?&full_mode=True"
 json_keys_cmp "${TEST_NAME_BASE}-7.stdout" \
     'ancestors' 'ancestors_pruned' 'cylc_version' 'descendants' 'err_content' \
-    'err_size' 'full_mode' 'mean_main_loop_interval' 'summary'
+    'err_size' 'full_mode' 'mean_main_loop_interval' 'summary' \
+    'summary_revision' 'summary_run_id'
+
+# Call 8, with a summary revision of another run
+run_ok "${TEST_NAME_BASE}-8" \
+    env no_proxy=* curl -A "${AGENT}" -v --cacert "${SRV_D}/ssl.cert" \
+    --digest -u "cylc:$(<"${SRV_D}/passphrase")" \
+    "https://${HOST}:${PORT}/get_latest_state?summary_revision=1&summary_run_id=x"
+json_keys_cmp "${TEST_NAME_BASE}-8.stdout" \
+    'cylc_version' 'full_mode' 'mean_main_loop_interval' 'summary' \
+    'summary_revision' 'summary_run_id'
 
 # Stop and purge the suite.
 cylc stop --max-polls=20 --interval=1 "${SUITE_NAME}"
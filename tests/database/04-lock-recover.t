@@ -37,9 +37,9 @@ grep_ok "WARNING - cannot execute database statement:" \
     "${TEST_NAME_BASE}-run.stderr.grep"
 grep_ok "file=${SUITE_RUN_DIR}/log/db:" \
     "${TEST_NAME_BASE}-run.stderr.grep"
-grep_ok "stmt=DELETE FROM task_pool" \
+grep_ok "stmt=INSERT OR REPLACE INTO checkpoint_id" \
     "${TEST_NAME_BASE}-run.stderr.grep"
-grep_ok "stmt_args\[0\]=\[\]" \
+grep_ok "stmt_args\[0\]=\[0, '?', 'latest'\]" \
     "${TEST_NAME_BASE}-run.stderr.grep"
 
 if ! which sqlite3 > /dev/null; then
@@ -0,0 +1,55 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Suite database in WAL journal mode with a persistent connection.
+. "$(dirname "$0")/test_header"
+set_test_number 5
+create_test_globalrc '' '
+[suite database]
+    persistent connection = True
+    journal mode = wal
+    synchronous = normal'
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach "${SUITE_NAME}"
+
+if ! which sqlite3 > /dev/null; then
+    skip 3 "sqlite3 not installed?"
+    purge_suite "${SUITE_NAME}"
+    exit 0
+fi
+
+SUITE_RUN_DIR="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}"
+exists_fail "${SUITE_RUN_DIR}/.service/db-wal"
+
+# Public database is left in the default journal mode.
+NAME='pub-journal-mode.out'
+sqlite3 "${SUITE_RUN_DIR}/log/db" 'PRAGMA journal_mode' >"${NAME}"
+cmp_ok "${NAME}" <<<'delete'
+
+NAME='select-task-states.out'
+sqlite3 "${SUITE_RUN_DIR}/.service/db" \
+    'SELECT name, status FROM task_states ORDER BY name' >"${NAME}"
+cmp_ok "${NAME}" <<'__SELECT__'
+bar|succeeded
+foo|succeeded
+__SELECT__
+
+purge_suite "${SUITE_NAME}"
+exit
@@ -0,0 +1,45 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Public suite database written by a separate thread.
+. "$(dirname "$0")/test_header"
+set_test_number 4
+create_test_globalrc '' '
+[suite database]
+    public database writer = thread'
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach "${SUITE_NAME}"
+
+if ! which sqlite3 > /dev/null; then
+    skip 2 "sqlite3 not installed?"
+    purge_suite "${SUITE_NAME}"
+    exit 0
+fi
+
+SUITE_RUN_DIR="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}"
+for TABLE in 'task_states' 'task_jobs'; do
+    STMT="SELECT * FROM ${TABLE} ORDER BY name"
+    sqlite3 "${SUITE_RUN_DIR}/.service/db" "${STMT}" >"${TABLE}-pri.out"
+    sqlite3 "${SUITE_RUN_DIR}/log/db" "${STMT}" >"${TABLE}-pub.out"
+    cmp_ok "${TABLE}-pub.out" "${TABLE}-pri.out"
+done
+
+purge_suite "${SUITE_NAME}"
+exit
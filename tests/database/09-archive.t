@@ -0,0 +1,78 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Task rows of old cycle points moved to archive database files.
+. "$(dirname "$0")/test_header"
+set_test_number 8
+create_test_globalrc '' '
+[suite database]
+    archive cycle point offset = P2
+    archive interval = PT0S'
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach "${SUITE_NAME}"
+
+# Archived rows are read with the public database.
+run_ok "${TEST_NAME_BASE}-suite-state" \
+    cylc suite-state "${SUITE_NAME}" --point=1 --task=foo --status=succeeded
+
+if ! which sqlite3 > /dev/null; then
+    skip 5 "sqlite3 not installed?"
+    purge_suite "${SUITE_NAME}"
+    exit 0
+fi
+
+SUITE_RUN_DIR="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}"
+ARCHIVE_FILE="$(ls "${SUITE_RUN_DIR}/log/db-archive/db-"*)"
+exists_ok "${ARCHIVE_FILE}"
+
+NAME='select-task-states-1.out'
+sqlite3 "${SUITE_RUN_DIR}/log/db" \
+    "SELECT name, cycle FROM task_states WHERE cycle=='1'" >"${NAME}"
+cmp_ok "${NAME}" <'/dev/null'
+
+# Each task is either in the live database or in the archive.
+NAME='select-task-states.out'
+sqlite3 "${SUITE_RUN_DIR}/log/db" "
+    ATTACH DATABASE '${ARCHIVE_FILE}' AS archive;
+    SELECT name, cycle, status FROM main.task_states
+    UNION ALL
+    SELECT name, cycle, status FROM archive.task_states" \
+    | sort >"${NAME}"
+for CYCLE in $(seq 1 5); do
+    echo "bar|${CYCLE}|succeeded"
+    echo "foo|${CYCLE}|succeeded"
+done | sort >"${NAME}.expected"
+cmp_ok "${NAME}" "${NAME}.expected"
+
+# Pages freed by archiving are returned to the file system: the private
+# database file should be (about) as small as a vacuumed copy of it.
+PRI_DB_FILE="${SUITE_RUN_DIR}/.service/db"
+NAME='pragma-auto-vacuum.out'
+sqlite3 "${PRI_DB_FILE}" 'PRAGMA auto_vacuum' >"${NAME}"
+cmp_ok "${NAME}" <<<'2'
+cp "${PRI_DB_FILE}" 'db-vacuumed'
+sqlite3 'db-vacuumed' 'VACUUM'
+PAGE_SIZE="$(sqlite3 'db-vacuumed' 'PRAGMA page_size')"
+run_ok "${TEST_NAME_BASE}-file-size" test \
+    "$(stat -c '%s' "${PRI_DB_FILE}")" -le \
+    "$(( $(stat -c '%s' 'db-vacuumed') + 4 * PAGE_SIZE ))"
+
+purge_suite "${SUITE_NAME}"
+exit
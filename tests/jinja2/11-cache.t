@@ -0,0 +1,71 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test the cache of processed lines is used when nothing has changed, and not
+# when a Jinja2 include file or an environment variable used has changed, or
+# when a missing Jinja2 include file or environment variable is created.
+. "$(dirname "$0")/test_header"
+#-------------------------------------------------------------------------------
+set_test_number 16
+#-------------------------------------------------------------------------------
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+export CYLC_TEST_JINJA2_TITLE='cache'
+
+TEST_NAME="${TEST_NAME_BASE}-validate-1"
+run_ok "${TEST_NAME}" cylc validate -v "${SUITE_NAME}"
+grep_ok '^Processed lines cached:' "${TEST_NAME}.stdout"
+
+TEST_NAME="${TEST_NAME_BASE}-validate-2"
+run_ok "${TEST_NAME}" cylc validate -v "${SUITE_NAME}"
+grep_ok '^Processed lines loaded from:' "${TEST_NAME}.stdout"
+
+# Modify the Jinja2 include file
+sed -i 's/true/false/' "${TEST_DIR}/${SUITE_NAME}/runtime.rc"
+TEST_NAME="${TEST_NAME_BASE}-validate-3"
+run_ok "${TEST_NAME}" \
+    cylc validate -v -o 'suite.rc.processed' "${SUITE_NAME}"
+grep_ok '^Processed lines cached:' "${TEST_NAME}.stdout"
+grep_ok '^        script = false$' 'suite.rc.processed'
+
+# Modify the environment variable
+export CYLC_TEST_JINJA2_TITLE='no cache'
+TEST_NAME="${TEST_NAME_BASE}-validate-4"
+run_ok "${TEST_NAME}" \
+    cylc validate -v -o 'suite.rc.processed' "${SUITE_NAME}"
+grep_ok '^Processed lines cached:' "${TEST_NAME}.stdout"
+grep_ok '^    title = no cache$' 'suite.rc.processed'
+
+# Set an environment variable that was looked up in vain
+export CYLC_TEST_JINJA2_DESCRIPTION='has key'
+TEST_NAME="${TEST_NAME_BASE}-validate-5"
+run_ok "${TEST_NAME}" \
+    cylc validate -v -o 'suite.rc.processed' "${SUITE_NAME}"
+grep_ok '^Processed lines cached:' "${TEST_NAME}.stdout"
+grep_ok '^    description = has key$' 'suite.rc.processed'
+
+# Create a Jinja2 include file that was missing
+cat >"${TEST_DIR}/${SUITE_NAME}/extra.rc" <<'__RC__'
+    [[baz]]
+__RC__
+TEST_NAME="${TEST_NAME_BASE}-validate-6"
+run_ok "${TEST_NAME}" \
+    cylc validate -v -o 'suite.rc.processed' "${SUITE_NAME}"
+grep_ok '^Processed lines cached:' "${TEST_NAME}.stdout"
+grep_ok '^    \[\[baz\]\]$' 'suite.rc.processed'
+#-------------------------------------------------------------------------------
+purge_suite "${SUITE_NAME}"
+exit
@@ -0,0 +1,52 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test compiled Jinja2 templates are cached, for the main template and an
+# imported template, and that changes to the templates are picked up.
+. "$(dirname "$0")/test_header"
+#-------------------------------------------------------------------------------
+set_test_number 5
+#-------------------------------------------------------------------------------
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+BYTECODE_DIR="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}"
+BYTECODE_DIR="${BYTECODE_DIR}/.service/cache/jinja2"
+
+run_ok "${TEST_NAME_BASE}-validate-1" cylc validate "${SUITE_NAME}"
+ls "${BYTECODE_DIR}" >'bytecode-1.out'
+run_ok "${TEST_NAME_BASE}-n-files" test "$(wc -l <'bytecode-1.out')" -eq 2
+
+# Modify both templates: their cache files should be replaced, not added to
+sed -i 's/script = true/script = false/' "${TEST_DIR}/${SUITE_NAME}/macros.rc"
+echo '# comment' >>"${TEST_DIR}/${SUITE_NAME}/suite.rc"
+run_ok "${TEST_NAME_BASE}-validate-2" \
+    cylc validate -o 'suite.rc.processed' "${SUITE_NAME}"
+ls "${BYTECODE_DIR}" >'bytecode-2.out'
+cmp_ok 'bytecode-1.out' 'bytecode-2.out'
+cmp_ok 'suite.rc.processed' <<'__PROCESSED__'
+[scheduling]
+    [[dependencies]]
+        graph = "foofoo => bar"
+[runtime]
+    [[foofoo]]
+        script = false
+    [[bar]]
+        script = false
+# comment
+__PROCESSED__
+#-------------------------------------------------------------------------------
+purge_suite "${SUITE_NAME}"
+exit
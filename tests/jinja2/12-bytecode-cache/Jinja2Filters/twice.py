@@ -0,0 +1,5 @@
+#!/usr/bin/env python
+
+
+def twice(value):
+    return str(value) * 2
@@ -19,7 +19,7 @@
 . "$(dirname "$0")/test_header"
 
 which sqlite3 > /dev/null || skip_all "sqlite3 not installed?"
-set_test_number 8
+set_test_number 9
 
 install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
 
@@ -36,6 +36,15 @@ exists_fail "${SUITE_RUN_DIR}/cylc-suite-env"
 sqlite3 "${SUITE_RUN_DIR}/log/db" '.schema task_pool' >'task_pool.schema'
 cmp_ok 'task_pool.schema' \
     <<<'CREATE TABLE task_pool(cycle TEXT, name TEXT, spawned INTEGER, status TEXT, hold_swap TEXT, PRIMARY KEY(cycle, name));'
+# Indexes missing from the old database are created on restart
+sqlite3 "${SUITE_RUN_DIR}/log/db" \
+    "SELECT name FROM sqlite_master WHERE type=='index' AND sql IS NOT NULL
+     ORDER BY name" >'indexes.out'
+cmp_ok 'indexes.out' <<'__OUT__'
+task_events_cycle_name_submit_num_idx
+task_states_cycle_status_idx
+task_states_status_idx
+__OUT__
 
 purge_suite "${SUITE_NAME}"
 exit
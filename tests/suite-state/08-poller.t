@@ -0,0 +1,60 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2018 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test local automatic suite state polling tasks are polled by the suite
+# server program, without jobs, and fail when they run out of polls.
+. "$(dirname "$0")/test_header"
+#-------------------------------------------------------------------------------
+set_test_number 6
+#-------------------------------------------------------------------------------
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+UPSTREAM="${SUITE_NAME}-upstream"
+cylc register "${UPSTREAM}" "${TEST_DIR}/${SUITE_NAME}/upstream" 1>'/dev/null'
+suite_run_ok "${TEST_NAME_BASE}-run-upstream" \
+    cylc run --debug --no-detach "${UPSTREAM}"
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach --set="UPSTREAM=${UPSTREAM}" "${SUITE_NAME}"
+#-------------------------------------------------------------------------------
+DB_FILE="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}/log/db"
+NAME='select-task-jobs'
+sqlite3 "${DB_FILE}" \
+    'SELECT name, submit_num, user_at_host, batch_sys_name
+     FROM task_jobs ORDER BY name' >"${NAME}.out"
+cmp_ok "${NAME}.out" <<'__OUT__'
+done|1|localhost|background
+l-good|1|localhost|suite-state
+lbad|1|localhost|suite-state
+lnot|1|localhost|suite-state
+__OUT__
+NAME='select-task-events'
+sqlite3 "${DB_FILE}" \
+    "SELECT name, event FROM task_events
+     WHERE name != 'done' AND event IN ('succeeded', 'failed')
+     ORDER BY name" >"${NAME}.out"
+cmp_ok "${NAME}.out" <<'__OUT__'
+l-good|succeeded
+lbad|succeeded
+lnot|failed
+__OUT__
+SUITE_RUN_DIR="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}"
+exists_fail "${SUITE_RUN_DIR}/log/job/1/l-good/01/job"
+grep_ok 'lnot\.1.*(current:running)> failed' \
+    "${SUITE_RUN_DIR}/log/suite/log"
+#-------------------------------------------------------------------------------
+purge_suite "${UPSTREAM}"
+purge_suite "${SUITE_NAME}"
+exit